@@ -1,4 +1,3 @@
-import random
 from typing import *
 
 import click
@@ -63,9 +62,7 @@ def memory_swizzle_widget(label: str, swizzled: bool):
     mat = Matrix(shape=data_shape, cell_config=Matrix.CellConfig(
         width=40), margin=(20, 10))
 
-    random.seed(0)
-    bank_colors = [colors.RGB(*[random.randint(0, 256)
-                              for i in range(3)]) for i in range(num_banks)]
+    bank_colors = [colors.RGB(*rgb) for rgb in colors.palette(num_banks).tolist()]
     for row in range(data_shape[0]):
         for bank_id, row, col in offsets(row):
             print(row, col)
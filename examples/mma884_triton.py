@@ -3,6 +3,7 @@ from typing import *
 import numpy as np
 
 from matshow import *
+from matshow.layouts import MmaV1Layout
 from matshow.widgets.gpu import WarpDataLayout
 
 
@@ -86,74 +87,12 @@ def draw_mma884_C(is_a_vec4: bool, is_b_vec4: bool, shape: List[int],
     '''
     Get ids from the m and n axis.
     '''
-    fpw = [2, 2, 1]
-    warps = np.product(wpt)
-    assert warps == 1
-    pack_size0 = 1 if is_a_row or is_a_vec4 else 2
-    pack_size1 = 2 if is_b_row and (not is_b_vec4) else 1
-    rep = [2 * pack_size0, 2 * pack_size1, 1]
-    spw = [fpw[0] * 4 * rep[0], fpw[1] * 4 * rep[1], 1]
-    vec = 2 * np.array(rep)
-    shape_per_cta = [spw[0] * wpt[0], spw[1] * wpt[1]]
-
-    def thread_to_cells(thread: int):
-        lane = thread % 32
-        warp = thread // 32
-
-        warp_0 = warp % wpt[0]
-        warp_12 = warp // wpt[0]
-        warp_1 = warp_12 % wpt[1]
-
-        # warp offset
-        off_warp_m = warp_0 * spw[0]
-        off_warp_n = warp_1 * spw[1]
-        # quad offset
-        off_quad_m = (lane & 16) // 4 * fpw[0]
-        off_quad_n = (lane & 16) // 4 * fpw[1]
-        # pair offset
-        off_pair_m = (lane % 16) // 4
-        off_pair_m = off_pair_m % fpw[0]
-        off_pair_m = off_pair_m * 4
-        off_pair_n = (lane % 16) // 4
-        off_pair_n = off_pair_n // fpw[0]
-        off_pair_n = off_pair_n % fpw[1]
-        off_pair_n = off_pair_n * 4
-
-        # scale
-        off_pair_m = off_pair_m * (rep[0] // 2)
-        off_quad_m = off_quad_m * (rep[0] // 2)
-        off_pair_n = off_pair_n * (rep[1] // 2)
-        off_quad_n = off_quad_n * (rep[1] // 2)
-
-        # quad pair offset
-        off_lane_m = off_pair_m + off_quad_m
-        off_lane_n = off_pair_n + off_quad_n
-        # a, b offset
-        offset_a_m = off_warp_m + off_lane_m
-        offset_b_n = off_warp_n + off_lane_n
-        # i indices
-        offset_c_m = (lane & 1) + offset_a_m
-        idx_m = []
-        for m in range(0, shape[0], shape_per_cta[0]):
-            for mm in range(rep[0]):
-                idx_m.append(offset_c_m + m + mm * 2)
-        offset_c_n = (lane & 2) + off_warp_n + off_pair_n
-        idx_n = []
-        for n in range(0, shape[1], shape_per_cta[1]):
-            for nn in range(rep[1]):
-                idx_n.append(offset_c_n + n + nn // 2 * 4 + (nn %
-                                                             2) * 2 * fpw[1] * rep[1])
-                idx_n.append(offset_c_n + n + nn // 2 * 4 + (nn %
-                                                             2) * 2 * fpw[1] * rep[1] + 1)
-
-        for m in idx_m:
-            for n in idx_n:
-                coord = m, n
-                yield coord
+    layout = MmaV1Layout(is_a_row, is_b_row, is_a_vec4, is_b_vec4, warps_per_cta=wpt)
+    vec = 2 * np.array(layout.rep)
 
     label = f"D:{shape} a_row,b_row,a_vec4,b_vec4,veca,vecb:{is_a_row}-{is_b_row}-{is_a_vec4}-{is_b_vec4}-{vec[0]}-{vec[1]}"
     c_mat = WarpDataLayout(shape=shape, label=label, random_seed=1, fontsize=24)
-    c_mat.set_thread_to_cells_map(thread_to_cells)
+    c_mat.set_layout(layout)
     c_mat.draw()
     snapshot = c_mat.tid_to_cell_summary
     # c_mat.show()
@@ -1,9 +1,7 @@
-import random
-from typing import *
-
 import click
 
 from matshow import HStack, LabeledWidget, VStack
+from matshow.layouts import DotOperandLayout, MmaV2Layout
 from matshow.widgets.gpu import WarpDataLayout
 
 M = 16
@@ -16,43 +14,11 @@ A = WarpDataLayout(shape=(M, K), label="$a")
 B = WarpDataLayout(shape=(K, N), label="$b")
 C = WarpDataLayout(shape=(M, N), label="accumulator $c/$d")
 
-
-def A_thread_to_cells(threadid: int) -> List[Tuple[int, int]]:
-    lane = threadid % 32
-    group_id = lane >> 2
-    threadid_in_group = lane % 4
-    for i in range(8):
-        row = group_id if 0 <= i < 2 or 4 <= i < 6 else group_id + 8
-        col = threadid_in_group * 2 + \
-            (i & 0x1) if i < 4 else threadid_in_group * 2 + (i & 0x1) + 8
-        yield row, col
-
-
-def B_thread_to_cells(threadid: int) -> List[Tuple[int, int]]:
-    lane = threadid % 32
-    group_id = lane >> 2
-    threadid_in_group = lane % 4
-
-    for i in range(4):
-        row = threadid_in_group * 2 + (i & 0x1) if i < 2 else \
-            threadid_in_group * 2 + (i & 0x1) + 8
-        col = group_id
-        yield row, col
-
-
-def C_thread_to_cells(threadid: int) -> List[Tuple[int, int]]:
-    lane = threadid % 32
-    group_id = lane >> 2
-    threadid_in_group = lane % 4
-    for i in range(4):
-        row = group_id if i < 2 else group_id + 8
-        col = threadid_in_group * 2 + (i & 0x1)
-        yield row, col
-
-
-A.set_thread_to_cells_map(A_thread_to_cells)
-B.set_thread_to_cells_map(B_thread_to_cells)
-C.set_thread_to_cells_map(C_thread_to_cells)
+# the accumulator of mma.m16n8k16 and its operands, see `matshow.layouts`
+mma = MmaV2Layout()
+A.set_layout(DotOperandLayout(0, mma))
+B.set_layout(DotOperandLayout(1, mma))
+C.set_layout(mma)
 
 # ========================== View ###########################
 main_view = LabeledWidget(label="mma.m16n8k16.f16/bf16", fontsize=40)
@@ -1,3 +1,40 @@
-from matshow import colors
-from matshow.draw import *
-from matshow.gpu import TensorView
+'''
+Matrix visualization toolkit.
+
+The widgets and the submodules are imported on their first use (PEP 562), so `import matshow` doesn't load numpy or
+Pillow until a widget is touched, and the optional backends such as torch are never imported by matshow itself.
+'''
+import importlib
+import importlib.util
+
+# The names exported by `matshow` -> the modules defining them.
+_EXPORTS = {
+    "Widget": "matshow.draw",
+    "Rectangle": "matshow.draw",
+    "Stack": "matshow.draw",
+    "Matrix": "matshow.draw",
+    "HStack": "matshow.draw",
+    "VStack": "matshow.draw",
+    "LabeledWidget": "matshow.draw",
+    "create_animation": "matshow.draw",
+    "create_canvas": "matshow.draw",
+    "TensorView": "matshow.gpu",
+}
+
+__all__ = ["colors"] + list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    elif not name.startswith("_") and importlib.util.find_spec(__name__ + "." + name) is not None:
+        value = importlib.import_module(__name__ + "." + name)
+    else:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    # Later lookups skip this hook.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,205 @@
+'''
+Rendering the frames of animations into the streaming sinks of `matshow.sinks`.
+
+The frames are rendered by a FrameRenderer, it keeps the canvas between the frames and repaints only the regions
+damaged by the mutations since the last frame, so a frame costs the cells changed rather than the whole scene. For
+the long animations `render_frames` could also snapshot the display list of each frame and rasterize the snapshots in a
+pool of processes.
+
+Usage:
+
+    renderer = FrameRenderer(view)
+    with GIFSink("view.gif", duration=0.1) as sink:
+        for step in steps:
+            step()
+            sink.add(renderer.canvas, renderer.render())
+'''
+import collections
+import concurrent.futures
+import numbers
+import os
+from typing import *
+
+from PIL import Image, ImageDraw
+
+from matshow import colors
+from matshow.canvas import Canvas
+from matshow.draw import create_canvas
+from matshow.sinks import FrameSink, GIFSink, Region
+
+
+class FrameRenderer:
+    '''
+    Render the frames of a widget tree onto a persistent canvas.
+
+    The display list reports the primitives whose styles changed and the texts added since the last frame, only the
+    merged regions around them are drawn again, each onto a canvas of its own so the primitives overlapping a region
+    are clipped to it. A change of the layout repaints the whole canvas.
+
+    An indexed canvas takes the colors of the scene as its palette, see `create_canvas`, it stays RGB if the scene has
+    more colors than a palette could take.
+
+    The replays of the display list skip the draw callbacks, a tree having any is painted by `draw` in full instead.
+    '''
+
+    def __init__(self, widget, fill: colors.RGB = colors.WHITE, max_regions: int = 32, indexed: bool = False):
+        '''
+        :param max_regions: the damaged regions are merged into their bounding box beyond this many.
+        :param indexed: render onto an indexed ("P") canvas, a third of the memory of RGB.
+        '''
+        self.widget = widget
+        self.fill = fill
+        self.max_regions = max_regions
+        self.indexed = indexed
+        self.canvas: Optional[Image.Image] = None
+        self.draw_: Optional[ImageDraw.ImageDraw] = None
+
+    def render(self) -> List[Region]:
+        '''
+        Bring the canvas up to date with the widget tree, returns the regions repainted.
+        '''
+        display_list, damage = self.widget.update_display_list()
+        size = tuple(self.widget.outer_size)
+        callbacks = _has_callbacks(self.widget)
+        if self.canvas is None or self.canvas.size != size or damage is None or callbacks:
+            palette = _palette(display_list) if self.indexed else None
+            self.draw_, self.canvas = create_canvas(size, self.fill, palette)
+            if callbacks:
+                self.widget.draw(self.draw_)
+            else:
+                display_list.draw(self.draw_)
+            return [(0, 0) + size]
+
+        regions = merge_regions(damage, size, self.max_regions)
+        for region in regions:
+            patch = self._patch((region[2] - region[0], region[3] - region[1]))
+            display_list.draw_region(Canvas(patch), region)
+            if patch.mode == "P" and len(patch.getpalette()) > len(self.canvas.getpalette()):
+                # The colors new to the canvas are appended to the palette of the patch.
+                self.canvas.putpalette(patch.getpalette())
+                self.draw_ = Canvas(self.canvas)
+            self.canvas.paste(patch, region[:2])
+        return regions
+
+    def _patch(self, size: Tuple[int, int]) -> Image.Image:
+        if self.canvas.mode != "P":
+            return Image.new("RGB", size, self.fill)
+        # The fill takes the first slot of the palette.
+        patch = Image.new("P", size, 0)
+        patch.putpalette(self.canvas.getpalette())
+        return patch
+
+
+def merge_regions(regions: Iterable[Region], size: Tuple[int, int], max_regions: int = 32) -> List[Region]:
+    '''
+    Clip the regions to a canvas of `size` and merge the overlapping ones, the regions are merged into their bounding
+    box if more than `max_regions` are left.
+    '''
+    merged: List[Region] = []
+    for left, top, right, bottom in regions:
+        region = (max(left, 0), max(top, 0), min(right, size[0]), min(bottom, size[1]))
+        if region[0] >= region[2] or region[1] >= region[3]:
+            continue
+        # Absorb the merged regions it overlaps until none is left, the union might overlap more.
+        overlapped = True
+        while overlapped:
+            overlapped = False
+            for i, other in enumerate(merged):
+                if region[0] < other[2] and other[0] < region[2] and region[1] < other[3] and other[1] < region[3]:
+                    region = (min(region[0], other[0]), min(region[1], other[1]),
+                              max(region[2], other[2]), max(region[3], other[3]))
+                    del merged[i]
+                    overlapped = True
+                    break
+        merged.append(region)
+    if len(merged) > max_regions:
+        return [(min(r[0] for r in merged), min(r[1] for r in merged),
+                 max(r[2] for r in merged), max(r[3] for r in merged))]
+    return merged
+
+
+def render_frames(widget, steps: Iterable[Any], sink: FrameSink, fill: colors.RGB = colors.WHITE,
+                  workers: Optional[int] = 1, indexed: bool = False) -> None:
+    '''
+    Render a frame of `widget` after each item taken from `steps` and add the frames to `sink` in order.
+
+    Iterating `steps` runs the algorithm mutating the scene, it always stays in this process, a step yielding a number
+    is the seconds its frame shows. With one worker the frames are repainted incrementally by a FrameRenderer,
+    otherwise each frame is snapshotted from the display list and rasterized by a pool of processes, all the cores if
+    `workers` is None. The draw callbacks run in this process, a tree having any is drawn by one worker.
+
+    :param indexed: render the frames onto indexed canvases, the sinks take their palette indices as they are.
+    '''
+    if workers == 1 or _has_callbacks(widget):
+        renderer = FrameRenderer(widget, fill=fill, indexed=indexed)
+        for step in steps:
+            damage = renderer.render()
+            sink.add(renderer.canvas, damage, _duration(step))
+        return
+
+    pool = None
+    pending = collections.deque()
+    try:
+        for step in steps:
+            display_list, damage = widget.update_display_list()
+            size = tuple(widget.outer_size)
+            snapshot = display_list.snapshot()
+            if pool is None:
+                workers = workers or os.cpu_count() or 1
+                # Each worker draws the first frame once to warm its fonts and sprites.
+                pool = concurrent.futures.ProcessPoolExecutor(
+                    workers, initializer=_warm_worker, initargs=(snapshot, size, fill, indexed))
+            pending.append((pool.submit(_rasterize_snapshot, snapshot, size, fill, indexed), size, damage,
+                            _duration(step)))
+            # Keep a few frames in flight per worker, the memory is bounded however long the animation is.
+            while len(pending) > 2 * workers:
+                _add_rendered(sink, *pending.popleft())
+        while pending:
+            _add_rendered(sink, *pending.popleft())
+    finally:
+        for future, *_ in pending:
+            future.cancel()
+        if pool is not None:
+            pool.shutdown()
+
+
+def _add_rendered(sink: FrameSink, future: concurrent.futures.Future, size: Tuple[int, int],
+                  damage: Optional[List[Region]], duration: Optional[float]) -> None:
+    data, palette = future.result()
+    frame = Image.frombytes("RGB" if palette is None else "P", size, data)
+    if palette is not None:
+        frame.putpalette(palette)
+    sink.add(frame, None if damage is None else merge_regions(damage, size), duration)
+
+
+def _has_callbacks(widget) -> bool:
+    '''
+    Whether any widget of the tree has draw callbacks, they run only in `draw`.
+    '''
+    return widget._fingerprint_info[2]
+
+
+def _duration(step) -> Optional[float]:
+    return step if isinstance(step, numbers.Real) and not isinstance(step, bool) else None
+
+
+def _palette(display_list) -> Optional[List[colors.RGB]]:
+    '''
+    The palette of an indexed canvas, None if the colors overflow it.
+    '''
+    palette = display_list.colors()
+    # One slot for the fill.
+    return palette if len(palette) < 256 else None
+
+
+def _rasterize_snapshot(snapshot, size: Tuple[int, int], fill, indexed: bool) -> Tuple[bytes, Optional[List[int]]]:
+    '''
+    Draw a snapshot, returns the pixels and the palette of an indexed canvas.
+    '''
+    draw_, canvas = create_canvas(size, fill, _palette(snapshot) if indexed else None)
+    snapshot.draw(draw_)
+    return canvas.tobytes(), canvas.getpalette() if canvas.mode == "P" else None
+
+
+def _warm_worker(snapshot, size: Tuple[int, int], fill, indexed: bool) -> None:
+    _rasterize_snapshot(snapshot, size, fill, indexed)
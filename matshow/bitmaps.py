@@ -0,0 +1,168 @@
+'''
+Bitmaps of drawn subtrees keyed by their content fingerprints.
+
+Most subtrees of a scene are unchanged between the frames of an animation, and the views of a scene are often copies
+of each other, a subtree whose fingerprint, a blake2b digest of its content, matches a previous drawing is blitted from
+its bitmap instead of being drawn again. The bitmaps are keyed by the font in use too, and they are pasted onto the
+Image of a `matshow.canvas.Canvas`. The cache is shared by all the scenes in the process.
+'''
+from typing import *
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from matshow import fonts
+from matshow.cache import LRUCache
+from matshow.canvas import Canvas, target_image
+
+_Bitmap = NamedTuple("_Bitmap", [("rgb", Any), ("mask", Any), ("x", int), ("y", int), ("width", int),
+                                 ("height", int), ("nbytes", int)])
+
+# The backgrounds to tell the pixels painted by a subtree, the colors rarely show in a scene.
+_BACKGROUNDS = ((1, 254, 3), (254, 1, 252))
+
+# The fingerprints of the subtrees which could not be cached, e.g. a text blended over the pixels under the subtree.
+_UNCACHEABLE = object()
+
+
+def _bitmap_nbytes(bitmap) -> int:
+    return bitmap.nbytes if isinstance(bitmap, _Bitmap) else 0
+
+
+class BitmapCache:
+    '''
+    Blit the bitmaps of the subtrees drawn before.
+
+    A subtree is cached when its fingerprint is drawn the second time, so the subtrees changing in every frame never
+    take the memory. The bitmap keeps the pixels painted by the subtree along with a mask, so the pixels it doesn't
+    touch, such as the margins, show the canvas under it as drawing does.
+    '''
+
+    # The image modes the bitmaps could be blitted into.
+    MODES = ("RGB",)
+    # The padding around a subtree when rasterizing, to capture the texts overflowing it.
+    PAD = 16
+
+    def __init__(self, max_bytes: int = 64 << 20, min_widgets: int = 8, seen_capacity: int = 4096):
+        '''
+        :param min_widgets: the subtrees with fewer widgets are cheaper to draw than to cache.
+        '''
+        self.bitmaps = LRUCache(capacity=None, max_bytes=max_bytes, sizeof=_bitmap_nbytes)
+        # The fingerprints drawn once.
+        self.seen = LRUCache(capacity=seen_capacity)
+        self.min_widgets = min_widgets
+        self.enabled = True
+
+    def draw(self, widget, draw_: ImageDraw.ImageDraw, offset: Tuple[int, int]) -> bool:
+        '''
+        Draw `widget` from its bitmap, returns False if it is not cached and should be drawn as usual.
+        '''
+        image = target_image(draw_)
+        if not self.enabled or image is None or image.mode not in BitmapCache.MODES:
+            return False
+        fingerprint, widgets, callbacks = widget._fingerprint_info
+        # The draw callbacks of a subtree should run in each drawing.
+        if widgets < self.min_widgets or callbacks:
+            return False
+
+        # the fingerprints hold the contents of the texts, not the font they are drawn in
+        key = (fingerprint, fonts.registry.path)
+        bitmap = self.bitmaps.get(key)
+        if bitmap is None:
+            if self.seen.get(key) is None:
+                self.seen.put(key, True)
+                return False
+            bitmap = self._rasterize(widget)
+            self.bitmaps.put(key, bitmap)
+        if bitmap is _UNCACHEABLE:
+            return False
+
+        if bitmap.rgb is not None:
+            image.paste(bitmap.rgb, (offset[0] + bitmap.x, offset[1] + bitmap.y), bitmap.mask)
+        return True
+
+    def clear(self) -> None:
+        self.bitmaps.clear()
+        self.seen.clear()
+        self.bitmaps.reset_stats()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return self.bitmaps.stats
+
+    def _rasterize(self, widget):
+        '''
+        Draw the subtree onto a canvas of an unusual color, the subtree covering its box opaquely is done. Otherwise
+        it is drawn onto another color, the pixels the same in both are painted by the subtree, and the pixels keeping
+        the background are untouched.
+        '''
+        pad = BitmapCache.PAD
+        width, height = widget.outer_size
+        # The rectangles cover one more pixel than the size.
+        size = (width + 1 + 2 * pad, height + 1 + 2 * pad)
+        image = self._render(widget, size, _BACKGROUNDS[0])
+        inner = (pad, pad, size[0] - pad, size[1] - pad)
+        if BitmapCache._opaque(image, inner, _BACKGROUNDS[0]):
+            return _Bitmap(image.crop(inner), None, 0, 0, width + 1, height + 1, (width + 1) * (height + 1) * 3)
+
+        first = np.asarray(image)
+        second = np.asarray(self._render(widget, size, _BACKGROUNDS[1]))
+        painted = _equal(first, second)
+        untouched = _equal(first, _BACKGROUNDS[0]) & _equal(second, _BACKGROUNDS[1])
+        if not (painted | untouched).all():
+            return _UNCACHEABLE  # blended with the background
+        if painted[0].any() or painted[-1].any() or painted[:, 0].any() or painted[:, -1].any():
+            return _UNCACHEABLE  # might be clipped
+
+        rows, cols = np.flatnonzero(painted.any(axis=1)), np.flatnonzero(painted.any(axis=0))
+        if not len(rows):
+            return _Bitmap(None, None, 0, 0, 0, 0, 0)
+        top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+        mask = painted[top:bottom, left:right]
+        rgb = image.crop((left, top, right, bottom))
+        mask = None if mask.all() else Image.fromarray(mask.astype(np.uint8) * 255)
+        return _Bitmap(rgb, mask, int(left) - pad, int(top) - pad, int(right - left), int(bottom - top),
+                       int((right - left) * (bottom - top) * (3 if mask is None else 4)))
+
+    @staticmethod
+    def _opaque(image: Image.Image, inner: Tuple[int, int, int, int], background) -> bool:
+        '''
+        Whether the subtree painted all the pixels inside `inner` and none outside, it is checked with the histograms
+        of Pillow to skip copying the image to numpy.
+        '''
+        width, height = image.size
+        left, top, right, bottom = inner
+        for box in ((0, 0, width, top), (0, bottom, width, height), (0, top, left, bottom), (right, top, width, bottom)):
+            strip = image.crop(box)
+            if strip.getcolors(1) != [(strip.width * strip.height, background)]:
+                return False
+        red = image.getchannel(0).crop(inner)
+        if not red.histogram()[background[0]]:
+            return True
+        return not _equal(np.asarray(image.crop(inner)), background).any()
+
+    @staticmethod
+    def _render(widget, size: Tuple[int, int], background) -> Image.Image:
+        pad = BitmapCache.PAD
+        canvas = Image.new("RGB", size, background)
+        draw_ = Canvas(canvas)
+        widget._draw(draw_, (pad, pad))
+        widget._draw_text(draw_, (pad, pad))
+        return canvas
+
+
+def _equal(image: np.ndarray, other) -> np.ndarray:
+    '''
+    Compare the pixels of an (H, W, 3) image to another image or a color, the other channels are compared only if any
+    pixel matches in the first one.
+    '''
+    other = np.asarray(other, dtype=np.uint8)
+    equal = image[..., 0] == other[..., 0]
+    if equal.any():
+        equal &= image[..., 1] == other[..., 1]
+        equal &= image[..., 2] == other[..., 2]
+    return equal
+
+
+# The bitmaps shared by the whole process.
+bitmaps = BitmapCache()
@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from typing import *
+
+
+class LRUCache:
+    '''
+    A bounded mapping which evicts the least recently used entries first, it also counts the hits and misses so that
+    the caches built on it can report how effective they are.
+
+    The cache could be bounded by the number of entries (`capacity`), by the memory (`max_bytes`, with `sizeof`
+    telling the bytes of a value), or both.
+    '''
+
+    def __init__(self, capacity: Optional[int] = 128, max_bytes: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = None):
+        assert capacity is None or capacity > 0, "capacity should be positive"
+        assert max_bytes is None or sizeof, "sizeof is needed to bound the memory"
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value) -> None:
+        if key in self._data:
+            self._pop(key)
+        self._data[key] = value
+        if self.sizeof:
+            self.nbytes += self.sizeof(value)
+        while self._overflow() and len(self._data) > 1:
+            self._pop(next(iter(self._data)))
+            self.evictions += 1
+
+    def get_or_create(self, key, create: Callable[[], Any]):
+        '''
+        Get the value of `key`, call `create` to build and insert it on a miss.
+        '''
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+        self.misses += 1
+        value = create()
+        self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.nbytes = 0
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(hits=self.hits, misses=self.misses, evictions=self.evictions, size=len(self._data),
+                    nbytes=self.nbytes)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _pop(self, key):
+        value = self._data.pop(key)
+        if self.sizeof:
+            self.nbytes -= self.sizeof(value)
+        return value
+
+    def _overflow(self) -> bool:
+        if self.capacity is not None and len(self._data) > self.capacity:
+            return True
+        return self.max_bytes is not None and self.nbytes > self.max_bytes
@@ -0,0 +1,27 @@
+'''
+The canvases the widgets draw onto.
+
+A Canvas is an ImageDraw keeping the Image it draws onto, so the pre-rendered pixels, such as the tiles of
+`matshow.sprites` and the bitmaps of `matshow.bitmaps`, are blitted by the public `Image.paste`. The other ImageDraws
+are drawn by the primitives of ImageDraw only. `matshow.create_canvas` creates a Canvas.
+'''
+from typing import *
+
+from PIL import Image, ImageDraw
+
+
+class Canvas(ImageDraw.ImageDraw):
+    '''
+    An ImageDraw with the Image it draws onto as `image`.
+    '''
+
+    def __init__(self, image: Image.Image, mode: Optional[str] = None):
+        super(Canvas, self).__init__(image, mode)
+        self.image = image
+
+
+def target_image(draw_: ImageDraw.ImageDraw) -> Optional[Image.Image]:
+    '''
+    The Image `draw_` draws onto, None if it is not a Canvas, then the callers fall back to the primitives.
+    '''
+    return draw_.image if isinstance(draw_, Canvas) else None
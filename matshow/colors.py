@@ -1,10 +1,25 @@
 # The color constant are borrowed from https://www.webucator.com/article/python-color-constants-module/
-# The code is not modified, all rights are reserved by the original authors.
+# The values are not modified, all rights are reserved by the original authors.
+'''
+Named colors.
+
+The named colors are kept in one compact table, `table()` is an (N, 3) uint8 array in the order of `NAMES`, it is built
+on the first use and shared. The constants such as `WHITE` are RGB tuples, and the arrays of colors could be packed to
+uint32 0xRRGGBB, e.g. for the palettes and the hashing of the raster backends.
+'''
+import functools
 import random
 from collections import OrderedDict, namedtuple
 
+# typing and numpy are imported for the type checkers only to keep importing the constants cheap, numpy is imported by
+# the first lookup. The checkers take any TYPE_CHECKING as true, so typing itself needn't be imported for it.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Iterable
+
+    import numpy as np
+
 Color = namedtuple('RGB', 'red, green, blue')
-colors = {}  # dict of colors
 
 
 class RGB(Color):
@@ -19,12 +34,12 @@ class RGB(Color):
 
 def rand_color() -> RGB:
     '''
-    Generate a random RGB color.
+    Generate a random RGB color, see `palette` for the colors distinct from each other.
     '''
-    return RGB(*[random.randint(0, 256) for i in range(3)])
+    return RGB(*[random.randint(0, 255) for i in range(3)])
 
 
-# Color Contants
+# Color Contants, sorted by name
 ALICEBLUE = RGB(240, 248, 255)
 ANTIQUEWHITE = RGB(250, 235, 215)
 ANTIQUEWHITE1 = RGB(255, 239, 219)
@@ -146,7 +161,6 @@ DEEPSKYBLUE2 = RGB(0, 178, 238)
 DEEPSKYBLUE3 = RGB(0, 154, 205)
 DEEPSKYBLUE4 = RGB(0, 104, 139)
 DIMGRAY = RGB(105, 105, 105)
-DIMGRAY = RGB(105, 105, 105)
 DODGERBLUE1 = RGB(30, 144, 255)
 DODGERBLUE2 = RGB(28, 134, 238)
 DODGERBLUE3 = RGB(24, 116, 205)
@@ -285,7 +299,6 @@ HOTPINK1 = RGB(255, 110, 180)
 HOTPINK2 = RGB(238, 106, 167)
 HOTPINK3 = RGB(205, 96, 144)
 HOTPINK4 = RGB(139, 58, 98)
-INDIANRED = RGB(176, 23, 31)
 INDIANRED = RGB(205, 92, 92)
 INDIANRED1 = RGB(255, 106, 106)
 INDIANRED2 = RGB(238, 99, 99)
@@ -574,564 +587,140 @@ WHEAT3 = RGB(205, 186, 150)
 WHEAT4 = RGB(139, 126, 102)
 WHITE = RGB(255, 255, 255)
 WHITESMOKE = RGB(245, 245, 245)
-WHITESMOKE = RGB(245, 245, 245)
 YELLOW1 = RGB(255, 255, 0)
 YELLOW2 = RGB(238, 238, 0)
 YELLOW3 = RGB(205, 205, 0)
 YELLOW4 = RGB(139, 139, 0)
-# Add colors to colors dictionary
-colors['aliceblue'] = ALICEBLUE
-colors['antiquewhite'] = ANTIQUEWHITE
-colors['antiquewhite1'] = ANTIQUEWHITE1
-colors['antiquewhite2'] = ANTIQUEWHITE2
-colors['antiquewhite3'] = ANTIQUEWHITE3
-colors['antiquewhite4'] = ANTIQUEWHITE4
-colors['aqua'] = AQUA
-colors['aquamarine1'] = AQUAMARINE1
-colors['aquamarine2'] = AQUAMARINE2
-colors['aquamarine3'] = AQUAMARINE3
-colors['aquamarine4'] = AQUAMARINE4
-colors['azure1'] = AZURE1
-colors['azure2'] = AZURE2
-colors['azure3'] = AZURE3
-colors['azure4'] = AZURE4
-colors['banana'] = BANANA
-colors['beige'] = BEIGE
-colors['bisque1'] = BISQUE1
-colors['bisque2'] = BISQUE2
-colors['bisque3'] = BISQUE3
-colors['bisque4'] = BISQUE4
-colors['black'] = BLACK
-colors['blanchedalmond'] = BLANCHEDALMOND
-colors['blue'] = BLUE
-colors['blue2'] = BLUE2
-colors['blue3'] = BLUE3
-colors['blue4'] = BLUE4
-colors['blueviolet'] = BLUEVIOLET
-colors['brick'] = BRICK
-colors['brown'] = BROWN
-colors['brown1'] = BROWN1
-colors['brown2'] = BROWN2
-colors['brown3'] = BROWN3
-colors['brown4'] = BROWN4
-colors['burlywood'] = BURLYWOOD
-colors['burlywood1'] = BURLYWOOD1
-colors['burlywood2'] = BURLYWOOD2
-colors['burlywood3'] = BURLYWOOD3
-colors['burlywood4'] = BURLYWOOD4
-colors['burntsienna'] = BURNTSIENNA
-colors['burntumber'] = BURNTUMBER
-colors['cadetblue'] = CADETBLUE
-colors['cadetblue1'] = CADETBLUE1
-colors['cadetblue2'] = CADETBLUE2
-colors['cadetblue3'] = CADETBLUE3
-colors['cadetblue4'] = CADETBLUE4
-colors['cadmiumorange'] = CADMIUMORANGE
-colors['cadmiumyellow'] = CADMIUMYELLOW
-colors['carrot'] = CARROT
-colors['chartreuse1'] = CHARTREUSE1
-colors['chartreuse2'] = CHARTREUSE2
-colors['chartreuse3'] = CHARTREUSE3
-colors['chartreuse4'] = CHARTREUSE4
-colors['chocolate'] = CHOCOLATE
-colors['chocolate1'] = CHOCOLATE1
-colors['chocolate2'] = CHOCOLATE2
-colors['chocolate3'] = CHOCOLATE3
-colors['chocolate4'] = CHOCOLATE4
-colors['cobalt'] = COBALT
-colors['cobaltgreen'] = COBALTGREEN
-colors['coldgrey'] = COLDGREY
-colors['coral'] = CORAL
-colors['coral1'] = CORAL1
-colors['coral2'] = CORAL2
-colors['coral3'] = CORAL3
-colors['coral4'] = CORAL4
-colors['cornflowerblue'] = CORNFLOWERBLUE
-colors['cornsilk1'] = CORNSILK1
-colors['cornsilk2'] = CORNSILK2
-colors['cornsilk3'] = CORNSILK3
-colors['cornsilk4'] = CORNSILK4
-colors['crimson'] = CRIMSON
-colors['cyan2'] = CYAN2
-colors['cyan3'] = CYAN3
-colors['cyan4'] = CYAN4
-colors['darkgoldenrod'] = DARKGOLDENROD
-colors['darkgoldenrod1'] = DARKGOLDENROD1
-colors['darkgoldenrod2'] = DARKGOLDENROD2
-colors['darkgoldenrod3'] = DARKGOLDENROD3
-colors['darkgoldenrod4'] = DARKGOLDENROD4
-colors['darkgray'] = DARKGRAY
-colors['darkgreen'] = DARKGREEN
-colors['darkkhaki'] = DARKKHAKI
-colors['darkolivegreen'] = DARKOLIVEGREEN
-colors['darkolivegreen1'] = DARKOLIVEGREEN1
-colors['darkolivegreen2'] = DARKOLIVEGREEN2
-colors['darkolivegreen3'] = DARKOLIVEGREEN3
-colors['darkolivegreen4'] = DARKOLIVEGREEN4
-colors['darkorange'] = DARKORANGE
-colors['darkorange1'] = DARKORANGE1
-colors['darkorange2'] = DARKORANGE2
-colors['darkorange3'] = DARKORANGE3
-colors['darkorange4'] = DARKORANGE4
-colors['darkorchid'] = DARKORCHID
-colors['darkorchid1'] = DARKORCHID1
-colors['darkorchid2'] = DARKORCHID2
-colors['darkorchid3'] = DARKORCHID3
-colors['darkorchid4'] = DARKORCHID4
-colors['darksalmon'] = DARKSALMON
-colors['darkseagreen'] = DARKSEAGREEN
-colors['darkseagreen1'] = DARKSEAGREEN1
-colors['darkseagreen2'] = DARKSEAGREEN2
-colors['darkseagreen3'] = DARKSEAGREEN3
-colors['darkseagreen4'] = DARKSEAGREEN4
-colors['darkslateblue'] = DARKSLATEBLUE
-colors['darkslategray'] = DARKSLATEGRAY
-colors['darkslategray1'] = DARKSLATEGRAY1
-colors['darkslategray2'] = DARKSLATEGRAY2
-colors['darkslategray3'] = DARKSLATEGRAY3
-colors['darkslategray4'] = DARKSLATEGRAY4
-colors['darkturquoise'] = DARKTURQUOISE
-colors['darkviolet'] = DARKVIOLET
-colors['deeppink1'] = DEEPPINK1
-colors['deeppink2'] = DEEPPINK2
-colors['deeppink3'] = DEEPPINK3
-colors['deeppink4'] = DEEPPINK4
-colors['deepskyblue1'] = DEEPSKYBLUE1
-colors['deepskyblue2'] = DEEPSKYBLUE2
-colors['deepskyblue3'] = DEEPSKYBLUE3
-colors['deepskyblue4'] = DEEPSKYBLUE4
-colors['dimgray'] = DIMGRAY
-colors['dimgray'] = DIMGRAY
-colors['dodgerblue1'] = DODGERBLUE1
-colors['dodgerblue2'] = DODGERBLUE2
-colors['dodgerblue3'] = DODGERBLUE3
-colors['dodgerblue4'] = DODGERBLUE4
-colors['eggshell'] = EGGSHELL
-colors['emeraldgreen'] = EMERALDGREEN
-colors['firebrick'] = FIREBRICK
-colors['firebrick1'] = FIREBRICK1
-colors['firebrick2'] = FIREBRICK2
-colors['firebrick3'] = FIREBRICK3
-colors['firebrick4'] = FIREBRICK4
-colors['flesh'] = FLESH
-colors['floralwhite'] = FLORALWHITE
-colors['forestgreen'] = FORESTGREEN
-colors['gainsboro'] = GAINSBORO
-colors['ghostwhite'] = GHOSTWHITE
-colors['gold1'] = GOLD1
-colors['gold2'] = GOLD2
-colors['gold3'] = GOLD3
-colors['gold4'] = GOLD4
-colors['goldenrod'] = GOLDENROD
-colors['goldenrod1'] = GOLDENROD1
-colors['goldenrod2'] = GOLDENROD2
-colors['goldenrod3'] = GOLDENROD3
-colors['goldenrod4'] = GOLDENROD4
-colors['gray'] = GRAY
-colors['gray1'] = GRAY1
-colors['gray10'] = GRAY10
-colors['gray11'] = GRAY11
-colors['gray12'] = GRAY12
-colors['gray13'] = GRAY13
-colors['gray14'] = GRAY14
-colors['gray15'] = GRAY15
-colors['gray16'] = GRAY16
-colors['gray17'] = GRAY17
-colors['gray18'] = GRAY18
-colors['gray19'] = GRAY19
-colors['gray2'] = GRAY2
-colors['gray20'] = GRAY20
-colors['gray21'] = GRAY21
-colors['gray22'] = GRAY22
-colors['gray23'] = GRAY23
-colors['gray24'] = GRAY24
-colors['gray25'] = GRAY25
-colors['gray26'] = GRAY26
-colors['gray27'] = GRAY27
-colors['gray28'] = GRAY28
-colors['gray29'] = GRAY29
-colors['gray3'] = GRAY3
-colors['gray30'] = GRAY30
-colors['gray31'] = GRAY31
-colors['gray32'] = GRAY32
-colors['gray33'] = GRAY33
-colors['gray34'] = GRAY34
-colors['gray35'] = GRAY35
-colors['gray36'] = GRAY36
-colors['gray37'] = GRAY37
-colors['gray38'] = GRAY38
-colors['gray39'] = GRAY39
-colors['gray4'] = GRAY4
-colors['gray40'] = GRAY40
-colors['gray42'] = GRAY42
-colors['gray43'] = GRAY43
-colors['gray44'] = GRAY44
-colors['gray45'] = GRAY45
-colors['gray46'] = GRAY46
-colors['gray47'] = GRAY47
-colors['gray48'] = GRAY48
-colors['gray49'] = GRAY49
-colors['gray5'] = GRAY5
-colors['gray50'] = GRAY50
-colors['gray51'] = GRAY51
-colors['gray52'] = GRAY52
-colors['gray53'] = GRAY53
-colors['gray54'] = GRAY54
-colors['gray55'] = GRAY55
-colors['gray56'] = GRAY56
-colors['gray57'] = GRAY57
-colors['gray58'] = GRAY58
-colors['gray59'] = GRAY59
-colors['gray6'] = GRAY6
-colors['gray60'] = GRAY60
-colors['gray61'] = GRAY61
-colors['gray62'] = GRAY62
-colors['gray63'] = GRAY63
-colors['gray64'] = GRAY64
-colors['gray65'] = GRAY65
-colors['gray66'] = GRAY66
-colors['gray67'] = GRAY67
-colors['gray68'] = GRAY68
-colors['gray69'] = GRAY69
-colors['gray7'] = GRAY7
-colors['gray70'] = GRAY70
-colors['gray71'] = GRAY71
-colors['gray72'] = GRAY72
-colors['gray73'] = GRAY73
-colors['gray74'] = GRAY74
-colors['gray75'] = GRAY75
-colors['gray76'] = GRAY76
-colors['gray77'] = GRAY77
-colors['gray78'] = GRAY78
-colors['gray79'] = GRAY79
-colors['gray8'] = GRAY8
-colors['gray80'] = GRAY80
-colors['gray81'] = GRAY81
-colors['gray82'] = GRAY82
-colors['gray83'] = GRAY83
-colors['gray84'] = GRAY84
-colors['gray85'] = GRAY85
-colors['gray86'] = GRAY86
-colors['gray87'] = GRAY87
-colors['gray88'] = GRAY88
-colors['gray89'] = GRAY89
-colors['gray9'] = GRAY9
-colors['gray90'] = GRAY90
-colors['gray91'] = GRAY91
-colors['gray92'] = GRAY92
-colors['gray93'] = GRAY93
-colors['gray94'] = GRAY94
-colors['gray95'] = GRAY95
-colors['gray97'] = GRAY97
-colors['gray98'] = GRAY98
-colors['gray99'] = GRAY99
-colors['green'] = GREEN
-colors['green1'] = GREEN1
-colors['green2'] = GREEN2
-colors['green3'] = GREEN3
-colors['green4'] = GREEN4
-colors['greenyellow'] = GREENYELLOW
-colors['honeydew1'] = HONEYDEW1
-colors['honeydew2'] = HONEYDEW2
-colors['honeydew3'] = HONEYDEW3
-colors['honeydew4'] = HONEYDEW4
-colors['hotpink'] = HOTPINK
-colors['hotpink1'] = HOTPINK1
-colors['hotpink2'] = HOTPINK2
-colors['hotpink3'] = HOTPINK3
-colors['hotpink4'] = HOTPINK4
-colors['indianred'] = INDIANRED
-colors['indianred'] = INDIANRED
-colors['indianred1'] = INDIANRED1
-colors['indianred2'] = INDIANRED2
-colors['indianred3'] = INDIANRED3
-colors['indianred4'] = INDIANRED4
-colors['indigo'] = INDIGO
-colors['ivory1'] = IVORY1
-colors['ivory2'] = IVORY2
-colors['ivory3'] = IVORY3
-colors['ivory4'] = IVORY4
-colors['ivoryblack'] = IVORYBLACK
-colors['khaki'] = KHAKI
-colors['khaki1'] = KHAKI1
-colors['khaki2'] = KHAKI2
-colors['khaki3'] = KHAKI3
-colors['khaki4'] = KHAKI4
-colors['lavender'] = LAVENDER
-colors['lavenderblush1'] = LAVENDERBLUSH1
-colors['lavenderblush2'] = LAVENDERBLUSH2
-colors['lavenderblush3'] = LAVENDERBLUSH3
-colors['lavenderblush4'] = LAVENDERBLUSH4
-colors['lawngreen'] = LAWNGREEN
-colors['lemonchiffon1'] = LEMONCHIFFON1
-colors['lemonchiffon2'] = LEMONCHIFFON2
-colors['lemonchiffon3'] = LEMONCHIFFON3
-colors['lemonchiffon4'] = LEMONCHIFFON4
-colors['lightblue'] = LIGHTBLUE
-colors['lightblue1'] = LIGHTBLUE1
-colors['lightblue2'] = LIGHTBLUE2
-colors['lightblue3'] = LIGHTBLUE3
-colors['lightblue4'] = LIGHTBLUE4
-colors['lightcoral'] = LIGHTCORAL
-colors['lightcyan1'] = LIGHTCYAN1
-colors['lightcyan2'] = LIGHTCYAN2
-colors['lightcyan3'] = LIGHTCYAN3
-colors['lightcyan4'] = LIGHTCYAN4
-colors['lightgoldenrod1'] = LIGHTGOLDENROD1
-colors['lightgoldenrod2'] = LIGHTGOLDENROD2
-colors['lightgoldenrod3'] = LIGHTGOLDENROD3
-colors['lightgoldenrod4'] = LIGHTGOLDENROD4
-colors['lightgoldenrodyellow'] = LIGHTGOLDENRODYELLOW
-colors['lightgrey'] = LIGHTGREY
-colors['lightpink'] = LIGHTPINK
-colors['lightpink1'] = LIGHTPINK1
-colors['lightpink2'] = LIGHTPINK2
-colors['lightpink3'] = LIGHTPINK3
-colors['lightpink4'] = LIGHTPINK4
-colors['lightsalmon1'] = LIGHTSALMON1
-colors['lightsalmon2'] = LIGHTSALMON2
-colors['lightsalmon3'] = LIGHTSALMON3
-colors['lightsalmon4'] = LIGHTSALMON4
-colors['lightseagreen'] = LIGHTSEAGREEN
-colors['lightskyblue'] = LIGHTSKYBLUE
-colors['lightskyblue1'] = LIGHTSKYBLUE1
-colors['lightskyblue2'] = LIGHTSKYBLUE2
-colors['lightskyblue3'] = LIGHTSKYBLUE3
-colors['lightskyblue4'] = LIGHTSKYBLUE4
-colors['lightslateblue'] = LIGHTSLATEBLUE
-colors['lightslategray'] = LIGHTSLATEGRAY
-colors['lightsteelblue'] = LIGHTSTEELBLUE
-colors['lightsteelblue1'] = LIGHTSTEELBLUE1
-colors['lightsteelblue2'] = LIGHTSTEELBLUE2
-colors['lightsteelblue3'] = LIGHTSTEELBLUE3
-colors['lightsteelblue4'] = LIGHTSTEELBLUE4
-colors['lightyellow1'] = LIGHTYELLOW1
-colors['lightyellow2'] = LIGHTYELLOW2
-colors['lightyellow3'] = LIGHTYELLOW3
-colors['lightyellow4'] = LIGHTYELLOW4
-colors['limegreen'] = LIMEGREEN
-colors['linen'] = LINEN
-colors['magenta'] = MAGENTA
-colors['magenta2'] = MAGENTA2
-colors['magenta3'] = MAGENTA3
-colors['magenta4'] = MAGENTA4
-colors['manganeseblue'] = MANGANESEBLUE
-colors['maroon'] = MAROON
-colors['maroon1'] = MAROON1
-colors['maroon2'] = MAROON2
-colors['maroon3'] = MAROON3
-colors['maroon4'] = MAROON4
-colors['mediumorchid'] = MEDIUMORCHID
-colors['mediumorchid1'] = MEDIUMORCHID1
-colors['mediumorchid2'] = MEDIUMORCHID2
-colors['mediumorchid3'] = MEDIUMORCHID3
-colors['mediumorchid4'] = MEDIUMORCHID4
-colors['mediumpurple'] = MEDIUMPURPLE
-colors['mediumpurple1'] = MEDIUMPURPLE1
-colors['mediumpurple2'] = MEDIUMPURPLE2
-colors['mediumpurple3'] = MEDIUMPURPLE3
-colors['mediumpurple4'] = MEDIUMPURPLE4
-colors['mediumseagreen'] = MEDIUMSEAGREEN
-colors['mediumslateblue'] = MEDIUMSLATEBLUE
-colors['mediumspringgreen'] = MEDIUMSPRINGGREEN
-colors['mediumturquoise'] = MEDIUMTURQUOISE
-colors['mediumvioletred'] = MEDIUMVIOLETRED
-colors['melon'] = MELON
-colors['midnightblue'] = MIDNIGHTBLUE
-colors['mint'] = MINT
-colors['mintcream'] = MINTCREAM
-colors['mistyrose1'] = MISTYROSE1
-colors['mistyrose2'] = MISTYROSE2
-colors['mistyrose3'] = MISTYROSE3
-colors['mistyrose4'] = MISTYROSE4
-colors['moccasin'] = MOCCASIN
-colors['navajowhite1'] = NAVAJOWHITE1
-colors['navajowhite2'] = NAVAJOWHITE2
-colors['navajowhite3'] = NAVAJOWHITE3
-colors['navajowhite4'] = NAVAJOWHITE4
-colors['navy'] = NAVY
-colors['oldlace'] = OLDLACE
-colors['olive'] = OLIVE
-colors['olivedrab'] = OLIVEDRAB
-colors['olivedrab1'] = OLIVEDRAB1
-colors['olivedrab2'] = OLIVEDRAB2
-colors['olivedrab3'] = OLIVEDRAB3
-colors['olivedrab4'] = OLIVEDRAB4
-colors['orange'] = ORANGE
-colors['orange1'] = ORANGE1
-colors['orange2'] = ORANGE2
-colors['orange3'] = ORANGE3
-colors['orange4'] = ORANGE4
-colors['orangered1'] = ORANGERED1
-colors['orangered2'] = ORANGERED2
-colors['orangered3'] = ORANGERED3
-colors['orangered4'] = ORANGERED4
-colors['orchid'] = ORCHID
-colors['orchid1'] = ORCHID1
-colors['orchid2'] = ORCHID2
-colors['orchid3'] = ORCHID3
-colors['orchid4'] = ORCHID4
-colors['palegoldenrod'] = PALEGOLDENROD
-colors['palegreen'] = PALEGREEN
-colors['palegreen1'] = PALEGREEN1
-colors['palegreen2'] = PALEGREEN2
-colors['palegreen3'] = PALEGREEN3
-colors['palegreen4'] = PALEGREEN4
-colors['paleturquoise1'] = PALETURQUOISE1
-colors['paleturquoise2'] = PALETURQUOISE2
-colors['paleturquoise3'] = PALETURQUOISE3
-colors['paleturquoise4'] = PALETURQUOISE4
-colors['palevioletred'] = PALEVIOLETRED
-colors['palevioletred1'] = PALEVIOLETRED1
-colors['palevioletred2'] = PALEVIOLETRED2
-colors['palevioletred3'] = PALEVIOLETRED3
-colors['palevioletred4'] = PALEVIOLETRED4
-colors['papayawhip'] = PAPAYAWHIP
-colors['peachpuff1'] = PEACHPUFF1
-colors['peachpuff2'] = PEACHPUFF2
-colors['peachpuff3'] = PEACHPUFF3
-colors['peachpuff4'] = PEACHPUFF4
-colors['peacock'] = PEACOCK
-colors['pink'] = PINK
-colors['pink1'] = PINK1
-colors['pink2'] = PINK2
-colors['pink3'] = PINK3
-colors['pink4'] = PINK4
-colors['plum'] = PLUM
-colors['plum1'] = PLUM1
-colors['plum2'] = PLUM2
-colors['plum3'] = PLUM3
-colors['plum4'] = PLUM4
-colors['powderblue'] = POWDERBLUE
-colors['purple'] = PURPLE
-colors['purple1'] = PURPLE1
-colors['purple2'] = PURPLE2
-colors['purple3'] = PURPLE3
-colors['purple4'] = PURPLE4
-colors['raspberry'] = RASPBERRY
-colors['rawsienna'] = RAWSIENNA
-colors['red1'] = RED1
-colors['red2'] = RED2
-colors['red3'] = RED3
-colors['red4'] = RED4
-colors['rosybrown'] = ROSYBROWN
-colors['rosybrown1'] = ROSYBROWN1
-colors['rosybrown2'] = ROSYBROWN2
-colors['rosybrown3'] = ROSYBROWN3
-colors['rosybrown4'] = ROSYBROWN4
-colors['royalblue'] = ROYALBLUE
-colors['royalblue1'] = ROYALBLUE1
-colors['royalblue2'] = ROYALBLUE2
-colors['royalblue3'] = ROYALBLUE3
-colors['royalblue4'] = ROYALBLUE4
-colors['salmon'] = SALMON
-colors['salmon1'] = SALMON1
-colors['salmon2'] = SALMON2
-colors['salmon3'] = SALMON3
-colors['salmon4'] = SALMON4
-colors['sandybrown'] = SANDYBROWN
-colors['sapgreen'] = SAPGREEN
-colors['seagreen1'] = SEAGREEN1
-colors['seagreen2'] = SEAGREEN2
-colors['seagreen3'] = SEAGREEN3
-colors['seagreen4'] = SEAGREEN4
-colors['seashell1'] = SEASHELL1
-colors['seashell2'] = SEASHELL2
-colors['seashell3'] = SEASHELL3
-colors['seashell4'] = SEASHELL4
-colors['sepia'] = SEPIA
-colors['sgibeet'] = SGIBEET
-colors['sgibrightgray'] = SGIBRIGHTGRAY
-colors['sgichartreuse'] = SGICHARTREUSE
-colors['sgidarkgray'] = SGIDARKGRAY
-colors['sgigray12'] = SGIGRAY12
-colors['sgigray16'] = SGIGRAY16
-colors['sgigray32'] = SGIGRAY32
-colors['sgigray36'] = SGIGRAY36
-colors['sgigray52'] = SGIGRAY52
-colors['sgigray56'] = SGIGRAY56
-colors['sgigray72'] = SGIGRAY72
-colors['sgigray76'] = SGIGRAY76
-colors['sgigray92'] = SGIGRAY92
-colors['sgigray96'] = SGIGRAY96
-colors['sgilightblue'] = SGILIGHTBLUE
-colors['sgilightgray'] = SGILIGHTGRAY
-colors['sgiolivedrab'] = SGIOLIVEDRAB
-colors['sgisalmon'] = SGISALMON
-colors['sgislateblue'] = SGISLATEBLUE
-colors['sgiteal'] = SGITEAL
-colors['sienna'] = SIENNA
-colors['sienna1'] = SIENNA1
-colors['sienna2'] = SIENNA2
-colors['sienna3'] = SIENNA3
-colors['sienna4'] = SIENNA4
-colors['silver'] = SILVER
-colors['skyblue'] = SKYBLUE
-colors['skyblue1'] = SKYBLUE1
-colors['skyblue2'] = SKYBLUE2
-colors['skyblue3'] = SKYBLUE3
-colors['skyblue4'] = SKYBLUE4
-colors['slateblue'] = SLATEBLUE
-colors['slateblue1'] = SLATEBLUE1
-colors['slateblue2'] = SLATEBLUE2
-colors['slateblue3'] = SLATEBLUE3
-colors['slateblue4'] = SLATEBLUE4
-colors['slategray'] = SLATEGRAY
-colors['slategray1'] = SLATEGRAY1
-colors['slategray2'] = SLATEGRAY2
-colors['slategray3'] = SLATEGRAY3
-colors['slategray4'] = SLATEGRAY4
-colors['snow1'] = SNOW1
-colors['snow2'] = SNOW2
-colors['snow3'] = SNOW3
-colors['snow4'] = SNOW4
-colors['springgreen'] = SPRINGGREEN
-colors['springgreen1'] = SPRINGGREEN1
-colors['springgreen2'] = SPRINGGREEN2
-colors['springgreen3'] = SPRINGGREEN3
-colors['steelblue'] = STEELBLUE
-colors['steelblue1'] = STEELBLUE1
-colors['steelblue2'] = STEELBLUE2
-colors['steelblue3'] = STEELBLUE3
-colors['steelblue4'] = STEELBLUE4
-colors['tan'] = TAN
-colors['tan1'] = TAN1
-colors['tan2'] = TAN2
-colors['tan3'] = TAN3
-colors['tan4'] = TAN4
-colors['teal'] = TEAL
-colors['thistle'] = THISTLE
-colors['thistle1'] = THISTLE1
-colors['thistle2'] = THISTLE2
-colors['thistle3'] = THISTLE3
-colors['thistle4'] = THISTLE4
-colors['tomato1'] = TOMATO1
-colors['tomato2'] = TOMATO2
-colors['tomato3'] = TOMATO3
-colors['tomato4'] = TOMATO4
-colors['turquoise'] = TURQUOISE
-colors['turquoise1'] = TURQUOISE1
-colors['turquoise2'] = TURQUOISE2
-colors['turquoise3'] = TURQUOISE3
-colors['turquoise4'] = TURQUOISE4
-colors['turquoiseblue'] = TURQUOISEBLUE
-colors['violet'] = VIOLET
-colors['violetred'] = VIOLETRED
-colors['violetred1'] = VIOLETRED1
-colors['violetred2'] = VIOLETRED2
-colors['violetred3'] = VIOLETRED3
-colors['violetred4'] = VIOLETRED4
-colors['warmgrey'] = WARMGREY
-colors['wheat'] = WHEAT
-colors['wheat1'] = WHEAT1
-colors['wheat2'] = WHEAT2
-colors['wheat3'] = WHEAT3
-colors['wheat4'] = WHEAT4
-colors['white'] = WHITE
-colors['whitesmoke'] = WHITESMOKE
-colors['whitesmoke'] = WHITESMOKE
-colors['yellow1'] = YELLOW1
-colors['yellow2'] = YELLOW2
-colors['yellow3'] = YELLOW3
-colors['yellow4'] = YELLOW4
-colors = OrderedDict(sorted(colors.items(), key=lambda t: t[0]))
+
+# The names of the colors in the order of the constants, the rows of `table()`.
+NAMES = tuple(name.lower() for name, value in globals().items() if isinstance(value, RGB))
+# The name -> the row in `table()`.
+INDEX = {name: i for i, name in enumerate(NAMES)}
+# dict of colors
+colors = OrderedDict((name, globals()[name.upper()]) for name in NAMES)
+_PACKED = tuple((rgb.red << 16) | (rgb.green << 8) | rgb.blue for rgb in colors.values())
+
+
+@functools.lru_cache(maxsize=None)
+def table() -> "np.ndarray":
+    '''
+    The (N, 3) uint8 colors in the order of `NAMES`, it is read-only.
+    '''
+    import numpy as np
+
+    rgb = unpack(np.array(_PACKED, dtype=np.uint32))
+    rgb.flags.writeable = False
+    return rgb
+
+
+def pack(rgb) -> "np.ndarray":
+    '''
+    Pack the (..., 3) colors into (...) uint32 0xRRGGBB.
+    '''
+    import numpy as np
+
+    rgb = np.asarray(rgb).astype(np.uint32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+
+def unpack(packed) -> "np.ndarray":
+    '''
+    Unpack the uint32 0xRRGGBB into (..., 3) uint8 colors.
+    '''
+    import numpy as np
+
+    packed = np.asarray(packed, dtype=np.uint32)
+    return np.stack([packed >> 16, packed >> 8, packed], axis=-1).astype(np.uint8)
+
+
+def lookup(names: "Iterable[str]") -> "np.ndarray":
+    '''
+    Get the (N, 3) uint8 colors of the names, case insensitive.
+    '''
+    rows = []
+    for name in names:
+        row = INDEX.get(name.lower())
+        assert row is not None, "unknown color %s" % name
+        rows.append(row)
+    return table()[rows]
+
+
+def nearest(rgb, chunk: int = 4096) -> "np.ndarray":
+    '''
+    Find the named colors nearest to the (..., 3) colors in the RGB space, returns the (...) rows in `table()`, e.g.
+    `NAMES[i]` is the name. The distinct colors are matched `chunk` at a time.
+    '''
+    import numpy as np
+
+    rgb = np.asarray(rgb)
+    keys, inverse = np.unique(pack(rgb).reshape(-1), return_inverse=True)
+    # |a - b|^2 = |a|^2 - 2 a.b + |b|^2, the float32 sums of the 8-bit channels are exact.
+    named = table().astype(np.float32)
+    named_norm = (named ** 2).sum(axis=1)
+    rows = np.empty(len(keys), dtype=np.intp)
+    for start in range(0, len(keys), chunk):
+        block = unpack(keys[start:start + chunk]).astype(np.float32)
+        distances = named_norm[None, :] - 2 * block @ named.T
+        rows[start:start + chunk] = distances.argmin(axis=1)
+    return rows[inverse.reshape(-1)].reshape(rgb.shape[:-1])
+
+
+# The steps of the low-discrepancy sequences of the hue, lightness and chroma, the fractional parts of the golden ratio,
+# sqrt(2) and the plastic number, so any run of the colors spreads evenly and the neighbors differ the most.
+_HUE_STEP = 0.6180339887498949
+_LIGHTNESS_STEP = 0.41421356237309515
+_CHROMA_STEP = 0.7548776662466927
+# The ranges in OKLab, dark enough for the light texts on the cells and saturated enough to tell apart.
+_LIGHTNESS = (0.42, 0.72)
+_CHROMA = (0.08, 0.16)
+
+# OKLab -> LMS and linear LMS -> linear sRGB, by Björn Ottosson.
+_OKLAB_TO_LMS = ((1, 0.3963377774, 0.2158037573), (1, -0.1055613458, -0.0638541728), (1, -0.0894841775, -1.2914855480))
+_LMS_TO_RGB = ((4.0767416621, -3.3077115913, 0.2309699292), (-1.2684380046, 2.6097574011, -0.3413193965),
+               (-0.0041960863, -0.7034186147, 1.7076147010))
+
+
+@functools.lru_cache(maxsize=64)
+def palette(n: int, seed: int = 0) -> "np.ndarray":
+    '''
+    Generate `n` colors distinct from each other as an (n, 3) uint8 array, e.g. one per thread of a CTA, it is
+    read-only and cached per (n, seed).
+
+    The colors walk the hue, lightness and chroma of OKLab, a perceptually uniform space, by low-discrepancy sequences,
+    so the consecutive colors are far apart and the first k of them stay spread for any k. The seed shifts the
+    sequences by a generator of its own, the global random state is left untouched.
+    '''
+    import numpy as np
+
+    assert n >= 0, "expect a non-negative number of colors, got %d" % n
+    hue0, lightness0, chroma0 = np.random.default_rng(seed).random(3)
+    i = np.arange(n, dtype=np.float64)
+    hue = 2 * np.pi * ((hue0 + i * _HUE_STEP) % 1)
+    lightness = (lightness0 + i * _LIGHTNESS_STEP) % 1
+    chroma = _CHROMA[0] + (_CHROMA[1] - _CHROMA[0]) * ((chroma0 + i * _CHROMA_STEP) % 1)
+    rgb = _oklch_to_rgb(_LIGHTNESS[0] + (_LIGHTNESS[1] - _LIGHTNESS[0]) * lightness, chroma, hue)
+
+    # The thousands of colors might round to the same bytes, the later ones are nudged in lightness until distinct.
+    for _ in range(64):
+        _, first = np.unique(pack(rgb), return_index=True)
+        duplicated = np.ones(n, dtype=bool)
+        duplicated[first] = False
+        if not duplicated.any():
+            break
+        lightness[duplicated] = (lightness[duplicated] + _LIGHTNESS_STEP / 64) % 1
+        rgb[duplicated] = _oklch_to_rgb(_LIGHTNESS[0] + (_LIGHTNESS[1] - _LIGHTNESS[0]) * lightness[duplicated],
+                                        chroma[duplicated], hue[duplicated])
+    rgb.flags.writeable = False
+    return rgb
+
+
+def _oklch_to_rgb(lightness: "np.ndarray", chroma: "np.ndarray", hue: "np.ndarray") -> "np.ndarray":
+    '''
+    Convert the OKLab colors in polar coordinates to (N, 3) uint8 sRGB, the colors out of the gamut are clipped.
+    '''
+    import numpy as np
+
+    lab = np.stack([lightness, chroma * np.cos(hue), chroma * np.sin(hue)], axis=1)
+    linear = np.clip((lab @ np.array(_OKLAB_TO_LMS).T) ** 3 @ np.array(_LMS_TO_RGB).T, 0, 1)
+    srgb = np.where(linear <= 0.0031308, 12.92 * linear, 1.055 * linear ** (1 / 2.4) - 0.055)
+    return np.round(srgb * 255).astype(np.uint8)
@@ -0,0 +1,335 @@
+'''
+Flattened display list of a widget tree.
+
+A widget tree compiles into a flat list of primitives in painting order, the geometry is stored as numpy arrays of
+absolute rectangles, so redrawing a frame is a linear scan without walking the tree or computing offsets again. The
+backends (raster, SVG, tiles) all read the same list.
+'''
+import collections
+import copy
+from typing import *
+
+import numpy as np
+from PIL import ImageColor, ImageDraw
+
+from matshow.colors import pack, unpack
+from matshow.sprites import sprites
+from matshow.text import atlas as text_atlas
+
+# The kinds of primitives.
+RECT = 0
+TEXT = 1
+# A grid of cells drawn by its owner's `draw_cells`, the cells of a compact Matrix live in its arrays.
+GRID = 2
+
+# A (left, top, right, bottom) in pixels, the right and bottom are exclusive.
+Region = Tuple[int, int, int, int]
+
+TextItem = NamedTuple("TextItem", [("x", int), ("y", int), ("content", str), ("fontsize", int), ("fill", Any),
+                                   ("direction", str)])
+
+
+def to_rgb(color) -> Optional[Tuple[int, int, int]]:
+    '''
+    Normalize a color to an (r, g, b) tuple, None stays None.
+    '''
+    if color is None:
+        return None
+    if isinstance(color, str):
+        return ImageColor.getrgb(color)[:3]
+    return tuple(color[:3])
+
+
+class DisplayListBuilder:
+    '''
+    Collect the primitives emitted by `Widget.compile_into`.
+    '''
+
+    def __init__(self):
+        self.kinds: List[int] = []
+        self.rects: List[Tuple[int, int, int, int]] = []
+        self.borders: List[int] = []
+        self.owners: List[Any] = []
+        self.texts: List[TextItem] = []
+        self.text_index: List[int] = []
+
+    def rectangle(self, owner, coor: Sequence[int], border: int) -> None:
+        '''
+        Emit a rectangle whose fill and outline are read from `owner`.
+        '''
+        self.kinds.append(RECT)
+        self.rects.append(tuple(coor))
+        self.borders.append(border)
+        self.owners.append(owner)
+        self.text_index.append(-1)
+
+    def grid(self, owner, coor: Sequence[int]) -> None:
+        '''
+        Emit a grid of cells, `owner.draw_cells(draw_, (x0, y0))` draws it.
+        '''
+        self.kinds.append(GRID)
+        self.rects.append(tuple(coor))
+        self.borders.append(0)
+        self.owners.append(owner)
+        self.text_index.append(-1)
+
+    def text(self, owner, xy: Tuple[int, int], txt) -> None:
+        self.kinds.append(TEXT)
+        self.rects.append((xy[0], xy[1], xy[0] + txt.size[0], xy[1] + txt.size[1]))
+        self.borders.append(0)
+        self.owners.append(owner)
+        self.text_index.append(len(self.texts))
+        self.texts.append(TextItem(
+            xy[0], xy[1], txt.content, txt.fontsize, txt.fill, txt.direction))
+
+    def build(self) -> "DisplayList":
+        return DisplayList(self)
+
+
+class DisplayList:
+    '''
+    The compiled primitives, row i of each array describes the i-th primitive in painting order.
+
+    kinds: (N,) int8, RECT, TEXT or GRID.
+    rects: (N, 4) int64 absolute (x0, y0, x1, y1), the x1, y1 are inclusive as `ImageDraw.rectangle`.
+    fill, outline: (N, 3) uint8, valid where has_fill/has_outline is True.
+    border: (N,) int32, the outline width.
+    text_index: (N,) int32, the row in `texts` for a TEXT primitive, -1 otherwise.
+    '''
+    # The distinct damages tracked until the next refresh, more repaint everything.
+    MAX_DAMAGE = 4096
+
+    def __init__(self, builder: DisplayListBuilder):
+        n = len(builder.kinds)
+        self.kinds = np.array(builder.kinds, dtype=np.int8)
+        self.rects = np.array(builder.rects, dtype=np.int64).reshape(n, 4)
+        self.border = np.array(builder.borders, dtype=np.int32)
+        self.text_index = np.array(builder.text_index, dtype=np.int32)
+        self.texts: List[TextItem] = builder.texts
+        self.owners = builder.owners
+        self.fill = np.zeros((n, 3), dtype=np.uint8)
+        self.outline = np.zeros((n, 3), dtype=np.uint8)
+        self.has_fill = np.zeros(n, dtype=bool)
+        self.has_outline = np.zeros(n, dtype=bool)
+        for i in np.flatnonzero(self.kinds == RECT):
+            self._read_style(i)
+        # (id(owner), cell) -> the (owner, cell) changed since the styles were read, see `damage`.
+        self._damaged: Dict[Tuple[int, Optional[int]], Tuple[Any, Optional[int]]] = {}
+        # Whether more changed than `MAX_DAMAGE` could track, all is read and repainted then.
+        self._damaged_all = False
+        # id(owner) -> the rows of its primitives, built on the first damage.
+        self._owner_rows: Optional[Dict[int, List[int]]] = None
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        '''
+        The (width, height) covering all the primitives.
+        '''
+        if not len(self):
+            return 0, 0
+        return int(self.rects[:, 2].max()) + 1, int(self.rects[:, 3].max()) + 1
+
+    def colors(self) -> List[Tuple[int, int, int]]:
+        '''
+        The distinct colors painted by the primitives, e.g. the palette of an indexed canvas.
+        '''
+        texts = [to_rgb(txt.fill) for txt in self.texts if txt.fill is not None]
+        arrays = [self.fill[self.has_fill], self.outline[self.has_outline],
+                  np.array(texts, dtype=np.uint8).reshape(-1, 3)]
+        arrays.extend(self.owners[i].cell_colors() for i in np.flatnonzero(self.kinds == GRID).tolist())
+        rgb = np.concatenate(arrays)
+        return [tuple(color) for color in unpack(np.unique(pack(rgb))).tolist()]
+
+    def snapshot(self) -> "DisplayList":
+        '''
+        A copy detached from the widgets, the styles are frozen and the cells of the grids are copied, so it could be
+        drawn later or pickled to another process. The damage should be refreshed before.
+        '''
+        snapshot = copy.copy(self)
+        for name in ("fill", "outline", "has_fill", "has_outline"):
+            setattr(snapshot, name, getattr(self, name).copy())
+        snapshot.owners = [owner.detach_cells() if kind == GRID else None
+                           for kind, owner in zip(self.kinds.tolist(), self.owners)]
+        snapshot._damaged, snapshot._damaged_all, snapshot._owner_rows = {}, False, None
+        return snapshot
+
+    def damage(self, owner, cell: Optional[int] = None) -> None:
+        '''
+        Record that the pixels of `owner` changed without touching the geometry, e.g. a color, `cell` is the flat
+        offset of the changed cell if the owner is a compact Matrix.
+
+        The repeated changes of a cell are recorded once, and beyond `MAX_DAMAGE` distinct ones the whole list is
+        repainted, so the damage stays bounded if the list is not refreshed, e.g. the tree is only drawn.
+        '''
+        if self._damaged_all:
+            return
+        self._damaged[(id(owner), cell)] = (owner, cell)
+        if len(self._damaged) > DisplayList.MAX_DAMAGE:
+            self._damaged.clear()
+            self._damaged_all = True
+
+    def refresh_styles(self) -> List[Region]:
+        '''
+        Read the fill and outline of the damaged rectangles from their widgets again, returns the regions to repaint.
+        '''
+        if self._damaged_all:
+            self._damaged_all = False
+            for i in np.flatnonzero(self.kinds == RECT):
+                self._read_style(i)
+            return [(0, 0) + self.size]
+        if not self._damaged:
+            return []
+        if self._owner_rows is None:
+            self._owner_rows = {}
+            for i, owner in enumerate(self.owners):
+                self._owner_rows.setdefault(id(owner), []).append(i)
+        regions = []
+        for owner, cell in self._damaged.values():
+            for i in self._owner_rows.get(id(owner), ()):
+                x0, y0, x1, y1 = self.rects[i].tolist()
+                if cell is not None:
+                    # Only the cell of the grid changed.
+                    if self.kinds[i] == GRID:
+                        regions.append(owner.cell_region((x0, y0), cell))
+                    continue
+                if self.kinds[i] == RECT:
+                    self._read_style(i)
+                regions.append((x0, y0, x1 + 1, y1 + 1))
+        self._damaged.clear()
+        return regions
+
+    def diff(self, other: "DisplayList") -> Optional[List[Region]]:
+        '''
+        Get the regions where `other`, compiled again from the same tree, draws differently from this list, None if the
+        geometry changed and all should be repainted. Only the texts could be added or removed between them.
+        '''
+        regions = self.refresh_styles()
+        mine, theirs = self.kinds != TEXT, other.kinds != TEXT
+        if mine.sum() != theirs.sum():
+            return None
+        rows, other_rows = np.flatnonzero(mine), np.flatnonzero(theirs)
+        if not (np.array_equal(self.kinds[rows], other.kinds[other_rows]) and
+                np.array_equal(self.rects[rows], other.rects[other_rows]) and
+                np.array_equal(self.border[rows], other.border[other_rows]) and
+                all(self.owners[i] is other.owners[j] for i, j in zip(rows.tolist(), other_rows.tolist()))):
+            return None
+
+        changed = (self.has_fill[rows] != other.has_fill[other_rows]) | \
+            (self.has_outline[rows] != other.has_outline[other_rows]) | \
+            (self.fill[rows] != other.fill[other_rows]).any(axis=1) | \
+            (self.outline[rows] != other.outline[other_rows]).any(axis=1)
+        for x0, y0, x1, y1 in other.rects[other_rows[changed]].tolist():
+            regions.append((x0, y0, x1 + 1, y1 + 1))
+
+        texts = collections.Counter(self._text_items())
+        texts.subtract(other._text_items())
+        for key, count in texts.items():
+            if count:
+                x0, y0, x1, y1 = key[:4]
+                regions.append((x0, y0, x1 + 1, y1 + 1))
+        return regions
+
+    def _text_items(self) -> Iterable[tuple]:
+        '''
+        The hashable keys of the texts, i.e. the rectangle followed by the content and style.
+        '''
+        for i in np.flatnonzero(self.kinds == TEXT).tolist():
+            txt = self.texts[self.text_index[i]]
+            yield tuple(self.rects[i].tolist()) + (txt.content, txt.fontsize, to_rgb(txt.fill), txt.direction)
+
+    def draw(self, draw_: ImageDraw.ImageDraw, offset: Tuple[int, int] = (0, 0),
+             indices: Optional[Iterable[int]] = None) -> None:
+        '''
+        Replay the primitives to a canvas, `indices` limits to a subset of primitives in painting order.
+        '''
+        rows = np.arange(len(self)) if indices is None else np.asarray(
+            list(indices), dtype=np.int64)
+        # Convert only the selected rows, a tile of a huge scene touches a few of them.
+        rects = (self.rects[rows] + np.array(offset * 2)).tolist()
+        fill = self.fill[rows].tolist()
+        outline = self.outline[rows].tolist()
+        border = self.border[rows].tolist()
+        kinds = self.kinds[rows].tolist()
+        text_index = self.text_index[rows].tolist()
+        has_fill = self.has_fill[rows].tolist()
+        has_outline = self.has_outline[rows].tolist()
+
+        for j, i in enumerate(rows.tolist()):
+            if kinds[j] == RECT:
+                sprites.rectangle(draw_, rects[j], tuple(fill[j]) if has_fill[j] else None,
+                                  tuple(outline[j]) if has_outline[j] else None, border[j])
+            elif kinds[j] == GRID:
+                self.owners[i].draw_cells(draw_, (rects[j][0], rects[j][1]))
+            else:
+                txt = self.texts[text_index[j]]
+                text_atlas.draw(draw_, (rects[j][0], rects[j][1]), txt.content, txt.fontsize,
+                                fill=txt.fill, direction=txt.direction)
+
+    def cull(self, region: Sequence[int]) -> np.ndarray:
+        '''
+        Get the indices of the primitives intersecting `region`, a (left, top, right, bottom) with the right and bottom
+        exclusive, in painting order.
+        '''
+        left, top, right, bottom = region
+        x0, y0, x1, y1 = self.rects.T
+        return np.flatnonzero((x0 < right) & (x1 >= left) & (y0 < bottom) & (y1 >= top))
+
+    def draw_region(self, draw_: ImageDraw.ImageDraw, region: Sequence[int]) -> None:
+        '''
+        Draw the part of the primitives within `region` to a canvas whose top-left is the top-left of the region, the
+        primitives outside the region are skipped.
+        '''
+        self.draw(draw_, offset=(-region[0], -region[1]), indices=self.cull(region))
+
+    def to_svg(self) -> str:
+        '''
+        Export the primitives as an SVG document.
+        '''
+        width, height = self.size
+        lines = ['<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d">' %
+                 (width, height)]
+        for i in range(len(self)):
+            x0, y0, x1, y1 = self.rects[i].tolist()
+            if self.kinds[i] == RECT:
+                lines.append(svg_rect((x0, y0, x1, y1), self.fill[i] if self.has_fill[i] else None,
+                                      self.outline[i] if self.has_outline[i] else None, int(self.border[i])))
+            elif self.kinds[i] == GRID:
+                lines.extend(self.owners[i].cells_to_svg((x0, y0)))
+            else:
+                txt = self.texts[self.text_index[i]]
+                content = txt.content.replace("&", "&amp;").replace("<", "&lt;")
+                lines.append('<text x="%d" y="%d" font-size="%d" fill="%s" dominant-baseline="hanging">%s</text>' % (
+                    x0, y0, txt.fontsize, _svg_color(to_rgb(txt.fill)), content))
+        lines.append("</svg>")
+        return "\n".join(lines)
+
+    def _read_style(self, i: int) -> None:
+        owner = self.owners[i]
+        self._set_color(self.fill, self.has_fill, i, owner.fill)
+        self._set_color(self.outline, self.has_outline, i, owner.outline)
+
+    @staticmethod
+    def _set_color(colors: np.ndarray, valid: np.ndarray, i: int, color) -> None:
+        rgb = to_rgb(color)
+        valid[i] = rgb is not None
+        if rgb is not None:
+            colors[i] = rgb
+
+
+def _svg_color(rgb) -> str:
+    return "#%02X%02X%02X" % tuple(int(v) for v in rgb)
+
+
+def svg_rect(coor: Sequence[int], fill, outline, border: int) -> str:
+    '''
+    The SVG element of `ImageDraw.rectangle(coor, fill, outline, border)`.
+    '''
+    x0, y0, x1, y1 = coor
+    fill = _svg_color(fill) if fill is not None else "none"
+    stroke = _svg_color(outline) if outline is not None and border else "none"
+    # ImageDraw draws the outline inside the box, so the stroke is centered within the border.
+    return '<rect x="%g" y="%g" width="%g" height="%g" fill="%s" stroke="%s" stroke-width="%d"/>' % (
+        x0 + border / 2, y0 + border / 2, x1 - x0 + 1 - border, y1 - y0 + 1 - border, fill, stroke, border)
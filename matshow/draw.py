@@ -11,62 +11,76 @@ __all__ = [
 ]
 
 import abc
+import hashlib
 import math
-import subprocess
-import sys
+import weakref
 from collections import OrderedDict, namedtuple
-from sys import platform
 from typing import *
 
-import imageio
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
-from matshow import colors
-
-try:
-    import torch
-except:
-
-    class torch:
-        class Tensor:
-            pass
+from matshow import colors, fonts, grid, lod, tensor
+from matshow.bitmaps import bitmaps
+from matshow.canvas import Canvas, target_image
+from matshow.display_list import (DisplayList, DisplayListBuilder, Region,
+                                  svg_rect, to_rgb)
+from matshow.grid import CellGrid
+from matshow.sprites import sprites
+from matshow.text import atlas as text_atlas
+from matshow.text import metrics as text_metrics
 
 RESOLUTION = 1
 
 INF = 10000000000
 
 
-def _font_path() -> str:
-    ttf_path = None
-    if platform == "linux" or platform == "linux2":
-        # choose a random font from the system
-        fonts = subprocess.check_output(["fc-list"])
-        assert fonts
-        fonts = fonts.decode(sys.stdout.encoding)
-        one_font = fonts.split("\n")[0]
-        ttf_path = one_font.split(":")[0]
-    elif platform == "darwin":
-        # Not considered yet.
-        ttf_path = "Verdana.ttf"
-    elif platform == "win32":
-        # The arial.ttf should exist in Windows
-        ttf_path = "arial.ttf"
-    return ttf_path
-
-
 def font(size: int):
     """
+    Get the font of `size`, all the fonts are held by the process-wide registry in `matshow.fonts`.
     :param size:
     :return:
     """
-    font = ImageFont.truetype(_font_path(), size)
-    return font
+    return fonts.registry.get(size)
+
+
+# The attribute values hashed as they are, checked before the slow `isinstance` of the abstract widgets.
+_PLAIN_TYPES = frozenset((int, float, str, bool, type(None)))
 
 
 class Widget(abc.ABC):
-    Text = namedtuple("Text", "content, fontsize, container, fill, pos, direction")
+    '''
+    The base of all the widgets.
+
+    The sizes of a widget are computed once and cached, setting any attribute in `GEOMETRY_ATTRS` marks the widget and
+    all its ancestors dirty to measure again, while the other attributes such as `fill` leave the layout untouched.
+
+    A widget tree could also compile into a flat `DisplayList` for fast redrawing, it is compiled again only after the
+    geometry or the texts change.
+
+    Each widget carries a fingerprint of what it draws, it is updated along with the mutations, and `draw` blits the
+    subtrees drawn before with the same fingerprint from `matshow.bitmaps`.
+    '''
+    # `size` is the measured (width, height) of the content, kept to avoid measuring again in each draw.
+    Text = namedtuple(
+        "Text", "content, fontsize, container, fill, pos, direction, size")
+    # Pickle finds the class by its qualified name, `Text` alone is `typing.Text`.
+    Text.__qualname__ = "Widget.Text"
+
+    # The attributes affecting the layout.
+    GEOMETRY_ATTRS = frozenset(("border", "margin"))
+    # The attributes changing the pixels only.
+    STYLE_ATTRS = frozenset(("fill", "outline"))
 
     def __init__(self):
+        # (inner_size, outer_size), None if dirty.
+        object.__setattr__(self, "_size_cache", None)
+        object.__setattr__(self, "_parents", weakref.WeakSet())
+        object.__setattr__(self, "_display_dirty", True)
+        object.__setattr__(self, "_display_list", None)
+        # (fingerprint, the number of widgets in the tree, whether any has draw callbacks), None if dirty.
+        object.__setattr__(self, "_fingerprint", None)
+
         self.texts: List[Widget.Text] = []
         self.fill = None
         self.border = 0
@@ -87,18 +101,21 @@ class Widget(abc.ABC):
             for fn in self.pre_draw_callbacks:
                 fn()
 
-            self._draw(draw_, offset)
-            self._draw_text(draw_, offset)
+            if not bitmaps.draw(self, draw_, offset):
+                self._draw(draw_, offset)
+                self._draw_text(draw_, offset)
 
             for fn in self.post_draw_callbacks:
                 fn()
         else:
-            if not self._draw_cache or self._draw_cache[1].size != self.outer_size:
-                canvas, draw = create_canvas(
-                    self.outer_size, fill=colors.WHITE)
-                self._draw_cache = [canvas, draw]
-            canvas, draw = self._draw_cache
-            self.draw(canvas, offset)
+            self._ensure_draw_cache()
+            self.draw(self._draw_cache[0], offset)
+
+    def _ensure_draw_cache(self):
+        if not self._draw_cache or self._draw_cache[1].size != self.outer_size:
+            canvas, draw = create_canvas(
+                self.outer_size, fill=colors.WHITE)
+            self._draw_cache = [canvas, draw]
 
     def show(self, title: str = ""):
         assert self._draw_cache, "Should call `draw` before"
@@ -117,13 +134,200 @@ class Widget(abc.ABC):
     def _draw(self, draw_: ImageDraw, offset: Tuple[int, int]):
         raise NotImplemented
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self.GEOMETRY_ATTRS:
+            self.invalidate_layout()
+        elif name in self.STYLE_ATTRS:
+            self.invalidate_fingerprint()
+
+    def invalidate_layout(self) -> None:
+        '''
+        Mark the layout of this widget and its ancestors dirty.
+        '''
+        self._mark_dirty(layout=True)
+
+    def invalidate_display(self) -> None:
+        '''
+        Mark the display lists holding this widget dirty, it is needed when the primitives change without touching the
+        layout, e.g. a text is added.
+        '''
+        self._mark_dirty(layout=False)
+
+    def invalidate_fingerprint(self, cell: Optional[int] = None) -> None:
+        '''
+        Mark the fingerprints of this widget and its ancestors dirty, it is needed when the pixels change without
+        touching the layout or the primitives, e.g. a color changes. The change is also reported as damage to the
+        display lists holding the widget.
+
+        :param cell: the flat offset of the changed cell of a compact Matrix, the whole widget changed if None.
+        '''
+        self._mark_dirty(layout=False, display=False)
+        self._damage(cell)
+
+    def _damage(self, cell: Optional[int] = None) -> None:
+        pending, visited = [self], set()
+        while pending:
+            widget = pending.pop()
+            if id(widget) in visited:
+                continue
+            visited.add(id(widget))
+            if widget._display_list is not None and not widget._display_dirty:
+                widget._display_list.damage(self, cell)
+            pending.extend(widget._parents)
+
+    def _mark_dirty(self, layout: bool, display: bool = True) -> None:
+        pending = [self]
+        while pending:
+            widget = pending.pop()
+            # The ancestors of a dirty widget are always dirty, no need to go further.
+            if (not display or widget._display_dirty) and (not layout or widget._size_cache is None) and \
+                    widget._fingerprint is None:
+                continue
+            if display:
+                object.__setattr__(widget, "_display_dirty", True)
+            if layout:
+                object.__setattr__(widget, "_size_cache", None)
+            object.__setattr__(widget, "_fingerprint", None)
+            pending.extend(widget._parents)
+
+    @property
+    def fingerprint(self) -> bytes:
+        '''
+        A digest of what the widget tree draws, i.e. the geometry, colors and texts regardless of the position, it is
+        computed again only after a mutation. It is a 128-bit blake2b digest since the bitmaps are blitted on a match.
+        '''
+        return self._fingerprint_info[0]
+
+    @property
+    def _fingerprint_info(self) -> Tuple[bytes, int, bool]:
+        if self._fingerprint is None:
+            # The fingerprint infos of the children.
+            children = []
+            attrs = tuple(Widget._fingerprint_key(getattr(self, name, None), children)
+                          for name in sorted(self.GEOMETRY_ATTRS | self.STYLE_ATTRS))
+            texts = tuple((txt.content, txt.fontsize, Widget._fingerprint_key(txt.fill, children), txt.pos,
+                           txt.direction) for txt in self.texts)
+            widgets = 1 + sum(info[1] for info in children)
+            callbacks = bool(self.pre_draw_callbacks or self.post_draw_callbacks) or any(info[2] for info in children)
+            # The repr of the plain values and tuples is stable, the children are represented by their digests.
+            key = repr((type(self).__name__, attrs, texts, self._content_key())).encode()
+            fingerprint = hashlib.blake2b(key, digest_size=16).digest()
+            object.__setattr__(self, "_fingerprint", (fingerprint, widgets, callbacks))
+        return self._fingerprint
+
+    @staticmethod
+    def _fingerprint_key(value, children: List[Tuple[bytes, int, bool]]):
+        '''
+        Get a hashable key of an attribute, a widget is represented by its fingerprint and its fingerprint info is
+        collected to `children`.
+        '''
+        if type(value) in _PLAIN_TYPES:
+            return value
+        if isinstance(value, (list, tuple)):
+            return tuple(Widget._fingerprint_key(v, children) for v in value)
+        if isinstance(value, Widget):
+            info = value._fingerprint_info
+            children.append(info)
+            return info[0]
+        return value
+
+    def _content_key(self) -> Hashable:
+        '''
+        The key of the content not held in the attributes, e.g. the arrays of a compact Matrix.
+        '''
+        return None
+
+    @property
+    def layout_dirty(self) -> bool:
+        return self._size_cache is None
+
+    @property
+    def display_list(self) -> DisplayList:
+        '''
+        The display list of the widget tree, it is compiled again only if the geometry or the texts changed, otherwise
+        only the colors are refreshed.
+        '''
+        return self.update_display_list()[0]
+
+    def update_display_list(self) -> Tuple[DisplayList, Optional[List[Region]]]:
+        '''
+        Bring the display list up to date, returns it along with the regions drawn differently since the last update,
+        the regions are None if everything should be repainted, e.g. the layout changed.
+        '''
+        old = self._display_list
+        if self._display_dirty or old is None:
+            builder = DisplayListBuilder()
+            self.compile_into(builder)
+            object.__setattr__(self, "_display_list", builder.build())
+            return self._display_list, None if old is None else old.diff(self._display_list)
+        return old, old.refresh_styles()
+
+    def compile_into(self, builder: DisplayListBuilder, offset: Tuple[int, int] = (0, 0)) -> None:
+        '''
+        Emit the primitives of the widget tree in painting order, the counterpart of `draw`.
+        '''
+        self._compile(builder, offset)
+        for txt, xy in self._text_positions(offset):
+            builder.text(self, xy, txt)
+        if self._display_dirty:
+            # The display list compiled with this widget as the root is stale.
+            object.__setattr__(self, "_display_list", None)
+            object.__setattr__(self, "_display_dirty", False)
+
+    def _compile(self, builder: DisplayListBuilder, offset: Tuple[int, int]) -> None:
+        raise NotImplementedError("%s doesn't support display list" %
+                                  type(self).__name__)
+
+    def render(self, draw_: ImageDraw = None, offset: Tuple[int, int] = (0, 0)):
+        '''
+        The same as `draw` but replays the display list, the draw callbacks are not called.
+        '''
+        if draw_:
+            self.display_list.draw(draw_, offset)
+        else:
+            self._ensure_draw_cache()
+            self.render(self._draw_cache[0], offset)
+
+    def render_region(self, region: Sequence[int], fill: colors.RGB = colors.WHITE) -> Image.Image:
+        '''
+        Render only the part of the widget tree within `region`, a (left, top, right, bottom) in the pixels of the
+        whole widget with the right and bottom exclusive, the primitives outside it are culled.
+
+        The result is the same as cropping the canvas rendered by `render`, without allocating the whole canvas.
+        '''
+        draw_, im = create_canvas(
+            (region[2] - region[0], region[3] - region[1]), fill=fill)
+        self.display_list.draw_region(draw_, region)
+        return im
+
+    def _adopt(self, child: "Widget") -> None:
+        '''
+        Register `child` so that its geometry changes invalidate the layout of this widget.
+        '''
+        child._parents.add(self)
+        self.invalidate_layout()
+
+    def _layout(self) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        if self._size_cache is None:
+            sizes = self._measure()
+            object.__setattr__(self, "_size_cache", sizes)
+        return self._size_cache
+
+    @abc.abstractmethod
+    def _measure(self) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        '''
+        Compute the (inner_size, outer_size) of the widget, it is called only when the layout is dirty.
+        '''
+        raise NotImplemented
+
     @property
     def outer_size(self) -> Tuple[int, int]:
         """
         Get the size with margin considered.
         :return [width, height]
         """
-        raise NotImplemented
+        return self._layout()[1]
 
     @property
     def inner_size(self) -> Tuple[int, int]:
@@ -131,7 +335,7 @@ class Widget(abc.ABC):
         Get the size of the widget.
         :return [width, height]
         """
-        raise NotImplemented
+        return self._layout()[0]
 
     def text(
             self,
@@ -146,14 +350,18 @@ class Widget(abc.ABC):
         :param poses: one of ('mid', 'left', 'right', 'top', 'bottom)
         :param direction: one of ('ltr', 'rtl', 'ttb')
         """
+        self.texts.append(Widget.make_text(
+            self, content, fontsize, fill, pos, direction))
+        self.invalidate_display()
+
+    @staticmethod
+    def make_text(container, content: str, fontsize: int, fill, pos: Tuple[str, str],
+                  direction: str) -> "Widget.Text":
         VALID_POS = ("mid", "left", "right", "top", "bottom")
         assert pos[0] in VALID_POS and pos[1] in VALID_POS
-        the_font = font(fontsize)
         # get the true size with the font
-        text_size = the_font.getsize(content)
-
-        text = Widget.Text(content, fontsize, self, fill, pos, direction)
-        self.texts.append(text)
+        text_size = text_metrics.size(content, fontsize, direction)
+        return Widget.Text(content, fontsize, container, fill, pos, direction, text_size)
 
     def set_border(self, border: int, outline: colors.RGB):
         '''
@@ -168,9 +376,11 @@ class Widget(abc.ABC):
 
     def add_pre_draw_callback(self, fn):
         self.pre_draw_callbacks.append(fn)
+        self.invalidate_fingerprint()
 
     def add_post_draw_callback(self, fn):
         self.post_draw_callbacks.append(fn)
+        self.invalidate_fingerprint()
 
     @abc.abstractmethod
     def get_cells(self) -> List["Widget"]:
@@ -181,28 +391,40 @@ class Widget(abc.ABC):
 
     @staticmethod
     def get_text_actual_size(content: str, fontsize: int):
-        the_font = font(fontsize)
         # get the true size with the font
-        return the_font.getsize(content)
+        return text_metrics.size(content, fontsize)
 
     def _draw_text(self, draw_: ImageDraw, offset: Tuple[int, int]):
         # draw texts
-        for txt in self.texts:
+        for txt, off in self._text_positions(offset):
+            text_atlas.draw(draw_, off, txt.content, txt.fontsize,
+                            fill=txt.fill, direction=txt.direction)
+
+    def _text_positions(self, offset: Tuple[int, int]) -> Iterable[Tuple["Widget.Text", Tuple[int, int]]]:
+        return Widget.place_texts(self.texts, self.border, offset)
+
+    @staticmethod
+    def place_texts(texts: List["Widget.Text"], border: int,
+                    offset: Tuple[int, int]) -> Iterable[Tuple["Widget.Text", Tuple[int, int]]]:
+        '''
+        Get the positions to draw the texts of a widget at `offset`.
+        '''
+        for txt in texts:
             size = txt.container.outer_size
-            text_size = Widget.get_text_actual_size(txt.content, txt.fontsize)
+            text_size = txt.size
             text_offset = [
-                self.__get_text_offset(size, text_size, txt.pos, i) for i in range(2)
+                Widget.__get_text_offset(size, text_size, txt.pos, i) for i in range(2)
             ]
 
             off = (
-                offset[0] + self.border + text_offset[0],
-                offset[1] + self.border + text_offset[1],
+                offset[0] + border + text_offset[0],
+                offset[1] + border + text_offset[1],
             )
-            draw_.text(text=txt.content, xy=off,
-                       font=font(txt.fontsize), fill=txt.fill, direction=txt.direction)
+            yield txt, off
 
+    @staticmethod
     def __get_text_offset(
-            self, container_size: List[int], text_size: List[int], poses: List[str], i: int
+            container_size: List[int], text_size: List[int], poses: List[str], i: int
     ):
         assert len(container_size) == len(poses)
 
@@ -250,6 +472,8 @@ ColorTy = Tuple[int, int, int]
 
 
 class Rectangle(Widget):
+    GEOMETRY_ATTRS = Widget.GEOMETRY_ATTRS | {"width", "height"}
+
     def __init__(
             self,
             width: int,
@@ -278,18 +502,17 @@ class Rectangle(Widget):
             offset[0] + self.width,  # right
             offset[1] + self.height,  # bottom
         ]
-        draw_.rectangle(coor, fill=self.fill,
-                        outline=self.outline, width=self.border)
+        sprites.rectangle(draw_, coor, self.fill, self.outline, self.border)
 
-    @property
-    def outer_size(self) -> Tuple[int, int]:
+    def _compile(self, builder: DisplayListBuilder, offset=(0, 0)):
+        x, y = offset[0] + self.margin[0], offset[1] + self.margin[1]
+        builder.rectangle(
+            self, (x, y, x + self.width, y + self.height), self.border)
+
+    def _measure(self):
         width = self.width + self.margin[0] * 2
         height = self.height + self.margin[1] * 2
-        return width, height
-
-    @property
-    def inner_size(self) -> Tuple[int, int]:
-        return self.width, self.height
+        return (self.width, self.height), (width, height)
 
     def get_cell(self, *offs) -> Widget:
         assert len(offs) == 1
@@ -309,6 +532,8 @@ class Rectangle(Widget):
 
 
 class Stack(Widget):
+    GEOMETRY_ATTRS = Widget.GEOMETRY_ATTRS | {"cstride", "widgets"}
+
     def __init__(
             self,
             widgets: List[Widget] = None,
@@ -325,13 +550,17 @@ class Stack(Widget):
         self.outline = outline
         self.margin = margin
         self.widgets = [] if not widgets else widgets
+        for widget in self.widgets:
+            self._adopt(widget)
 
     def add(self, widget: Widget) -> None:
         assert widget != self, "recursion found"
         self.widgets.append(widget)
+        self._adopt(widget)
 
     def insert(self, widget: Widget, pos=0):
         self.widgets.insert(pos, widget)
+        self._adopt(widget)
 
     def set_label(self, text, fontsize, color=colors.BLACK, fill=colors.WHITE):
         size = self.inner_size
@@ -400,46 +629,45 @@ class Stack(Widget):
                 coor, width=self.border, fill=self.fill, outline=self.outline
             )
 
-        offset_y = offset[1] + self.margin[1] + self.border
+        for cur, (x, y) in zip(self.widgets, self.child_offsets):
+            assert cur != self
+            cur.draw(draw_, (offset[0] + x, offset[1] + y))
 
-        nrows = math.ceil(len(self.widgets) / self.cstride)
-        for i in range(nrows):
-            offset_x = offset[0] + self.border + self.margin[0]
-            max_col_size = 0
-            for j in range(self.cstride):
-                nth = i * self.cstride + j
-                if nth >= len(self.widgets):
-                    break
-                cur = self.widgets[nth]
-                assert cur != self
-                cur.draw(draw_, (offset_x, offset_y))
-                offset_x += cur.outer_size[0]
-                max_col_size = max(max_col_size, cur.outer_size[1])
-            offset_y += max_col_size  # no overlap
+    def _compile(self, builder: DisplayListBuilder, offset=(0, 0)):
+        if self.border > 0:
+            builder.rectangle(self, self.region_coor(offset), self.border)
+        for cur, (x, y) in zip(self.widgets, self.child_offsets):
+            cur.compile_into(builder, (offset[0] + x, offset[1] + y))
 
     @property
-    def outer_size(self) -> Tuple[int, int]:
-        x, y = self.inner_size
-        return x + 2 * self.margin[0], y + 2 * self.margin[1]
+    def child_offsets(self) -> List[Tuple[int, int]]:
+        """
+        The offsets of the widgets relative to the Stack's, they are computed along with the size.
+        """
+        self._layout()
+        return self._child_offsets
 
-    @property
-    def inner_size(self) -> Tuple[int, int]:
+    def _measure(self):
+        offsets = []
         max_x_size = 0
-        max_y_size = 0
+        offset_y = self.margin[1] + self.border
         nrows = math.ceil(len(self.widgets) / self.cstride)
         for i in range(nrows):
-            x_size = 0
+            offset_x = self.border + self.margin[0]
             y_size = 0
-            for j in range(self.cstride):
-                nth = i * self.cstride + j
-                if nth >= len(self.widgets):
-                    break
-                cur = self.widgets[i * self.cstride + j]
-                x_size += cur.outer_size[0]
-                y_size = max(y_size, cur.outer_size[1])
-            max_x_size = max(max_x_size, x_size)
-            max_y_size += y_size
-        return max_x_size + 2 * self.border, max_y_size + 2 * self.border
+            for cur in self.widgets[i * self.cstride:(i + 1) * self.cstride]:
+                offsets.append((offset_x, offset_y))
+                size = cur.outer_size
+                offset_x += size[0]
+                y_size = max(y_size, size[1])
+            max_x_size = max(max_x_size, offset_x -
+                             self.border - self.margin[0])
+            offset_y += y_size  # no overlap
+        object.__setattr__(self, "_child_offsets", offsets)
+
+        max_y_size = offset_y - self.margin[1] - self.border
+        inner = max_x_size + 2 * self.border, max_y_size + 2 * self.border
+        return inner, (inner[0] + 2 * self.margin[0], inner[1] + 2 * self.margin[1])
 
     def region_coor(self, offset: Tuple[int, int]) -> Tuple[int, int, int, int]:
         width, height = self.inner_size
@@ -504,6 +732,8 @@ class Label(Widget):
     """
     A label widget.
     """
+    GEOMETRY_ATTRS = Widget.GEOMETRY_ATTRS | {
+        "width", "height", "content", "fontsize"}
 
     def __init__(
             self,
@@ -533,15 +763,11 @@ class Label(Widget):
     def __repr__(self):
         return "<Label: %s>" % hash(self)
 
-    @property
-    def outer_size(self) -> Tuple[int, int]:
-        self._update_label_size()
-        return self.width + self.margin[0] * 2, self.height + self.margin[1] * 2
-
-    @property
-    def inner_size(self) -> Tuple[int, int]:
+    def _measure(self):
         self._update_label_size()
-        return self.width + self.margin[0], self.height + self.margin[1]
+        inner = self.width + self.margin[0], self.height + self.margin[1]
+        outer = self.width + self.margin[0] * 2, self.height + self.margin[1] * 2
+        return inner, outer
 
     def get_cells(self) -> List[Widget]:
         return [self]
@@ -549,6 +775,9 @@ class Label(Widget):
     def _draw(self, draw_: ImageDraw, offset: Tuple[int, int]):
         pass
 
+    def _compile(self, builder: DisplayListBuilder, offset: Tuple[int, int]):
+        pass
+
     def get_cell(self, *offs) -> Widget:
         return self
 
@@ -556,16 +785,16 @@ class Label(Widget):
         label_width, label_height = Widget.get_text_actual_size(
             self.content, self.fontsize
         )
-        new_width = max(label_width, self.width)
-        new_height = max(label_height, self.height)
-        self.width = new_width
-        self.height = new_height
+        # The label only grows, the size is updated without invalidating the layout being measured.
+        object.__setattr__(self, "width", max(label_width, self.width))
+        object.__setattr__(self, "height", max(label_height, self.height))
 
 
 class LabeledWidget(Widget):
     """
     Widget with a label.
     """
+    GEOMETRY_ATTRS = Widget.GEOMETRY_ATTRS | {"view"}
 
     def __init__(
             self,
@@ -579,6 +808,7 @@ class LabeledWidget(Widget):
         super(LabeledWidget, self).__init__()
         assert label_pos == "top", "Currently only top is supported"
         self.view = VStack()
+        self._adopt(self.view)
         self.fontsize = fontsize
         self.main_widget = main_widget
         self.margin: Tuple[int, int] = margin
@@ -597,13 +827,8 @@ class LabeledWidget(Widget):
         self.view.add(self.main_widget)
         assert self.view.widget_count == 2
 
-    @property
-    def outer_size(self):
-        return self.view.outer_size
-
-    @property
-    def inner_size(self):
-        return self.view.inner_size
+    def _measure(self):
+        return self.view.inner_size, self.view.outer_size
 
     def get_cells(self) -> List[Widget]:
         return [self.main_widget]
@@ -617,8 +842,121 @@ class LabeledWidget(Widget):
         offset = (offset[0] + self.margin[0], offset[1] + self.margin[1])
         self.view.draw(draw_, offset)
 
+    def _compile(self, builder: DisplayListBuilder, offset=(0, 0)):
+        offset = (offset[0] + self.margin[0], offset[1] + self.margin[1])
+        self.view.compile_into(builder, offset)
+
+
+class MatrixCell:
+    '''
+    A lightweight view of a cell of a compact Matrix, it works like the Rectangle of the cell, while the styles live in
+    the arrays of the Matrix's CellGrid.
+    '''
+    __slots__ = ("matrix", "offset")
+
+    def __init__(self, matrix: "Matrix", offset: int):
+        self.matrix = matrix
+        self.offset = offset
+
+    def __repr__(self):
+        return "<MatrixCell %d of %s>" % (self.offset, hash(self.matrix))
+
+    def __eq__(self, other):
+        return isinstance(other, MatrixCell) and other.matrix is self.matrix and other.offset == self.offset
+
+    def __hash__(self):
+        return hash((id(self.matrix), self.offset))
+
+    @property
+    def fill(self) -> colors.RGB:
+        return colors.RGB(*self.matrix.grid.flat_fill[self.offset].tolist())
+
+    @fill.setter
+    def fill(self, fill: ColorTy):
+        self.matrix.grid.flat_fill[self.offset] = to_rgb(fill)
+        self.matrix.invalidate_fingerprint(self.offset)
+
+    @property
+    def outline(self) -> colors.RGB:
+        return colors.RGB(*self.matrix.grid.flat_outline[self.offset].tolist())
+
+    @outline.setter
+    def outline(self, outline: ColorTy):
+        self.matrix.grid.flat_outline[self.offset] = to_rgb(outline)
+        self.matrix.invalidate_fingerprint(self.offset)
+
+    @property
+    def border(self) -> int:
+        return int(self.matrix.grid.flat_border[self.offset])
+
+    @border.setter
+    def border(self, border: int):
+        self.matrix.grid.flat_border[self.offset] = border
+        # the border moves the texts
+        self.matrix.invalidate_fingerprint(self.offset)
+        self.matrix.invalidate_display()
+
+    def set_border(self, border: int, outline: ColorTy):
+        self.border = border
+        self.outline = outline
+
+    @property
+    def width(self) -> int:
+        return self.matrix.cell_config.width
+
+    @property
+    def height(self) -> int:
+        return self.matrix.cell_config.height
+
+    @property
+    def margin(self) -> Tuple[int, int]:
+        return 0, 0
+
+    @property
+    def outer_size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def inner_size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def texts(self) -> List[Widget.Text]:
+        return self.matrix.grid.texts.get(self.offset, [])
+
+    def text(self, content: str, fontsize: int, fill=colors.BLACK, pos: Tuple[str, str] = ("mid", "mid"),
+             direction: str = "ltr") -> None:
+        txt = Widget.make_text(self, content, fontsize, fill, pos, direction)
+        self.matrix.grid.texts.setdefault(self.offset, []).append(txt)
+        self.matrix.invalidate_fingerprint(self.offset)
+        self.matrix.invalidate_display()
+
+    def get_cell(self, *offs) -> "MatrixCell":
+        return self
+
+    def get_cells(self) -> List["MatrixCell"]:
+        return [self]
+
+
+# The container of a text detached from its widget, placing a text needs only the size of its container.
+_DetachedContainer = namedtuple("_DetachedContainer", "outer_size")
+
+# The style of the frame around the cells of a rank-1 Matrix.
+_FrameStyle = namedtuple("_FrameStyle", "fill, outline")
+
 
 class Matrix(Widget):
+    '''
+    A tensor of cells.
+
+    By default each cell is a Rectangle widget, with `compact=True` the cells of a tensor of rank 1 or 2 are stored in
+    the arrays of a CellGrid instead, and `get_cell` returns lightweight MatrixCell views.
+    '''
+    GEOMETRY_ATTRS = Widget.GEOMETRY_ATTRS | {"stack", "inner_margin"}
+
+    # The frame drawn around the cells, as the Stack created by `get_main`.
+    _FRAME_STYLE = _FrameStyle(None, Widget.border_colors[0])
+
     class CellConfig:
         def __init__(
                 self,
@@ -647,12 +985,13 @@ class Matrix(Widget):
     def __init__(
             self,
             shape: List[int],
-            data: torch.Tensor = None,
+            data: "torch.Tensor" = None,
             border: int = 0,
             outline: ColorTy = colors.BLACK,
             margin=(0, 0),
             fill: ColorTy = colors.WHITE,
             cell_config: CellConfig = CellConfig(20, 20),
+            compact: bool = False,
     ):
         super(Matrix, self).__init__()
         assert (
@@ -663,9 +1002,408 @@ class Matrix(Widget):
         self.cell_config = cell_config
         self.shape = shape
         self.fill = fill
-        self.data = data if data else [i for i in range(math.prod(self.shape))]
-        self.stack = self.get_main()
-        self.stack.set_margin(margin)
+        self.compact = compact
+        # A read-only view sharing the memory with the source tensor.
+        self.data = tensor.as_array(data) if data is not None else range(
+            math.prod(self.shape))
+        numel = len(self.data) if isinstance(
+            self.data, range) else self.data.size
+        assert numel == math.prod(
+            self.shape), "the data doesn't match the shape %s" % (shape,)
+        if compact:
+            self.grid = CellGrid(shape, fill=cell_config.fill,
+                                 outline=cell_config.outline, border=cell_config.border)
+            self.stack = None
+            self.inner_margin = margin
+        else:
+            self.grid = None
+            self.stack = self.get_main()
+            self.stack.set_margin(margin)
+            self._adopt(self.stack)
+
+    def heatmap(self, values=None, cmap: Union[str, Sequence[ColorTy]] = None, norm: str = "linear",
+                vmin: float = None, vmax: float = None) -> None:
+        '''
+        Color the cells by values, it works in compact mode.
+
+        :param values: a numpy array or a CPU torch tensor with the same number of elements as the Matrix, the `data`
+                       of the Matrix by default.
+        :param cmap: the name of a colormap in `matshow.heatmap.COLORMAPS` or a sequence of anchor colors, it is
+                     "diverging" for the symmetric norm and "heat" for the others by default.
+        :param norm: one of "linear", "log" and "symmetric", see `matshow.heatmap.normalize`.
+        '''
+        from matshow.heatmap import apply as apply_colormap
+
+        assert self.compact, "heatmap needs a compact Matrix"
+        values = tensor.as_array(self.data if values is None else values)
+        assert values.size == self.grid.numel, "expect %d values, got %d" % (
+            self.grid.numel, values.size)
+        if cmap is None:
+            cmap = "diverging" if norm == "symmetric" else "heat"
+        self.grid.fill[...] = apply_colormap(values.reshape(
+            self.grid.shape), cmap, norm, vmin, vmax)
+        self.invalidate_fingerprint()
+
+    def highlight(self, mask, fill: ColorTy = Widget.fill_hl_colors[0]) -> None:
+        '''
+        Fill the cells selected by `mask` in one step, it works in compact mode.
+
+        :param mask: a boolean tensor of the same number of elements as the Matrix, or a function computing it from
+                     the data, e.g. `lambda data: data > 0`.
+        '''
+        assert self.compact, "highlight needs a compact Matrix"
+        if callable(mask):
+            mask = mask(np.asarray(self.data))
+        mask = tensor.as_array(mask).reshape(self.grid.shape)
+        self.grid.fill[mask] = to_rgb(fill)
+        self.invalidate_fingerprint()
+
+    def color_cells(self, fill) -> None:
+        '''
+        Fill each cell with its own color in one step, it works in compact mode.
+
+        :param fill: a uint8 array of (*shape, 3) or (N, 3) colors, e.g. a palette indexed by the owner of each cell.
+        '''
+        assert self.compact, "color_cells needs a compact Matrix"
+        fill = np.asarray(fill, dtype=np.uint8)
+        assert fill.size == self.grid.fill.size, "expect %d colors, got %s" % (self.grid.numel, fill.shape)
+        self.grid.fill[...] = fill.reshape(self.grid.fill.shape)
+        self.invalidate_fingerprint()
+
+    def text_cells(self, contents: Sequence[str], index, fontsize: int, fill: ColorTy = colors.BLACK) -> None:
+        '''
+        Put `contents[index[i]]` as a text of the cell i in one step, the cells with a negative index get none, it works
+        in compact mode. Each content is measured once and its text is shared by the cells.
+
+        :param index: an int tensor of the same number of elements as the Matrix, e.g. the owner of each cell.
+        '''
+        assert self.compact, "text_cells needs a compact Matrix"
+        index = tensor.as_array(index).reshape(-1)
+        assert index.size == self.grid.numel, "expect %d indices, got %d" % (self.grid.numel, index.size)
+        offsets = np.flatnonzero(index >= 0)
+        if not len(offsets):
+            return
+        # The texts are placed by the size of their container only, all the cells have the same size.
+        container = MatrixCell(self, int(offsets[0]))
+        texts = [Widget.make_text(container, content, fontsize, fill, ("mid", "mid"), "ltr") for content in contents]
+        cells = self.grid.texts
+        for i, k in zip(offsets.tolist(), index[offsets].tolist()):
+            cells.setdefault(i, []).append(texts[k])
+        self.invalidate_fingerprint()
+        self.invalidate_display()
+
+    def clear_texts(self) -> None:
+        '''
+        Remove the texts of all the cells, e.g. before labeling them again.
+        '''
+        if self.compact:
+            self.grid.texts.clear()
+        else:
+            pending = [self.stack]
+            while pending:
+                widget = pending.pop()
+                if isinstance(widget, Stack):
+                    pending.extend(widget.widgets)
+                elif widget.texts:
+                    widget.texts.clear()
+                    widget.invalidate_display()
+        self.invalidate_fingerprint()
+        self.invalidate_display()
+
+    def label_cells(self, fmt: str = "%g", fontsize: int = None, fill: ColorTy = colors.BLACK, mask=None) -> None:
+        '''
+        Put the value of each cell as its text, `mask` selects the cells to label as in `highlight`. Each distinct
+        value is formatted once, and the cells of a compact Matrix are labeled in one step by `text_cells`.
+        '''
+        fontsize = fontsize if fontsize else self.cell_config.height // 2
+        data = np.asarray(self.data).reshape(-1)
+        if mask is not None:
+            mask = mask(data) if callable(mask) else tensor.as_array(mask)
+            offsets = np.flatnonzero(mask.reshape(-1))
+        else:
+            offsets = np.arange(len(data))
+        values, inverse = np.unique(data[offsets], return_inverse=True)
+        labels = np.char.mod(fmt, values).tolist()
+        if self.compact:
+            index = np.full(len(data), -1, dtype=np.int64)
+            index[offsets] = inverse.reshape(-1)
+            self.text_cells(labels, index, fontsize, fill=fill)
+            return
+        for i, k in zip(offsets.tolist(), inverse.reshape(-1).tolist()):
+            self.get_cell(i).text(labels[k], fontsize, fill=fill)
+
+    def level_of_detail(self, max_size: Tuple[int, int], pool: str = "color", values=None,
+                        cmap: Union[str, Sequence[ColorTy]] = None, norm: str = "linear", vmin: float = None,
+                        vmax: float = None, min_detail: int = 6) -> "Matrix":
+        '''
+        Get a compact Matrix fitting in `max_size` pixels, it works in compact mode. The cells shrink first, and once a
+        cell would be smaller than a pixel, each block of cells is pooled into a cell of one pixel. The Matrix itself is
+        returned if it fits already.
+
+        :param pool: how the cells are colored, see `matshow.lod`:
+            "color": the mean color of a block;
+            "any": keep the highlight state, a block takes the color of its cells differing from `cell_config.fill`;
+            "mean", "max", "min": reduce the values, the data by default, and color them as `heatmap` with the range of
+                                  the whole values.
+        :param min_detail: the borders and texts of the cells smaller than it in pixels are skipped.
+        '''
+        assert self.compact, "level of detail needs a compact Matrix"
+        assert pool in lod.POOLS, "pool should be one of %s" % (lod.POOLS,)
+        rows, cols = self.grid.rows, self.grid.cols
+        width, height = self.cell_config.width, self.cell_config.height
+        outer_width, outer_height = self.outer_size
+        # The cells take what the frame, margins and border leave.
+        avail = (max_size[0] - (outer_width - cols * width),
+                 max_size[1] - (outer_height - rows * height))
+        assert min(avail) >= 1, "%s is too small for the frame" % (max_size,)
+        scale = min(avail[0] / (cols * width), avail[1] / (rows * height))
+        if scale >= 1:
+            return self
+
+        cell_width, cell_height = int(width * scale), int(height * scale)
+        factor = (1, 1)
+        if not cell_width or not cell_height:
+            cell_width = cell_height = 1
+            block = math.ceil(max(cols / avail[0], rows / avail[1]))
+            factor = (1 if len(self.grid.shape) == 1 else block, block)
+        detail = factor == (1, 1) and min(cell_width, cell_height) >= min_detail
+        config = Matrix.CellConfig(cell_width, cell_height, fill=self.cell_config.fill,
+                                   border=self.cell_config.border if detail else 0, outline=self.cell_config.outline)
+        pooled_rows, pooled_cols = lod.pooled_shape((rows, cols), factor)
+        shape = [pooled_cols] if len(self.grid.shape) == 1 else [
+            pooled_rows, pooled_cols]
+
+        if pool in lod.VALUE_POOLS:
+            values = tensor.as_array(self.data if values is None else values)
+            values = np.asarray(values).reshape(rows, cols)
+            pooled = lod.pool_values(values, factor, pool)
+            view = Matrix(shape, data=pooled, border=self.border, outline=self.outline, margin=self.inner_margin,
+                          fill=self.fill, cell_config=config, compact=True)
+            from matshow.heatmap import value_range
+
+            vmin, vmax = value_range(values, norm, vmin, vmax)
+            view.heatmap(cmap=cmap, norm=norm, vmin=vmin, vmax=vmax)
+        else:
+            view = Matrix(shape, border=self.border, outline=self.outline, margin=self.inner_margin, fill=self.fill,
+                          cell_config=config, compact=True)
+            view.grid.as_2d(view.grid.fill)[...] = lod.pool_colors(
+                self.grid.as_2d(self.grid.fill), factor, pool, base=to_rgb(self.cell_config.fill))
+
+        if detail:
+            view.grid.outline[...] = self.grid.outline
+            view.grid.border[...] = self.grid.border
+            for i, texts in self.grid.texts.items():
+                cell = view.get_cell(i)
+                for txt in texts:
+                    cell.text(txt.content, max(int(txt.fontsize * scale), 1), fill=txt.fill, pos=txt.pos,
+                              direction=txt.direction)
+        return view
+
+    def render_fit(self, max_size: Tuple[int, int], **kwargs) -> Image.Image:
+        '''
+        Render in a fixed budget of pixels, the arguments are the same as `level_of_detail`.
+        '''
+        view = self.level_of_detail(max_size, **kwargs)
+        draw_, im = create_canvas(view.outer_size, fill=colors.WHITE)
+        view.render(draw_)
+        return im
+
+    @property
+    def _frame_border(self) -> int:
+        '''
+        The border of the frame around the cells in compact mode, the same as the Stack by `get_main`.
+        '''
+        return 2 if len(self.shape) == 1 else 0
+
+    def _grid_region(self, offset: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        '''
+        The region of the frame around the cells in compact mode.
+        '''
+        frame = self._frame_border
+        left = offset[0] + self.border + self.inner_margin[0]
+        top = offset[1] + self.border + self.inner_margin[1]
+        return (left, top,
+                left + self.grid.cols * self.cell_config.width + 2 * frame,
+                top + self.grid.rows * self.cell_config.height + 2 * frame)
+
+    def _cell_rects(self, origin: Tuple[int, int], rows: range = None,
+                    cols: range = None) -> Iterable[Tuple[int, Tuple[int, int, int, int]]]:
+        '''
+        Get the (flat offset, rectangle) of the cells in compact mode, `origin` is the top-left of the first cell,
+        `rows` and `cols` limit to a block of the cells.
+        '''
+        width, height = self.cell_config.width, self.cell_config.height
+        for row in (range(self.grid.rows) if rows is None else rows):
+            y = origin[1] + row * height
+            for col in (range(self.grid.cols) if cols is None else cols):
+                x = origin[0] + col * width
+                yield row * self.grid.cols + col, (x, y, x + width, y + height)
+
+    def _cells_coor(self, offset: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        '''
+        The rectangle covering the cells in compact mode.
+        '''
+        region = self._grid_region(offset)
+        frame = self._frame_border
+        return region[0] + frame, region[1] + frame, region[2] - frame, region[3] - frame
+
+    def draw_cells(self, draw_: ImageDraw, origin: Tuple[int, int]):
+        '''
+        Draw the cells of a compact Matrix with the top-left of the first cell at `origin`, the cells out of the canvas
+        are skipped, so a tile of a huge Matrix costs only its visible cells.
+        '''
+        region = self._visible_region(draw_, origin)
+        if region[0] >= region[2] or region[1] >= region[3]:
+            return
+        if self._raster_cells(draw_, origin, region):
+            return
+
+        # One more cell around since the texts might overflow their cells.
+        width, height = self.cell_config.width, self.cell_config.height
+        rows = range(max(region[1] // height - 1, 0), min(region[3] // height + 2, self.grid.rows))
+        cols = range(max(region[0] // width - 1, 0), min(region[2] // width + 2, self.grid.cols))
+        block = (slice(rows.start, rows.stop), slice(cols.start, cols.stop))
+        fill = self.grid.as_2d(self.grid.fill)[block].reshape(-1, 3).tolist()
+        outline = self.grid.as_2d(self.grid.outline)[block].reshape(-1, 3).tolist()
+        border = self.grid.as_2d(self.grid.border)[block].reshape(-1).tolist()
+        texts = self.grid.texts
+        # The cells are yielded in row-major order of the block.
+        for j, (i, coor) in enumerate(self._cell_rects(origin, rows, cols)):
+            draw_.rectangle(coor, fill=tuple(fill[j]),
+                            outline=tuple(outline[j]), width=border[j])
+            if i in texts:
+                self._draw_cell_texts(draw_, texts[i], border[j], coor)
+
+    def detach_cells(self) -> "Matrix":
+        '''
+        Copy the cells in compact mode into a bare Matrix which could only draw the cells, it holds no reference to the
+        widget tree, so it could be pickled to another process.
+        '''
+        cells = Matrix.__new__(Matrix)
+        grid_ = self.grid.copy()
+        for texts in grid_.texts.values():
+            texts[:] = [txt._replace(container=_DetachedContainer(tuple(txt.container.outer_size))) for txt in texts]
+        cells.__dict__.update(grid=grid_, cell_config=self.cell_config)
+        return cells
+
+    def cell_colors(self) -> np.ndarray:
+        '''
+        The colors painted by the cells in compact mode along with their texts, an (N, 3) uint8 array with duplicates.
+        '''
+        texts = [to_rgb(txt.fill) for texts in self.grid.texts.values() for txt in texts if txt.fill is not None]
+        return np.concatenate([self.grid.flat_fill, self.grid.flat_outline,
+                               np.array(texts, dtype=np.uint8).reshape(-1, 3)])
+
+    def cell_region(self, origin: Tuple[int, int], cell: int) -> Region:
+        '''
+        The pixels painted by a cell in compact mode along with its texts, `origin` is the top-left of the first cell.
+        '''
+        width, height = self.cell_config.width, self.cell_config.height
+        row, col = divmod(cell, self.grid.cols)
+        x, y = origin[0] + col * width, origin[1] + row * height
+        left, top, right, bottom = x, y, x + width + 1, y + height + 1
+        for txt, off in Widget.place_texts(self.grid.texts.get(cell, []), int(self.grid.flat_border[cell]), (x, y)):
+            bbox = text_metrics.bbox(txt.content, txt.fontsize, txt.direction)
+            left, top = min(left, off[0] + bbox[0]), min(top, off[1] + bbox[1])
+            right, bottom = max(right, off[0] + bbox[2] + 1), max(bottom, off[1] + bbox[3] + 1)
+        return left, top, right, bottom
+
+    def _visible_region(self, draw_: ImageDraw, origin: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        '''
+        The pixels of the cells within the canvas, relative to the first cell, all the cells if the canvas is not a
+        `matshow.canvas.Canvas`.
+        '''
+        image = target_image(draw_)
+        if image is None:
+            return 0, 0, self.grid.cols * self.cell_config.width + 1, self.grid.rows * self.cell_config.height + 1
+        canvas_width, canvas_height = image.size
+        return (max(-origin[0], 0), max(-origin[1], 0),
+                min(self.grid.cols * self.cell_config.width + 1, canvas_width - origin[0]),
+                min(self.grid.rows * self.cell_config.height + 1, canvas_height - origin[1]))
+
+    @staticmethod
+    def _draw_cell_texts(draw_: ImageDraw, texts: List[Widget.Text], border: int, coor: Sequence[int]):
+        for txt, off in Widget.place_texts(texts, border, coor[:2]):
+            text_atlas.draw(draw_, off, txt.content, txt.fontsize,
+                            fill=txt.fill, direction=txt.direction)
+
+    def _raster_cells(self, draw_: ImageDraw, origin: Tuple[int, int], region: Tuple[int, int, int, int]) -> bool:
+        '''
+        Draw the cells within `region` with the vectorized rasterizer, returns False if the cells are not uniform and
+        the generic path is needed, e.g. the canvas is not a `matshow.canvas.Canvas`.
+        '''
+        image = target_image(draw_)
+        border = self.grid.uniform_border
+        if image is None or image.mode not in ("RGB", "P") or border is None:
+            return False
+
+        # The texts are drawn after all the cells, it is the same only if no text overlaps the neighbors.
+        width, height = self.cell_config.width, self.cell_config.height
+        placed = []
+        for i, texts in self.grid.texts.items():
+            row, col = divmod(i, self.grid.cols)
+            if not (region[0] <= col * width + width and col * width < region[2] and
+                    region[1] <= row * height + height and row * height < region[3]):
+                continue
+            x, y = origin[0] + col * width, origin[1] + row * height
+            for txt, off in Widget.place_texts(texts, border, (x, y)):
+                bbox = text_metrics.bbox(txt.content, txt.fontsize, txt.direction)
+                if off[0] + bbox[0] < x or off[1] + bbox[1] < y or \
+                        off[0] + bbox[2] > x + width or off[1] + bbox[3] > y + height:
+                    return False
+                placed.append((txt, off))
+
+        x, y = origin[0] + region[0], origin[1] + region[1]
+        fill, outline = self.grid.as_2d(self.grid.fill), self.grid.as_2d(self.grid.outline)
+        if image.mode == "P":
+            # Only the block of cells within the region is mapped to the palette.
+            top, left = min(region[1] // height, self.grid.rows - 1), min(region[0] // width, self.grid.cols - 1)
+            block = (slice(top, (region[3] - 1) // height + 1), slice(left, (region[2] - 1) // width + 1))
+            fill, outline = self._palette_indices(image, fill[block], outline[block])
+            region = (region[0] - left * width, region[1] - top * height,
+                      region[2] - left * width, region[3] - top * height)
+        cells = Image.fromarray(grid.rasterize(fill, outline, border, width, height, region))
+        if image.mode == "P":
+            # The indices take the palette of the canvas, so they are pasted as they are.
+            cells.putpalette(image.getpalette())
+        image.paste(cells, (x, y))
+        for txt, off in placed:
+            text_atlas.draw(draw_, off, txt.content, txt.fontsize,
+                            fill=txt.fill, direction=txt.direction)
+        return True
+
+    @staticmethod
+    def _palette_indices(image: Image.Image, *arrays: np.ndarray) -> List[np.ndarray]:
+        '''
+        Map the (rows, cols, 3) colors to the indices in the palette of `image`, the missing colors are allocated as
+        `ImageDraw` does.
+        '''
+        packed = [colors.pack(array) for array in arrays]
+        keys = np.unique(np.concatenate([p.reshape(-1) for p in packed]))
+        lut = np.array([image.palette.getcolor(tuple(rgb), image) for rgb in colors.unpack(keys).tolist()],
+                       dtype=np.uint8)
+        return [lut[np.searchsorted(keys, p)] for p in packed]
+
+    def cells_to_svg(self, origin: Tuple[int, int]) -> List[str]:
+        fill = self.grid.flat_fill.tolist()
+        outline = self.grid.flat_outline.tolist()
+        border = self.grid.flat_border.tolist()
+        lines = []
+        for i, coor in self._cell_rects(origin):
+            lines.append(svg_rect(coor, fill[i], outline[i], border[i]))
+        return lines
+
+    def _draw_grid(self, draw_: ImageDraw, offset: Tuple[int, int]):
+        if self._frame_border > 0:
+            draw_.rectangle(self._grid_region(offset), width=self._frame_border,
+                            fill=self._FRAME_STYLE.fill, outline=self._FRAME_STYLE.outline)
+        self.draw_cells(draw_, self._cells_coor(offset)[:2])
+
+    def _compile_grid(self, builder: DisplayListBuilder, offset: Tuple[int, int]):
+        if self._frame_border > 0:
+            builder.rectangle(self._FRAME_STYLE, self._grid_region(
+                offset), self._frame_border)
+        builder.grid(self, self._cells_coor(offset))
 
     def _draw(self, draw_: ImageDraw, offset=(0, 0)):
         if self.border > 0:
@@ -680,20 +1418,51 @@ class Matrix(Widget):
                 coor, width=self.border, fill=self.fill, outline=self.outline
             )
 
+        if self.compact:
+            self._draw_grid(draw_, offset)
+            return
+
         inner_offset = (offset[0] + self.border, offset[1] + self.border)
         self.stack.draw(draw_, inner_offset)
 
-    @property
-    def inner_size(self) -> Tuple[int, int]:
+    def _compile(self, builder: DisplayListBuilder, offset=(0, 0)):
+        if self.border > 0:
+            width, height = self.inner_size
+            builder.rectangle(
+                self, (offset[0], offset[1], offset[0] + width, offset[1] + height), self.border)
+
+        if self.compact:
+            self._compile_grid(builder, offset)
+            return
+
+        inner_offset = (offset[0] + self.border, offset[1] + self.border)
+        self.stack.compile_into(builder, inner_offset)
+
+    def _measure(self):
+        if self.compact:
+            region = self._grid_region((0, 0))
+            size = (region[2] + self.inner_margin[0] + self.border,
+                    region[3] + self.inner_margin[1] + self.border)
+            return size, size
         size = self.stack.outer_size
         size = (size[0] + 2 * self.border, size[1] + 2 * self.border)
-        return size
+        return size, size
 
-    @property
-    def outer_size(self) -> Tuple[int, int]:
-        return self.inner_size
+    def _content_key(self) -> Hashable:
+        if not self.compact:
+            return None
+        texts = tuple((i, tuple((txt.content, txt.fontsize, Widget._fingerprint_key(txt.fill, []), txt.pos,
+                                 txt.direction) for txt in texts)) for i, texts in sorted(self.grid.texts.items()))
+        return (self.grid.shape, self.cell_config.width, self.cell_config.height, self.grid.digest(), texts)
 
     def get_cell(self, *offset) -> Widget:
+        if self.compact:
+            assert len(offset) <= 2
+            if len(offset) == 2:
+                return MatrixCell(self, self.grid.offset(*offset))
+            if offset[0] >= self.grid.numel:
+                return None
+            return MatrixCell(self, offset[0])
         return self.stack.get_cell(*offset)
 
     def get_main(self):
@@ -727,23 +1496,46 @@ class Matrix(Widget):
         return stack
 
     def get_cells(self) -> List[Widget]:
+        if self.compact:
+            return [MatrixCell(self, i) for i in range(self.grid.numel)]
         return self.stack.get_cells()
 
 
 def create_canvas(
-        size=(500, 300), fill=colors.GRAY
+        size=(500, 300), fill=colors.GRAY, palette: Optional[Iterable[colors.RGB]] = None
 ) -> Tuple[ImageDraw.ImageDraw, Image.Image]:
-    im = Image.new("RGB", size, fill)
-    draw = ImageDraw.Draw(im)
+    '''
+    Create an RGB canvas, or an indexed one if `palette` is given.
+
+    An indexed ("P") canvas takes one byte per pixel, the colors drawn take the slots of the palette, e.g. the colors of
+    a scene from `widget.display_list.colors()`, and the colors missing are allocated as they are drawn, up to 256.
+    The texts are drawn without antialiasing on it. The draw is a `matshow.canvas.Canvas`, so the cached pixels are
+    pasted onto the canvas instead of drawn again.
+    '''
+    if palette is None:
+        im = Image.new("RGB", size, fill)
+    else:
+        slots = list(dict.fromkeys([to_rgb(fill)] + [to_rgb(color) for color in palette]))
+        assert len(slots) <= 256, "an indexed canvas takes at most 256 colors, got %d" % len(slots)
+        im = Image.new("P", size, 0)
+        im.putpalette([v for rgb in slots for v in rgb])
+    draw = Canvas(im)
     return draw, im
 
 
-def create_animation(image_paths: List[str], gif_path: str, duration: int = 1):
+def create_animation(image_paths: Iterable[str], gif_path: str, duration: float = 1):
     '''
-    Create an animation with a list of images.
+    Create an animation with a list of images, the images are read one at a time and streamed to the animation at
+    `gif_path`, whose extension picks the format.
+
+    :param duration: the seconds each frame shows.
     '''
-    images = [imageio.imread(path) for path in image_paths]
-    imageio.mimsave(gif_path, images, "GIF", duration=duration)
+    from matshow.sinks import open_sink
+
+    with open_sink(gif_path, duration=duration) as sink:
+        for path in image_paths:
+            with Image.open(path) as image:
+                sink.add(image)
 
 
 if __name__ == "__main__":
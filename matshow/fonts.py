@@ -0,0 +1,156 @@
+'''
+Process-wide font registry.
+
+Resolving the system font shells out to `fc-list` on Linux, which is far too slow to do for every text, so the font
+path is resolved once per process (and the discovery result is cached on disk), and the loaded FreeType fonts are kept
+in a bounded LRU keyed by (path, size).
+
+The font could be overridden with the `MATSHOW_FONT` environment variable or `registry.set_path`.
+'''
+import os
+import subprocess
+import sys
+from sys import platform
+from typing import *
+
+from PIL import ImageFont
+
+from matshow.cache import LRUCache
+
+# Environment variable to override the font file.
+FONT_ENV = "MATSHOW_FONT"
+# Environment variable to override the directory holding matshow's on-disk caches.
+CACHE_DIR_ENV = "MATSHOW_CACHE_DIR"
+
+_FONT_PATH_CACHE_FILE = "font_path"
+
+
+def cache_dir() -> str:
+    '''
+    The directory holding the on-disk caches.
+    '''
+    root = os.environ.get(CACHE_DIR_ENV)
+    if root:
+        return root
+    xdg = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache")
+    return os.path.join(xdg, "matshow")
+
+
+def discover_font_path() -> Optional[str]:
+    '''
+    Find a font from the system, returns None if nothing is found.
+    '''
+    ttf_path = None
+    if platform == "linux" or platform == "linux2":
+        # choose a random font from the system
+        try:
+            fonts = subprocess.check_output(["fc-list"])
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        fonts = fonts.decode(sys.stdout.encoding or "utf-8")
+        one_font = fonts.split("\n")[0]
+        ttf_path = one_font.split(":")[0] or None
+    elif platform == "darwin":
+        # Not considered yet.
+        ttf_path = "Verdana.ttf"
+    elif platform == "win32":
+        # The arial.ttf should exist in Windows
+        ttf_path = "arial.ttf"
+    return ttf_path
+
+
+def _load_cached_font_path() -> Optional[str]:
+    try:
+        with open(os.path.join(cache_dir(), _FONT_PATH_CACHE_FILE)) as f:
+            path = f.read().strip()
+    except OSError:
+        return None
+    # The fonts installed might change since the cache is written.
+    return path if path and os.path.isfile(path) else None
+
+
+def _store_cached_font_path(path: str) -> None:
+    try:
+        os.makedirs(cache_dir(), exist_ok=True)
+        with open(os.path.join(cache_dir(), _FONT_PATH_CACHE_FILE), "w") as f:
+            f.write(path)
+    except OSError:
+        pass  # The cache is just an optimization.
+
+
+def _load_font(path: Optional[str], size: int):
+    if path is None:
+        try:
+            return ImageFont.load_default(size)
+        except TypeError:  # Pillow < 10.1 has no sized default font
+            return ImageFont.load_default()
+    return ImageFont.truetype(path, size)
+
+
+class FontRegistry:
+    '''
+    Resolve the font path once and hold the loaded fonts of each size.
+    '''
+
+    def __init__(self, capacity: int = 32):
+        self._path: Optional[str] = None
+        self._resolved = False
+        self.fonts = LRUCache(capacity)
+
+    @property
+    def path(self) -> Optional[str]:
+        '''
+        The font file in use, None means the Pillow's builtin font.
+        '''
+        if not self._resolved:
+            self._path = self._resolve_path()
+            self._resolved = True
+        return self._path
+
+    def set_path(self, path: Optional[str]) -> None:
+        '''
+        Use a specific font file, or pass None to discover the system font again.
+        '''
+        self._path = path
+        self._resolved = path is not None
+        self.fonts.clear()
+
+    def get(self, size: int):
+        '''
+        Get the font of `size`.
+        '''
+        path = self.path
+        return self.fonts.get_or_create((path, size), lambda: _load_font(path, size))
+
+    def clear(self) -> None:
+        self.fonts.clear()
+        self.fonts.reset_stats()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return self.fonts.stats
+
+    @staticmethod
+    def _resolve_path() -> Optional[str]:
+        path = os.environ.get(FONT_ENV)
+        if path:
+            return path
+        path = _load_cached_font_path()
+        if path:
+            return path
+        path = discover_font_path()
+        if path and os.path.isfile(path):
+            _store_cached_font_path(path)
+        return path
+
+
+# The registry shared by the whole process.
+registry = FontRegistry()
+
+
+def font(size: int):
+    '''
+    Get the font of `size` from the process-wide registry.
+    '''
+    return registry.get(size)
@@ -1,10 +1,8 @@
 import logging
 import math
-import os
-import tempfile
 from typing import *
 
-from matshow import colors, draw, relation
+from matshow import colors, relation
 from matshow.draw import Matrix, Rectangle, Stack, Widget
 from matshow.relation import Relation
 
@@ -53,35 +51,44 @@ class TensorView(relation.Node):
         return self._shape
 
 
-def create_animation(main_widget: Widget, path: str, src_node: TensorView, activates=List[int], duration=1):
-    with tempfile.TemporaryDirectory() as tmpdir:
-        image_paths = []
-        draw_, canvas = draw.create_canvas(
-            main_widget.outer_size, fill=main_widget.fill)
+def create_animation(main_widget: Widget, path: str, src_node: TensorView, activates=List[int], duration=1,
+                     workers: Optional[int] = 1, indexed: bool = False):
+    def steps():
         for i in activates:
             src_node.activate(i)
-
-            main_widget.draw(draw_)
-            img_path = os.path.join(tmpdir, '%d.png' % i)
-            image_paths.append(img_path)
-            canvas.save(img_path, "PNG")
-
+            yield
             src_node.mark(i)
 
-        draw.create_animation(image_paths, path, duration=duration)
+    create_animation_by_frames(main_widget, path, steps(), duration=duration, workers=workers, indexed=indexed)
+
 
+def create_animation_by_callback(main_widget: Widget, path: str, callback, duration=1, workers: Optional[int] = 1,
+                                 indexed: bool = False):
+    '''
+    Render a frame each time `callback` returns True, the frames are streamed to the animation at `path`,
+    whose extension picks the format, e.g. ".gif", ".png" or ".webp".
 
-def create_animation_by_callback(main_widget: Widget, path: str, callback, duration=1):
-    with tempfile.TemporaryDirectory() as tmpdir:
-        image_paths = []
-        draw_, canvas = draw.create_canvas(
-            main_widget.outer_size, fill=main_widget.fill)
-        counter = 0
+    :param duration: the seconds each frame shows.
+    :param workers: the processes rasterizing the frames, all the cores if None. A single worker repaints only the
+                    regions changed by the callback, which is fast enough unless the layout changes often.
+    :param indexed: render onto indexed canvases of the colors in the scene, a third of the memory and faster to
+                    encode, but the texts are not antialiased.
+    '''
+    def steps():
         while callback():
-            main_widget.draw(draw_)
-            img_path = os.path.join(tmpdir, '%d.png' % counter)
-            counter += 1
-            image_paths.append(img_path)
-            canvas.save(img_path, "PNG")
+            yield
+
+    create_animation_by_frames(main_widget, path, steps(), duration=duration, workers=workers, indexed=indexed)
+
+
+def create_animation_by_frames(main_widget: Widget, path: str, frames: Iterable[Any], duration=1,
+                               workers: Optional[int] = 1, indexed: bool = False):
+    '''
+    Render a frame for each item of `frames`, e.g. a generator mutating the scene between its yields, an item being a
+    number is the seconds its frame shows.
+    '''
+    from matshow.animation import render_frames
+    from matshow.sinks import open_sink
 
-        draw.create_animation(image_paths, path, duration=duration)
+    with open_sink(path, duration=duration) as sink:
+        render_frames(main_widget, frames, sink, fill=main_widget.fill, workers=workers, indexed=indexed)
@@ -0,0 +1,198 @@
+'''
+Array-backed storage of the cells of a Matrix.
+
+A Matrix in compact mode keeps the per-cell styles in numpy arrays instead of one Rectangle per cell, so the memory and
+construction time scale with the array size rather than the Python object overhead.
+'''
+import functools
+import hashlib
+import math
+from typing import *
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from matshow.display_list import to_rgb
+
+
+class CellGrid:
+    '''
+    The styles of the cells of a tensor.
+
+    fill, outline: (*shape, 3) uint8.
+    border: (*shape) int32.
+    texts: a sparse map from the flat offset of a cell to its texts.
+    '''
+
+    def __init__(self, shape: Sequence[int], fill, outline, border: int):
+        assert 1 <= len(shape) <= 2, "CellGrid supports tensors of rank 1 or 2"
+        self.shape = tuple(int(v) for v in shape)
+        self.fill = np.empty(self.shape + (3,), dtype=np.uint8)
+        self.fill[...] = to_rgb(fill)
+        self.outline = np.empty(self.shape + (3,), dtype=np.uint8)
+        self.outline[...] = to_rgb(outline)
+        self.border = np.full(self.shape, border, dtype=np.int32)
+        self.texts: Dict[int, List[Any]] = {}
+
+        # Flat views sharing the memory, for accessing a cell by its offset.
+        self.flat_fill = self.fill.reshape(-1, 3)
+        self.flat_outline = self.outline.reshape(-1, 3)
+        self.flat_border = self.border.reshape(-1)
+
+    def copy(self) -> "CellGrid":
+        '''
+        A copy of the styles, the lists of texts are copied while the texts themselves are shared.
+        '''
+        other = CellGrid.__new__(CellGrid)
+        other.shape = self.shape
+        other.fill, other.outline, other.border = self.fill.copy(), self.outline.copy(), self.border.copy()
+        other.texts = {i: list(texts) for i, texts in self.texts.items()}
+        other.flat_fill = other.fill.reshape(-1, 3)
+        other.flat_outline = other.outline.reshape(-1, 3)
+        other.flat_border = other.border.reshape(-1)
+        return other
+
+    @property
+    def numel(self) -> int:
+        return math.prod(self.shape)
+
+    @property
+    def rows(self) -> int:
+        return 1 if len(self.shape) == 1 else self.shape[0]
+
+    @property
+    def cols(self) -> int:
+        return self.shape[-1]
+
+    def offset(self, row: int, col: int) -> int:
+        assert col < self.cols, f"{col} < {self.cols} failed"
+        offset = row * self.cols + col
+        assert offset < self.numel
+        return offset
+
+    @property
+    def nbytes(self) -> int:
+        return self.fill.nbytes + self.outline.nbytes + self.border.nbytes
+
+    def as_2d(self, array: np.ndarray) -> np.ndarray:
+        '''
+        View a per-cell array as (rows, cols, ...).
+        '''
+        return array.reshape((self.rows, self.cols) + array.shape[len(self.shape):])
+
+    def digest(self) -> bytes:
+        '''
+        A digest of the styles of the cells.
+        '''
+        hasher = hashlib.blake2b(digest_size=16)
+        for array in (self.fill, self.outline, self.border):
+            hasher.update(np.ascontiguousarray(array).data)
+        return hasher.digest()
+
+    @property
+    def uniform_border(self) -> Optional[int]:
+        '''
+        The border shared by all the cells, None if the cells have different borders.
+        '''
+        first = int(self.flat_border[0])
+        return first if (self.flat_border == first).all() else None
+
+
+@functools.lru_cache(maxsize=64)
+def _outline_bands(width: int, height: int, border: int) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Get the rows and columns covered by the outline of a cell, they are taken from a rectangle drawn by `ImageDraw` so
+    that the raster matches it exactly.
+    '''
+    im = Image.new("L", (width + 1, height + 1), 0)
+    ImageDraw.Draw(im).rectangle(
+        [0, 0, width, height], fill=1, outline=2, width=border)
+    mask = np.asarray(im) == 2
+    rows, cols = mask.all(axis=1), mask.all(axis=0)
+    assert (mask == (rows[:, None] | cols[None, :])).all(), \
+        "the outline is expected to be a frame"
+    return rows, cols
+
+
+def _cell_coords(ncells: int, size: int, start: int = 0, stop: int = None) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Map the pixels in [start, stop) along an axis to (the cell owning it, the offset within the cell).
+
+    A cell of `size` covers size+1 pixels as `ImageDraw.rectangle` does, so adjacent cells overlap by one pixel, and
+    the later drawn one wins.
+    '''
+    stop = ncells * size + 1 if stop is None else stop
+    pixels = np.arange(start, stop)
+    cells = np.minimum(pixels // size, ncells - 1)
+    return cells, pixels - cells * size
+
+
+def rasterize(fill: np.ndarray, outline: np.ndarray, border: int, width: int, height: int,
+              region: Tuple[int, int, int, int] = None) -> np.ndarray:
+    '''
+    Rasterize a grid of uniform cells in one pass, the result matches drawing the cells one by one in row-major order
+    with `ImageDraw.rectangle(..., width=border)` pixel for pixel.
+
+    :param fill: (rows, cols, 3) uint8, the fill color of each cell, or (rows, cols) for the palette indices.
+    :param outline: (rows, cols, 3) uint8, the outline color of each cell, or (rows, cols) for the palette indices.
+    :param region: (left, top, right, bottom) in pixels relative to the first cell to render only a part of the grid.
+    :return: (H, W, 3) uint8 image, or (H, W) for the palette indices, it is (rows * height + 1, cols * width + 1) for
+             the whole grid.
+    '''
+    rows, cols = fill.shape[:2]
+    left, top, right, bottom = region if region else (
+        0, 0, cols * width + 1, rows * height + 1)
+    cy, dy = _cell_coords(rows, height, top, bottom)
+    cx, dx = _cell_coords(cols, width, left, right)
+    row_band, col_band = _outline_bands(width, height, border)
+
+    # Each pixel row is a copy of one of the two lines of its row of cells, the line crossing the cells' interior
+    # and the line on their outline.
+    if not len(cy) or not len(cx):
+        return np.empty((len(cy), len(cx)) + fill.shape[2:], dtype=np.uint8)
+    first, last = cy[0], cy[-1] + 1
+    on_cols = col_band[dx]
+    lines = np.empty((last - first, 2, len(cx)) + fill.shape[2:], dtype=np.uint8)
+    lines[:, 0] = fill[first:last][:, cx]
+    lines[:, 0, on_cols] = outline[first:last][:, cx[on_cols]]
+    lines[:, 1] = outline[first:last][:, cx]
+    lines = lines.reshape((-1, len(cx)) + fill.shape[2:])
+    return lines[(cy - first) * 2 + row_band[dy]]
+
+
+def _line_coords(ncells: int, size: int, thickness: int, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Map the pixels in [start, stop) along an axis to the line between the cells i-1 and i they are on, the lines of
+    `thickness` pixels are centered on the shared outlines, 0 if a pixel is on no line.
+    '''
+    pixels = np.arange(start, stop) + thickness // 2
+    lines = pixels // size
+    on = (pixels % size < thickness) & (lines >= 1) & (lines < ncells)
+    return np.where(on, lines, 0), on
+
+
+def boundary_mask(groups: np.ndarray, width: int, height: int, thickness: int,
+                  region: Tuple[int, int, int, int] = None) -> np.ndarray:
+    '''
+    Rasterize the lines between the neighbor cells of different groups in one pass, e.g. the boundaries of the warps
+    drawn over the cells of `rasterize`.
+
+    :param groups: (rows, cols) the group of each cell.
+    :param region: (left, top, right, bottom) in pixels relative to the first cell to render only a part of the grid.
+    :return: (H, W) bool mask of the pixels on the lines, the same size as `rasterize` gives.
+    '''
+    rows, cols = groups.shape
+    assert thickness <= min(width, height), "the lines should be thinner than the cells"
+    left, top, right, bottom = region if region else (
+        0, 0, cols * width + 1, rows * height + 1)
+    cy, _ = _cell_coords(rows, height, top, bottom)
+    cx, _ = _cell_coords(cols, width, left, right)
+    ly, on_y = _line_coords(rows, height, thickness, top, bottom)
+    lx, on_x = _line_coords(cols, width, thickness, left, right)
+
+    # vertical[r, c] is whether the cells (r, c - 1) and (r, c) differ, the column 0 is never on a line.
+    vertical = np.zeros((rows, cols), dtype=bool)
+    vertical[:, 1:] = groups[:, 1:] != groups[:, :-1]
+    horizontal = np.zeros((rows, cols), dtype=bool)
+    horizontal[1:] = groups[1:] != groups[:-1]
+    return vertical[cy][:, lx] & on_x[None, :] | horizontal[ly][:, cx] & on_y[:, None]
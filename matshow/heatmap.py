@@ -0,0 +1,134 @@
+'''
+Map tensor values to colors.
+
+The values are normalized to [0, 1] and quantized into the index of a 256-entry color lookup table, so coloring a
+whole tensor is a few vectorized numpy operations.
+'''
+import functools
+from typing import *
+
+import numpy as np
+
+from matshow import colors
+
+LUT_SIZE = 256
+
+# The anchor colors of the builtin colormaps, the LUT interpolates between them linearly.
+COLORMAPS: Dict[str, Tuple[colors.RGB, ...]] = {
+    "heat": (colors.WHITE, colors.YELLOW1, colors.DARKORANGE1, colors.FIREBRICK3, colors.BLACK),
+    "cool": (colors.WHITE, colors.DODGERBLUE1, colors.BLUE4),
+    "gray": (colors.BLACK, colors.WHITE),
+    "diverging": (colors.BLUE4, colors.DODGERBLUE1, colors.WHITE, colors.FIREBRICK1, colors.FIREBRICK4),
+}
+
+# The normalization methods.
+NORMS = ("linear", "log", "symmetric")
+
+
+@functools.lru_cache(maxsize=32)
+def _lut(anchors: Tuple[Tuple[int, int, int], ...]) -> np.ndarray:
+    anchors = np.array(anchors, dtype=np.float64)
+    points = np.linspace(0, 1, len(anchors))
+    positions = np.linspace(0, 1, LUT_SIZE)
+    lut = np.stack([np.interp(positions, points, anchors[:, c])
+                    for c in range(3)], axis=1)
+    lut = np.rint(lut).astype(np.uint8)
+    lut.setflags(write=False)
+    return lut
+
+
+def colormap(cmap: Union[str, Sequence[colors.RGB]] = "heat") -> np.ndarray:
+    '''
+    Get the (256, 3) uint8 LUT of a builtin colormap or of a sequence of anchor colors.
+    '''
+    if isinstance(cmap, str):
+        assert cmap in COLORMAPS, "unknown colormap %s, one of %s" % (
+            cmap, list(COLORMAPS))
+        cmap = COLORMAPS[cmap]
+    assert len(cmap) >= 2, "a colormap needs two colors at least"
+    return _lut(tuple(tuple(int(v) for v in c[:3]) for c in cmap))
+
+
+def value_range(values, norm: str = "linear", vmin: float = None, vmax: float = None) -> Tuple[float, float]:
+    '''
+    Resolve the missing ends of the range of the values, e.g. to color a part of a tensor as the whole.
+    '''
+    assert norm in NORMS, "norm should be one of %s" % (NORMS,)
+    values = np.asarray(values)
+    if norm == "symmetric":
+        vmax = float(np.nanmax(np.abs(values))) if vmax is None else vmax
+        vmin = -vmax
+    elif norm == "log":
+        if vmin is None:
+            positive = values[values > 0]
+            vmin = float(positive.min()) if positive.size else 1.
+        vmax = float(np.nanmax(values)) if vmax is None else vmax
+    else:
+        vmin = float(np.nanmin(values)) if vmin is None else vmin
+        vmax = float(np.nanmax(values)) if vmax is None else vmax
+    return float(vmin), float(vmax)
+
+
+def _prepare(values, norm: str, vmin: Optional[float], vmax: Optional[float]) -> Tuple[np.ndarray, float, float]:
+    '''
+    Transform the values by the norm and resolve the range, the range maps to [0, 1] linearly.
+    '''
+    values = np.asarray(values)
+    vmin, vmax = value_range(values, norm, vmin, vmax)
+    if norm == "log":
+        vmin, vmax = np.log10(vmin), np.log10(max(vmax, vmin))
+        values = np.log10(np.maximum(values, 10 ** vmin, dtype=np.float32))
+    return values, float(vmin), float(vmax)
+
+
+def _affine(values: np.ndarray, vmin: float, vmax: float, top: float, bias: float) -> np.ndarray:
+    '''
+    Compute `(values - vmin) / (vmax - vmin) * top + bias` clipped to [bias, top + bias] in float32, NaN maps to bias.
+    '''
+    scale = top / (vmax - vmin) if vmax > vmin else 0.
+    out = np.multiply(values, np.float32(scale), dtype=np.float32)
+    out += np.float32(bias - vmin * scale)
+    np.clip(out, bias, top + bias, out=out)
+    if out.dtype.kind == "f" and out.size and np.isnan(out.min()):
+        out[np.isnan(out)] = bias
+    return out
+
+
+def normalize(values, norm: str = "linear", vmin: float = None, vmax: float = None) -> np.ndarray:
+    '''
+    Normalize the values to [0, 1] in float32.
+
+    :param norm: one of
+        "linear": map [vmin, vmax] to [0, 1];
+        "log": the same as linear on log10 of the values, the non-positive values are clipped to vmin;
+        "symmetric": map [-vmax, vmax] to [0, 1] so that zero is in the middle, vmax defaults to max(|values|).
+    '''
+    return _affine(*_prepare(values, norm, vmin, vmax), top=1., bias=0.)
+
+
+def quantize(values, norm: str = "linear", vmin: float = None, vmax: float = None) -> np.ndarray:
+    '''
+    Map the values to the uint8 indices of a LUT.
+    '''
+    # The 0.5 bias rounds to the nearest index when truncating.
+    out = _affine(*_prepare(values, norm, vmin, vmax),
+                  top=LUT_SIZE - 1, bias=0.5)
+    return out.astype(np.uint8)
+
+
+@functools.lru_cache(maxsize=32)
+def _packed_lut(lut_bytes: bytes) -> np.ndarray:
+    lut = np.zeros((LUT_SIZE, 4), dtype=np.uint8)
+    lut[:, :3] = np.frombuffer(lut_bytes, dtype=np.uint8).reshape(-1, 3)
+    return lut.view(np.uint32).reshape(-1)
+
+
+def apply(values, cmap: Union[str, Sequence[colors.RGB]] = "heat", norm: str = "linear", vmin: float = None,
+          vmax: float = None) -> np.ndarray:
+    '''
+    Map the values to colors, returns an array of shape `values.shape + (3,)` in uint8.
+    '''
+    index = quantize(values, norm, vmin, vmax)
+    # Gathering one uint32 per value is much faster than gathering three bytes.
+    packed = np.take(_packed_lut(colormap(cmap).tobytes()), index)
+    return packed.view(np.uint8).reshape(index.shape + (4,))[..., :3]
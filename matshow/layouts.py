@@ -0,0 +1,326 @@
+'''
+Distributed layouts of the tensors over the threads of a CTA, following the encodings of Triton.
+
+A layout maps each value held by the threads, the (thread, elem) with elem the index among the values of a thread, to
+the coordinates of a tensor element. `indices` computes the whole mapping as one (threads, elems, rank) array in a
+vectorized pass, it feeds the widgets directly, e.g. the owner of each cell from `owners`, instead of walking a
+generator per thread.
+
+Usage:
+
+    layout = BlockedLayout(size_per_thread=[2, 4], threads_per_warp=[4, 8], warps_per_cta=[2, 2], order=[1, 0])
+    coords = layout.indices([32, 64])  # (128, 16, 2), the (row, col) of the 16 values of each thread
+'''
+import abc
+import math
+from typing import *
+
+import numpy as np
+
+WARP_SIZE = 32
+
+
+class Layout(abc.ABC):
+    '''
+    The mapping from the values of the threads to the elements of a tensor. The tensors smaller than the tile of a
+    layout are broadcast, several threads hold the same element, and the larger ones repeat the tile.
+    '''
+
+    @property
+    @abc.abstractmethod
+    def threads(self) -> int:
+        '''
+        The number of the threads in the CTA.
+        '''
+
+    @property
+    def warp_size(self) -> int:
+        '''
+        The number of the threads in a warp, the warp of a thread is `thread // warp_size`.
+        '''
+        return WARP_SIZE
+
+    @abc.abstractmethod
+    def indices(self, shape: Sequence[int]) -> np.ndarray:
+        '''
+        Get the coordinates held by the threads as a (threads, elems, rank) int64 array.
+        '''
+
+    def owners(self, shape: Sequence[int]) -> np.ndarray:
+        '''
+        Get the thread holding each element of a tensor of `shape`, the lowest thread wins if several hold it, -1 if
+        none does.
+        '''
+        coords = self.indices(shape)
+        flat = np.ravel_multi_index(tuple(np.moveaxis(coords, -1, 0)), tuple(shape)).reshape(-1)
+        threads = np.repeat(np.arange(coords.shape[0]), coords.shape[1])
+        owners = np.full(int(np.prod(shape)), coords.shape[0], dtype=np.int64)
+        np.minimum.at(owners, flat, threads)
+        owners[owners == coords.shape[0]] = -1
+        return owners.reshape(tuple(shape))
+
+    def thread_to_cells(self, shape: Sequence[int]) -> Callable[[int], List[Tuple[int, ...]]]:
+        '''
+        Get a function mapping a thread to its coordinates, e.g. for `WarpDataLayout.set_thread_to_cells_map`.
+        '''
+        coords = self.indices(shape)
+        return lambda thread: [tuple(coord) for coord in coords[thread].tolist()]
+
+    def __repr__(self) -> str:
+        return "%s(%s)" % (type(self).__name__, ", ".join("%s=%r" % item for item in vars(self).items()))
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and vars(self) == vars(other)
+
+    def __hash__(self) -> int:
+        return hash((type(self),) + tuple(vars(self).values()))
+
+
+class BlockedLayout(Layout):
+    '''
+    Each thread holds blocks of `size_per_thread` contiguous elements, the threads of a warp and the warps of a CTA
+    tile the tensor with the blocks, and the tile repeats over a larger tensor.
+    '''
+
+    def __init__(self, size_per_thread: Sequence[int], threads_per_warp: Sequence[int],
+                 warps_per_cta: Sequence[int], order: Sequence[int] = None):
+        '''
+        :param order: the dimensions from the fastest varying to the slowest, the threads, warps and the values of a
+                      thread are numbered along it, the last dimension first by default.
+        '''
+        rank = len(size_per_thread)
+        self.size_per_thread = tuple(int(v) for v in size_per_thread)
+        self.threads_per_warp = tuple(int(v) for v in threads_per_warp)
+        self.warps_per_cta = tuple(int(v) for v in warps_per_cta)
+        self.order = tuple(range(rank - 1, -1, -1)) if order is None else tuple(int(v) for v in order)
+        assert len(self.threads_per_warp) == len(self.warps_per_cta) == rank, "expect the parameters of rank %d" % rank
+        assert sorted(self.order) == list(range(rank)), "expect the order to be a permutation, got %s" % (self.order,)
+
+    @property
+    def threads(self) -> int:
+        return math.prod(self.threads_per_warp) * math.prod(self.warps_per_cta)
+
+    @property
+    def warp_size(self) -> int:
+        return math.prod(self.threads_per_warp)
+
+    @property
+    def tile(self) -> Tuple[int, ...]:
+        '''
+        The shape covered by all the threads once.
+        '''
+        return tuple(s * t * w for s, t, w in zip(self.size_per_thread, self.threads_per_warp, self.warps_per_cta))
+
+    def indices(self, shape: Sequence[int]) -> np.ndarray:
+        assert len(shape) == len(self.order), "expect a tensor of rank %d, got %s" % (len(self.order), shape)
+        thread = np.arange(self.threads)
+        lane = _delinearize(thread % self.warp_size, self.threads_per_warp, self.order)
+        warp = _delinearize(thread // self.warp_size, self.warps_per_cta, self.order)
+
+        # The values of a thread are the blocks of the repeated tiles in turn, each block along the order.
+        tile, size = np.array(self.tile), np.array(self.size_per_thread)
+        reps = tuple(-(-int(n) // t) for n, t in zip(shape, self.tile))
+        block = math.prod(self.size_per_thread)
+        elem = np.arange(math.prod(reps) * block)
+        offsets = _delinearize(elem // block, reps, self.order) * tile + \
+            _delinearize(elem % block, self.size_per_thread, self.order)
+        base = warp * size * np.array(self.threads_per_warp) + lane * size
+        return (base[:, None, :] + offsets[None, :, :]) % np.array(shape)
+
+
+class MmaV1Layout(Layout):
+    '''
+    The accumulator of the mma.m8n8k4 instructions of Volta, the layout depends on the majors of the operands.
+    '''
+
+    # The 4x4 quad-pairs per warp along the M and N axes.
+    FPW = (2, 2)
+
+    def __init__(self, is_a_row: bool, is_b_row: bool, is_a_vec4: bool = False, is_b_vec4: bool = False,
+                 warps_per_cta: Sequence[int] = (1, 1)):
+        '''
+        :param is_a_vec4: whether A is loaded by 4 elements, e.g. `not is_a_row and M <= 16`.
+        :param is_b_vec4: whether B is loaded by 4 elements, e.g. `is_b_row and N <= 16`.
+        '''
+        self.is_a_row = bool(is_a_row)
+        self.is_b_row = bool(is_b_row)
+        self.is_a_vec4 = bool(is_a_vec4)
+        self.is_b_vec4 = bool(is_b_vec4)
+        self.warps_per_cta = tuple(int(v) for v in warps_per_cta)
+        assert len(self.warps_per_cta) == 2, "expect the warps of a 2D CTA, got %s" % (self.warps_per_cta,)
+
+    @property
+    def threads(self) -> int:
+        return WARP_SIZE * math.prod(self.warps_per_cta)
+
+    @property
+    def rep(self) -> Tuple[int, int]:
+        '''
+        The repetitions of a quad-pair along the M and N axes.
+        '''
+        pack_m = 1 if self.is_a_row or self.is_a_vec4 else 2
+        pack_n = 2 if self.is_b_row and not self.is_b_vec4 else 1
+        return 2 * pack_m, 2 * pack_n
+
+    @property
+    def tile(self) -> Tuple[int, int]:
+        rep = self.rep
+        return tuple(f * 4 * r * w for f, r, w in zip(MmaV1Layout.FPW, rep, self.warps_per_cta))
+
+    def indices(self, shape: Sequence[int]) -> np.ndarray:
+        assert len(shape) == 2, "expect a 2D tensor, got %s" % (shape,)
+        (fpw_m, fpw_n), (rep_m, rep_n) = MmaV1Layout.FPW, self.rep
+        thread = np.arange(self.threads)
+        lane, warp = thread % WARP_SIZE, thread // WARP_SIZE
+        warp_m, warp_n = warp % self.warps_per_cta[0], warp // self.warps_per_cta[0] % self.warps_per_cta[1]
+
+        quad = (lane & 16) // 4
+        pair = lane % 16 // 4
+        off_m = (lane & 1) + warp_m * fpw_m * 4 * rep_m + \
+            (pair % fpw_m * 4 + quad * fpw_m) * (rep_m // 2)
+        # The accumulator skips the quad offset along N.
+        off_n = (lane & 2) + warp_n * fpw_n * 4 * rep_n + pair // fpw_m % fpw_n * 4 * (rep_n // 2)
+
+        tile = self.tile
+        mm = np.arange(rep_m)
+        rows = (np.arange(0, shape[0], tile[0])[:, None] + mm * 2).reshape(-1)
+        nn = np.arange(rep_n)
+        cols = np.arange(0, shape[1], tile[1])[:, None, None] + (nn // 2 * 4 + nn % 2 * 2 * fpw_n * rep_n)[:, None] + \
+            np.arange(2)
+        cols = cols.reshape(-1)
+        row = off_m[:, None, None] + rows[None, :, None]
+        col = off_n[:, None, None] + cols[None, None, :]
+        row, col = np.broadcast_arrays(row, col)
+        coords = np.stack([row.reshape(len(thread), -1), col.reshape(len(thread), -1)], axis=-1)
+        return coords % np.array(shape)
+
+
+class MmaV2Layout(Layout):
+    '''
+    The accumulator of the mma.m16n8 instructions of Ampere, each warp computes a 16x8 tile, the tiles of the warps
+    are stacked along M first and repeat over the tensor.
+    '''
+
+    INSTR_SHAPE = (16, 8)
+
+    def __init__(self, warps_per_cta: Sequence[int] = (1, 1)):
+        self.warps_per_cta = tuple(int(v) for v in warps_per_cta)
+        assert len(self.warps_per_cta) == 2, "expect the warps of a 2D CTA, got %s" % (self.warps_per_cta,)
+
+    @property
+    def threads(self) -> int:
+        return WARP_SIZE * math.prod(self.warps_per_cta)
+
+    def _warps(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        '''
+        The (group, thread in group, warp along M, warp along N) of each thread.
+        '''
+        thread = np.arange(self.threads)
+        lane, warp = thread % WARP_SIZE, thread // WARP_SIZE
+        return lane // 4, lane % 4, warp % self.warps_per_cta[0], warp // self.warps_per_cta[0] % self.warps_per_cta[1]
+
+    def indices(self, shape: Sequence[int]) -> np.ndarray:
+        assert len(shape) == 2, "expect a 2D tensor, got %s" % (shape,)
+        group, lane_in_group, warp_m, warp_n = self._warps()
+        tile = (16 * self.warps_per_cta[0], 8 * self.warps_per_cta[1])
+        # The values are (row, col), (row, col + 1), (row + 8, col), (row + 8, col + 1) in each repetition.
+        i = np.arange(4)
+        row = group[:, None] + warp_m[:, None] * 16 + i // 2 * 8
+        col = lane_in_group[:, None] * 2 + warp_n[:, None] * 8 + i % 2
+        return _repeat(row, col, tile, shape)
+
+
+class DotOperandLayout(Layout):
+    '''
+    The A (op_idx 0, M x K) or B (op_idx 1, K x N) operand of the 16-bit mma.m16n8k16 of an MmaV2Layout, the warps
+    along the other axis of the accumulator hold the same operand values.
+    '''
+
+    def __init__(self, op_idx: int, parent: MmaV2Layout):
+        assert op_idx in (0, 1), "expect op_idx 0 for A or 1 for B, got %s" % op_idx
+        self.op_idx = op_idx
+        self.parent = parent
+
+    @property
+    def threads(self) -> int:
+        return self.parent.threads
+
+    @property
+    def warp_size(self) -> int:
+        return self.parent.warp_size
+
+    def indices(self, shape: Sequence[int]) -> np.ndarray:
+        assert len(shape) == 2, "expect a 2D tensor, got %s" % (shape,)
+        group, lane_in_group, warp_m, warp_n = self.parent._warps()
+        warps_m, warps_n = self.parent.warps_per_cta
+        if self.op_idx == 0:
+            # A 16x16 tile per warp, the values are pairs along K in the 4 quadrants, column-major.
+            i = np.arange(8)
+            row = group[:, None] + warp_m[:, None] * 16 + i // 2 % 2 * 8
+            col = lane_in_group[:, None] * 2 + i % 2 + i // 4 * 8
+            return _repeat(row, col, (16 * warps_m, 16), shape)
+        # A 16x8 tile per warp, the values are pairs along K in the 2 halves.
+        i = np.arange(4)
+        row = lane_in_group[:, None] * 2 + i % 2 + i // 2 * 8
+        col = np.broadcast_to(group[:, None] + warp_n[:, None] * 8, row.shape)
+        return _repeat(row, col, (16, 8 * warps_n), shape)
+
+
+class SliceLayout(Layout):
+    '''
+    The layout of a tensor reduced along `dim` of a tensor in the `parent` layout, a thread holds the coordinates of
+    its parent values without the dimension, each once.
+    '''
+
+    def __init__(self, dim: int, parent: Layout):
+        self.dim = dim
+        self.parent = parent
+
+    @property
+    def threads(self) -> int:
+        return self.parent.threads
+
+    @property
+    def warp_size(self) -> int:
+        return self.parent.warp_size
+
+    def indices(self, shape: Sequence[int]) -> np.ndarray:
+        padded = list(shape[:self.dim]) + [1] + list(shape[self.dim:])
+        coords = np.delete(self.parent.indices(padded), self.dim, axis=-1)
+        if not coords.shape[-1]:
+            return coords[:, :1]
+        # Keep the first of the equal coordinates of each thread in order.
+        flat = np.ravel_multi_index(tuple(np.moveaxis(coords, -1, 0)), tuple(shape))
+        ranks = np.argsort(flat, axis=1, kind="stable")
+        ordered = np.take_along_axis(flat, ranks, axis=1)
+        first = np.ones(flat.shape, dtype=bool)
+        first[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+        keep = np.empty(flat.shape, dtype=bool)
+        np.put_along_axis(keep, ranks, first, axis=1)
+        counts = keep.sum(axis=1)
+        assert (counts == counts[0]).all(), "expect the threads to hold the same number of values"
+        return coords[keep].reshape(coords.shape[0], int(counts[0]), coords.shape[-1])
+
+
+def _delinearize(index: np.ndarray, shape: Sequence[int], order: Sequence[int]) -> np.ndarray:
+    '''
+    Split the linear indices into (..., rank) coordinates, `order[0]` varies the fastest.
+    '''
+    coords = np.empty(np.shape(index) + (len(shape),), dtype=np.int64)
+    for dim in order:
+        coords[..., dim] = index % shape[dim]
+        index = index // shape[dim]
+    return coords
+
+
+def _repeat(row: np.ndarray, col: np.ndarray, tile: Tuple[int, int], shape: Sequence[int]) -> np.ndarray:
+    '''
+    Repeat the (threads, values) coordinates of a tile over a tensor, the repetitions along M go first, then N, and
+    the tensors smaller than the tile are broadcast.
+    '''
+    reps_m, reps_n = -(-int(shape[0]) // tile[0]), -(-int(shape[1]) // tile[1])
+    rep_m = np.repeat(np.arange(reps_m), reps_n) * tile[0]
+    rep_n = np.tile(np.arange(reps_n), reps_m) * tile[1]
+    rows = (row[:, None, :] + rep_m[None, :, None]).reshape(len(row), -1)
+    cols = (col[:, None, :] + rep_n[None, :, None]).reshape(len(col), -1)
+    return np.stack([rows % shape[0], cols % shape[1]], axis=-1)
@@ -0,0 +1,85 @@
+'''
+Level of detail of large matrices.
+
+A matrix too large for the target resolution is shown with one cell standing for a block of cells, the blocks are
+reduced with pooling on the values or the colors of the cells.
+'''
+import math
+import warnings
+from typing import *
+
+import numpy as np
+
+# The pooling methods on values.
+VALUE_POOLS = ("mean", "max", "min")
+# The pooling methods on the fill colors, "any" keeps the highlighted cells visible.
+COLOR_POOLS = ("any", "color")
+POOLS = VALUE_POOLS + COLOR_POOLS
+
+
+Factor = Union[int, Tuple[int, int]]
+
+
+def _factors(factor: Factor) -> Tuple[int, int]:
+    return (factor, factor) if isinstance(factor, int) else tuple(factor)
+
+
+def pooled_shape(shape: Tuple[int, int], factor: Factor) -> Tuple[int, int]:
+    '''
+    The shape of a (rows, cols) array pooled by blocks of `factor`, an int or (rows, cols) of a block.
+    '''
+    block = _factors(factor)
+    return math.ceil(shape[0] / block[0]), math.ceil(shape[1] / block[1])
+
+
+def _blocks(array: np.ndarray, factor: Factor, pad_value) -> np.ndarray:
+    '''
+    View a (rows, cols, ...) array as (rows', cols', cells of a block, ...), the array is padded with `pad_value` to
+    the multiples of the block.
+    '''
+    block = _factors(factor)
+    rows, cols = pooled_shape(array.shape[:2], block)
+    pad = [(0, rows * block[0] - array.shape[0]), (0, cols * block[1] - array.shape[1])] + \
+        [(0, 0)] * (array.ndim - 2)
+    if any(after for _, after in pad):
+        array = np.pad(array, pad, constant_values=pad_value)
+    blocks = array.reshape((rows, block[0], cols, block[1]) + array.shape[2:])
+    blocks = np.moveaxis(blocks, 2, 1)
+    return blocks.reshape((rows, cols, block[0] * block[1]) + array.shape[2:])
+
+
+def pool_values(values: np.ndarray, factor: Factor, how: str = "mean") -> np.ndarray:
+    '''
+    Reduce each block of a 2D array to one value, NaN is ignored.
+
+    :param how: one of "mean", "max" and "min".
+    '''
+    assert how in VALUE_POOLS, "pool the values with one of %s" % (VALUE_POOLS,)
+    blocks = _blocks(np.asarray(values, dtype=np.float32), factor, np.nan)
+    reduce = {"mean": np.nanmean, "max": np.nanmax, "min": np.nanmin}[how]
+    with warnings.catch_warnings():
+        # A block of NaN reduces to NaN silently.
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return reduce(blocks, axis=2)
+
+
+def pool_colors(fill: np.ndarray, factor: Factor, how: str = "color", base=None) -> np.ndarray:
+    '''
+    Reduce each block of (rows, cols, 3) colors to one color.
+
+    :param how: "color" takes the mean color of a block, "any" takes the mean color of the cells different from `base`,
+                so a single highlighted cell marks its block, the block is `base` if no cell differs.
+    '''
+    assert how in COLOR_POOLS, "pool the colors with one of %s" % (COLOR_POOLS,)
+    valid = _blocks(np.ones(fill.shape[:2], dtype=bool), factor, False)
+    if how == "any":
+        differs = (fill != np.asarray(base, dtype=np.uint8)).any(axis=-1)
+        valid = valid & _blocks(differs, factor, False)
+    colors = _blocks(fill, factor, 0).astype(np.uint32)
+    counts = valid.sum(axis=2)
+    sums = (colors * valid[..., None]).sum(axis=2)
+    pooled = (sums + counts[..., None] // 2) // np.maximum(counts, 1)[..., None]
+    pooled = pooled.astype(np.uint8)
+    if how == "any":
+        pooled[counts == 0] = base
+    return pooled
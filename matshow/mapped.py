@@ -0,0 +1,227 @@
+'''
+Render tensors too large for the memory.
+
+A MappedMatrix memory-maps a tensor dumped by `np.save` or `np.savez` and renders it as a heatmap band by band, each
+band reads only its own rows, rasterizes them and appends the pixels to the output, so the peak memory is bounded by
+the size of a band rather than the tensor or the image.
+'''
+import math
+import zipfile
+from typing import *
+
+import numpy as np
+from PIL import Image
+
+from matshow.display_list import to_rgb
+from matshow.draw import Matrix
+from matshow.grid import rasterize
+from matshow.heatmap import apply as apply_colormap
+from matshow.png import PNGWriter
+
+# The default budget of the pixels of a band in bytes.
+BAND_BYTES = 64 << 20
+
+
+class _MappedRows:
+    '''
+    The rows of a memory-mapped tensor viewed as 2D.
+    '''
+
+    def __init__(self, array: np.ndarray):
+        self.array = array.reshape(_as_2d(array.shape))
+        self.shape = self.array.shape
+
+    def bands(self, band_rows: int) -> Iterator[Tuple[int, np.ndarray]]:
+        for start in range(0, self.shape[0], band_rows):
+            yield start, self.array[start:start + band_rows]
+
+
+class _StreamedRows:
+    '''
+    The rows of a compressed npz member, they could not be mapped and are decompressed sequentially instead.
+    '''
+
+    def __init__(self, path: str, name: str, shape: Tuple[int, ...], dtype: np.dtype):
+        self.path = path
+        self.name = name
+        self.shape = _as_2d(shape)
+        self.dtype = dtype
+
+    def bands(self, band_rows: int) -> Iterator[Tuple[int, np.ndarray]]:
+        row_bytes = self.shape[1] * self.dtype.itemsize
+        with zipfile.ZipFile(self.path) as archive, archive.open(self.name) as file:
+            _read_header(file)
+            for start in range(0, self.shape[0], band_rows):
+                rows = min(band_rows, self.shape[0] - start)
+                buffer = file.read(rows * row_bytes)
+                yield start, np.frombuffer(buffer, dtype=self.dtype).reshape(rows, self.shape[1])
+
+
+def _as_2d(shape: Sequence[int]) -> Tuple[int, int]:
+    '''
+    Fold a shape into (rows, cols), the last dimension is the columns.
+    '''
+    if len(shape) == 0:
+        return 1, 1
+    if len(shape) == 1:
+        return 1, shape[0]
+    return math.prod(shape[:-1]), shape[-1]
+
+
+def _read_header(file) -> Tuple[Tuple[int, ...], bool, np.dtype]:
+    version = np.lib.format.read_magic(file)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(file)
+    return np.lib.format.read_array_header_2_0(file)
+
+
+def _open_npz(path: str, key: Optional[str]) -> Union[_MappedRows, _StreamedRows]:
+    with zipfile.ZipFile(path) as archive:
+        names = [name[:-len(".npy")] for name in archive.namelist()]
+        if key is None:
+            assert len(names) == 1, "the npz has arrays %s, pick one by key" % names
+            key = names[0]
+        assert key in names, "no array %s in the npz, it has %s" % (key, names)
+        info = archive.getinfo(key + ".npy")
+        with archive.open(info) as file:
+            shape, fortran_order, dtype = _read_header(file)
+            header_size = file.tell()
+
+    if info.compress_type != zipfile.ZIP_STORED:
+        assert not fortran_order, "a compressed npz member should be in C order to be streamed"
+        return _StreamedRows(path, info.filename, shape, dtype)
+
+    # A stored member is the plain npy file within the zip, map its data right after the local file header.
+    with open(path, "rb") as file:
+        file.seek(info.header_offset)
+        local_header = file.read(30)
+        name_size = int.from_bytes(local_header[26:28], "little")
+        extra_size = int.from_bytes(local_header[28:30], "little")
+    offset = info.header_offset + 30 + name_size + extra_size + header_size
+    return _MappedRows(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape,
+                                 order="F" if fortran_order else "C"))
+
+
+def open_rows(path: str, key: str = None) -> Union[_MappedRows, _StreamedRows]:
+    '''
+    Open a tensor in a .npy or .npz file without loading it.
+
+    :param key: the name of the array in a .npz file, it could be omitted if the file holds only one array.
+    '''
+    if zipfile.is_zipfile(path):
+        return _open_npz(path, key)
+    return _MappedRows(np.load(path, mmap_mode="r"))
+
+
+class MappedMatrix:
+    '''
+    A heatmap of a tensor in a .npy or .npz file rendered in horizontal bands.
+
+    The tensor is folded into 2D with its last dimension as the columns, the cells are laid out as a compact Matrix
+    with the same `cell_config`, that is `cell_config.width` by `cell_config.height` pixels per cell with outlines of
+    `cell_config.border`, and the image is (cols * width + 1, rows * height + 1).
+
+    Usage:
+
+        MappedMatrix("weights.npy", cell_config=Matrix.CellConfig(4, border=0)).save("weights.png")
+    '''
+
+    def __init__(self, path: str, key: str = None, cell_config: Matrix.CellConfig = Matrix.CellConfig(20, 20),
+                 cmap="heat", norm: str = "linear", vmin: float = None, vmax: float = None,
+                 band_bytes: int = BAND_BYTES):
+        '''
+        :param cmap, norm, vmin, vmax: the same as `Matrix.heatmap`, the missing range is found by scanning the tensor
+                                       band by band once.
+        :param band_bytes: the budget of the pixels of a band, it determines the number of rows per band.
+        '''
+        self.path = path
+        self.rows = open_rows(path, key)
+        self.cell_config = cell_config
+        self.cmap = cmap if cmap is not None else (
+            "diverging" if norm == "symmetric" else "heat")
+        self.norm = norm
+        self.vmin = vmin
+        self.vmax = vmax
+        self.band_bytes = band_bytes
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.rows.shape
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        '''
+        The (width, height) of the image.
+        '''
+        rows, cols = self.shape
+        return cols * self.cell_config.width + 1, rows * self.cell_config.height + 1
+
+    @property
+    def band_rows(self) -> int:
+        '''
+        The number of rows of cells per band.
+        '''
+        band_height = self.cell_config.height * self.size[0] * 3
+        return max(1, self.band_bytes // band_height)
+
+    def value_range(self) -> Tuple[Optional[float], Optional[float]]:
+        '''
+        Resolve the (vmin, vmax) passed to the colormap, the missing ones are reduced over the bands.
+        '''
+        need_min = self.vmin is None and self.norm != "symmetric"
+        need_max = self.vmax is None
+        if not need_min and not need_max:
+            return self.vmin, self.vmax
+
+        lows, highs = [], []
+        for _, values in self.rows.bands(self._value_band_rows()):
+            if need_min:
+                # The log norm starts from the smallest positive value.
+                low = values[values > 0] if self.norm == "log" else values
+                if low.size:
+                    lows.append(np.nanmin(low))
+            if need_max:
+                highs.append(np.nanmax(np.abs(values))
+                             if self.norm == "symmetric" else np.nanmax(values))
+        if need_min:
+            self.vmin = float(np.nanmin(lows)) if lows else 1.
+        if need_max:
+            self.vmax = float(np.nanmax(highs))
+        return self.vmin, self.vmax
+
+    def bands(self) -> Iterator[np.ndarray]:
+        '''
+        Render the bands from top to bottom, each is an (h, width, 3) uint8 image.
+        '''
+        vmin, vmax = self.value_range()
+        config = self.cell_config
+        outline = np.empty((1, 1, 3), dtype=np.uint8)
+        outline[...] = to_rgb(config.outline)
+        total = self.shape[0]
+        width = self.size[0]
+        for start, values in self.rows.bands(self.band_rows):
+            fill = apply_colormap(values, self.cmap, self.norm, vmin, vmax)
+            last = start + len(values) == total
+            # The bottom outline of a row of cells is the top of the next row, it belongs to the next band except for
+            # the last band.
+            height = len(values) * config.height + (1 if last else 0)
+            yield rasterize(fill, np.broadcast_to(outline, fill.shape), config.border, config.width, config.height,
+                            region=(0, 0, width, height))
+
+    def save(self, path_or_file: Union[str, BinaryIO]) -> None:
+        '''
+        Stream the image to a PNG file.
+        '''
+        width, height = self.size
+        with PNGWriter(path_or_file, width, height) as writer:
+            for band in self.bands():
+                writer.write(band)
+
+    def to_image(self) -> Image.Image:
+        '''
+        Render the whole image in memory, it is for the tensors of moderate size.
+        '''
+        return Image.fromarray(np.concatenate(list(self.bands())))
+
+    def _value_band_rows(self) -> int:
+        return max(1, self.band_bytes // max(1, self.shape[1] * 8))
@@ -0,0 +1,104 @@
+'''
+A streaming PNG writer.
+
+Pillow needs the whole image in memory to save it, this writer takes the rows band by band instead, so an image far
+larger than the memory could be written.
+'''
+import struct
+import zlib
+from typing import *
+
+import numpy as np
+
+_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Flush an IDAT chunk once this many compressed bytes are pending.
+_CHUNK_SIZE = 1 << 20
+
+
+class PNGWriter:
+    '''
+    Write an 8-bit RGB PNG row by row, the rows should be appended from top to bottom.
+    '''
+
+    def __init__(self, path_or_file: Union[str, BinaryIO], width: int, height: int, compress_level: int = 6):
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._own_file = isinstance(path_or_file, str)
+        self._file = open(path_or_file, "wb") if self._own_file else path_or_file
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending: List[bytes] = []
+        self._pending_size = 0
+
+        self._file.write(_SIGNATURE)
+        # 8 bits per channel, color type 2 (RGB)
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def write(self, rows: np.ndarray) -> None:
+        '''
+        Append rows of shape (n, width, 3) in uint8.
+        '''
+        assert rows.ndim == 3 and rows.shape[1:] == (self.width, 3), \
+            "expect rows of shape (n, %d, 3), got %s" % (self.width, rows.shape)
+        assert self.rows_written + len(rows) <= self.height, "too many rows"
+        # Each scanline starts with the filter type, 0 means no filtering.
+        scanlines = np.zeros((len(rows), self.width * 3 + 1), dtype=np.uint8)
+        scanlines[:, 1:] = rows.reshape(len(rows), -1)
+        self._append(self._compressor.compress(scanlines.tobytes()))
+        self.rows_written += len(rows)
+
+    def close(self) -> None:
+        assert self.rows_written == self.height, "expect %d rows, got %d" % (
+            self.height, self.rows_written)
+        self._append(self._compressor.flush())
+        self._flush()
+        self._chunk(b"IEND", b"")
+        if self._own_file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        elif self._own_file:
+            self._file.close()
+
+    def _append(self, data: bytes) -> None:
+        if data:
+            self._pending.append(data)
+            self._pending_size += len(data)
+        if self._pending_size >= _CHUNK_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._chunk(b"IDAT", b"".join(self._pending))
+            self._pending.clear()
+            self._pending_size = 0
+
+    def _chunk(self, kind: bytes, data: bytes) -> None:
+        write_chunk(self._file, kind, data)
+
+
+def write_chunk(file: BinaryIO, kind: bytes, data: bytes) -> None:
+    '''
+    Write a PNG chunk, the length and CRC are computed.
+    '''
+    file.write(struct.pack(">I", len(data)))
+    file.write(kind)
+    file.write(data)
+    file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
+
+
+def read_chunks(data: bytes) -> Iterable[Tuple[bytes, bytes]]:
+    '''
+    Iterate the (kind, data) of the chunks of a PNG file in memory.
+    '''
+    assert data[:len(_SIGNATURE)] == _SIGNATURE, "not a PNG file"
+    pos = len(_SIGNATURE)
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        yield kind, data[pos + 8:pos + 8 + length]
+        pos += 12 + length
@@ -0,0 +1,589 @@
+'''
+Streaming sinks of animation frames.
+
+A sink encodes each frame as soon as it is added and writes it out, so only a frame or two are held in memory. The
+encoder of WebP takes the frames at once, so WebP spools the raw frames to a temporary file and reads them back one at
+a time when closing. The formats trade the encoding speed against the size:
+
+    format   sink        speed     size      notes
+    .rgb     RawSink     -         largest   raw RGB24 for external encoders such as ffmpeg
+    .gif     GIFSink     fast      small     delta frames on a global palette, exact up to 255 colors
+    .png     APNGSink    fast      small     lossless delta frames, `compress_level` trades speed for size
+    .webp    WebPSink    slow      smallest  lossless or lossy, `method` trades speed for size, spooled until closing
+
+`open_sink` picks the sink by the extension of the path.
+'''
+import abc
+import io
+import struct
+import tempfile
+from typing import *
+
+import numpy as np
+from PIL import GifImagePlugin, Image, ImageChops, ImageFile, features
+
+from matshow import png
+from matshow.colors import pack, unpack
+
+# A (left, top, right, bottom) in pixels, the right and bottom are exclusive.
+Region = Tuple[int, int, int, int]
+
+
+class FrameSink(abc.ABC):
+    '''
+    The consumer of the frames of an animation, the frames are added in order and the sink is closed after the last
+    one.
+    '''
+
+    def __init__(self, duration: float = 1):
+        '''
+        :param duration: the seconds each frame shows unless given when adding it.
+        '''
+        self.duration = duration
+        self.frames = 0
+
+    def add(self, frame: Image.Image, damage: Optional[List[Region]] = None, duration: Optional[float] = None) -> None:
+        '''
+        Append a frame, the sink doesn't keep a reference to it, so the canvas could be drawn again right after.
+
+        :param damage: the regions changed since the previous frame, None if unknown, a sink could encode only them.
+        :param duration: the seconds this frame shows, `self.duration` if None.
+        '''
+        self._add(frame, damage, self.duration if duration is None else duration)
+        self.frames += 1
+
+    @abc.abstractmethod
+    def _add(self, frame: Image.Image, damage: Optional[List[Region]], duration: float) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def _discard(self) -> None:
+        '''
+        Release the resources without finishing the output, it is called when the frames fail to be produced.
+        '''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+
+class _FileSink(FrameSink):
+    '''
+    A sink writing to a path or a binary file, the file opened from a path is closed along with the sink.
+    '''
+
+    def __init__(self, path_or_file: Union[str, BinaryIO], duration: float = 1):
+        super().__init__(duration)
+        self._own_file = isinstance(path_or_file, str)
+        self._file = open(path_or_file, "wb") if self._own_file else path_or_file
+        self._closed = False
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._finish()
+        if self._own_file:
+            self._file.close()
+
+    def _discard(self) -> None:
+        self._closed = True
+        if self._own_file:
+            self._file.close()
+
+    def _finish(self) -> None:
+        pass
+
+
+# A frame encoded but not written yet, the frames without any change extend its duration.
+_Pending = NamedTuple("_Pending", [("frame", Any), ("duration", float)])
+
+
+class _DeltaSink(_FileSink):
+    '''
+    A sink encoding each frame as the bounding box of the pixels changed from the previous frame, a frame without any
+    change extends the duration of the previous one. The previous frame and an encoded frame are held.
+
+    The indexed ("P") frames are compared and encoded as the indices of the palette of the sink, which collects the
+    colors of the frames, so the frames could have palettes of their own. The sink falls back to RGB once a frame is
+    not indexed or the colors overflow the palette.
+    '''
+
+    def __init__(self, path_or_file: Union[str, BinaryIO], duration: float = 1):
+        super().__init__(path_or_file, duration)
+        self.size: Optional[Tuple[int, int]] = None
+        # The previous frame, "P" of the indices into the palette of the sink if indexed else "RGB".
+        self._previous: Optional[Image.Image] = None
+        self._pending: Optional[_Pending] = None
+        # The packed 0xRRGGBB of the palette of the indexed frames -> the index, None if the frames are RGB.
+        self._indices: Optional[Dict[int, int]] = None
+        self._palette = np.zeros((256, 3), dtype=np.uint8)
+        # The palette of the last indexed frame and the lookup table from it to the palette of the sink.
+        self._frame_palette = b""
+        self._lut = np.zeros(0, dtype=np.uint8)
+
+    def _add(self, frame: Image.Image, damage: Optional[List[Region]], duration: float) -> None:
+        if self.size is None:
+            self.size = frame.size
+            self._indices = {} if frame.mode == "P" else None
+            self._start()
+        assert frame.size == self.size, "expect frames of %s, got %s" % (self.size, frame.size)
+        if self._indices is not None:
+            indexed = self._index(frame) if frame.mode == "P" else None
+            if indexed is None:
+                self._fall_back_to_rgb()
+            else:
+                frame = indexed
+        if self._indices is None and frame.mode != "RGB":
+            frame = frame.convert("RGB")
+
+        if self._previous is None:
+            self._previous = frame.copy()
+            self._push(self._encode(np.asarray(frame), None, (0, 0)), duration)
+            return
+
+        box = (0, 0) + self.size
+        if damage is not None:
+            # Only the damaged regions could change.
+            box = (max(min((r[0] for r in damage), default=0), 0), max(min((r[1] for r in damage), default=0), 0),
+                   min(max((r[2] for r in damage), default=0), self.size[0]),
+                   min(max((r[3] for r in damage), default=0), self.size[1]))
+        changed = None
+        if box[0] < box[2] and box[1] < box[3]:
+            changed = ImageChops.difference(self._previous.crop(box), frame.crop(box)).getbbox()
+        if changed is None:
+            self._pending = self._pending._replace(duration=self._pending.duration + duration)
+            return
+        box = (box[0] + changed[0], box[1] + changed[1], box[0] + changed[2], box[1] + changed[3])
+        current = frame.crop(box)
+        pixels, previous = np.asarray(current), np.asarray(self._previous.crop(box))
+        self._previous.paste(current, box[:2])
+        diff = pixels ^ previous
+        unchanged = diff == 0 if diff.ndim == 2 else (diff[..., 0] | diff[..., 1] | diff[..., 2]) == 0
+        self._push(self._encode(pixels, unchanged, box[:2]), duration)
+
+    def _index(self, frame: Image.Image) -> Optional[Image.Image]:
+        '''
+        Map an indexed frame to the indices of the palette of the sink, returns None if the colors overflow it. The
+        frames of a FrameRenderer share the palette growing along, so they are taken as they are.
+        '''
+        data = bytes(frame.getpalette("RGB"))
+        if data != self._frame_palette:
+            self._lut = self._map_palette(data, frame)
+            if self._lut is None:
+                return None
+            self._frame_palette = data
+        if self._lut.size == 0:
+            return frame
+        indices = self._lut[np.asarray(frame)]
+        return Image.frombytes("P", frame.size, indices.tobytes())
+
+    def _map_palette(self, data: bytes, frame: Image.Image) -> Optional[np.ndarray]:
+        '''
+        Get the lookup table from the indices of `frame` to the palette of the sink, it is empty if they are the same.
+        '''
+        palette = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        keys = pack(palette).tolist()
+        entries = range(len(keys))
+        if len(self._indices) + sum(key not in self._indices for key in keys) > 256:
+            # Only the colors used take the slots, e.g. a quantized frame has a full palette.
+            entries = np.flatnonzero(np.bincount(np.asarray(frame).reshape(-1), minlength=len(keys))).tolist()
+        lut = np.zeros(len(keys), dtype=np.uint8)
+        for i in entries:
+            index = self._indices.get(keys[i])
+            if index is None:
+                if len(self._indices) == 256:
+                    return None
+                index = self._indices[keys[i]] = len(self._indices)
+                self._palette[index] = palette[i]
+            lut[i] = index
+        return lut[:0] if (lut == np.arange(len(lut))).all() else lut
+
+    def _fall_back_to_rgb(self) -> None:
+        if self._previous is not None:
+            self._previous = Image.fromarray(self._palette[np.asarray(self._previous)])
+        self._indices = None
+
+    def _rgb(self, pixels: np.ndarray) -> np.ndarray:
+        '''
+        The (H, W, 3) colors of the pixels passed to `_encode`.
+        '''
+        return self._palette[pixels] if pixels.ndim == 2 else pixels
+
+    def _finish(self) -> None:
+        assert self.size is not None, "an animation needs at least one frame"
+        self._flush()
+        self._end()
+
+    def _push(self, frame, duration: float) -> None:
+        self._flush()
+        self._pending = _Pending(frame, duration)
+
+    def _flush(self) -> None:
+        if self._pending is not None:
+            self._write(*self._pending)
+            self._pending = None
+
+    @abc.abstractmethod
+    def _start(self) -> None:
+        '''
+        Write the header once the size is known.
+        '''
+
+    @abc.abstractmethod
+    def _encode(self, pixels: np.ndarray, unchanged: Optional[np.ndarray], offset: Tuple[int, int]):
+        '''
+        Encode the (H, W, 3) pixels of a frame at `offset`, or (H, W) indices of the palette if indexed, see `_rgb`, the
+        `unchanged` pixels could be left transparent, it is None for the first frame.
+        '''
+
+    @abc.abstractmethod
+    def _write(self, frame, duration: float) -> None:
+        pass
+
+    @abc.abstractmethod
+    def _end(self) -> None:
+        '''
+        Write the trailer after the last frame.
+        '''
+
+
+_GIFFrame = NamedTuple("_GIFFrame", [("image", Image.Image), ("offset", Tuple[int, int]), ("transparent", bool),
+                                     ("local", bool)])
+
+
+class GIFSink(_DeltaSink):
+    '''
+    Write a GIF incrementally with delta frames.
+
+    Each frame is compared with the previous one and cropped to the bounding box of the changed pixels, the unchanged
+    pixels within the box are transparent so the previous frame shows through, and a frame without any change extends
+    the duration of the previous one. The scenes use a few colors, so the colors take the slots of one global palette
+    as they show up, and the palette is written to the header on closing. A frame with more colors than the palette
+    could take, or any frame of a file which could not seek, carries a palette of its own.
+    '''
+
+    # The palette index of the transparent pixels.
+    TRANSPARENT = 255
+
+    def __init__(self, path_or_file: Union[str, BinaryIO], duration: float = 1, loop: Optional[int] = None):
+        '''
+        :param duration: the seconds each frame shows, GIF counts in hundredths of a second.
+        :param loop: the times to repeat the animation, 0 for forever, it plays once if None.
+        '''
+        super().__init__(path_or_file, duration)
+        self.loop = loop
+        # The global palette is patched into the header on closing, which needs seeking back.
+        self._global = self._file.seekable()
+        self._palette_pos = 0
+        # The packed 0xRRGGBB -> the index in the global palette.
+        self._slots: Dict[int, int] = {}
+
+    def _start(self) -> None:
+        # The global palette takes 256 colors if any.
+        flags = 0x80 | 7 if self._global else 0
+        self._file.write(b"GIF89a" + struct.pack("<HHBBB", self.size[0], self.size[1], flags, 0, 0))
+        if self._global:
+            self._palette_pos = self._file.tell()
+            self._file.write(bytes(256 * 3))
+        if self.loop is not None:
+            self._file.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", self.loop) + b"\x00")
+
+    def _encode(self, pixels: np.ndarray, unchanged: Optional[np.ndarray], offset: Tuple[int, int]) -> _GIFFrame:
+        # Only the changed pixels are indexed, a delta frame changes a few of its box.
+        changed = pixels.reshape((-1,) + pixels.shape[2:]) if unchanged is None else pixels[~unchanged]
+        if changed.ndim == 1:
+            # The indices of the palette of the sink, the colors are already counted.
+            used = np.flatnonzero(np.bincount(changed, minlength=256))
+            colors = pack(self._palette[used])
+            compact = np.zeros(256, dtype=np.intp)
+            compact[used] = np.arange(len(used))
+            inverse = compact[changed]
+        else:
+            colors, inverse = np.unique(pack(changed), return_inverse=True)
+        local = not self._assign_slots(colors.tolist())
+        if not local:
+            lut = np.array([self._slots[key] for key in colors.tolist()], dtype=np.uint8)
+            palette = None
+        elif len(colors) < GIFSink.TRANSPARENT:
+            lut = np.arange(len(colors), dtype=np.uint8)
+            palette = unpack(colors).tobytes()
+        else:
+            quantized = Image.fromarray(self._rgb(pixels)).quantize(GIFSink.TRANSPARENT)
+            lut = None
+            palette = quantized.getpalette()[:GIFSink.TRANSPARENT * 3]
+
+        if lut is None:
+            indices = np.array(quantized, dtype=np.uint8)
+        elif unchanged is None:
+            indices = lut[inverse].reshape(pixels.shape[:2])
+        else:
+            indices = np.full(pixels.shape[:2], GIFSink.TRANSPARENT, dtype=np.uint8)
+            indices[~unchanged] = lut[inverse.reshape(-1)]
+        if unchanged is not None:
+            indices[unchanged] = GIFSink.TRANSPARENT
+        image = Image.fromarray(indices, "P")
+        if palette is not None:
+            # The transparent index is at the end of a full palette.
+            image.putpalette(bytes(palette) + bytes(256 * 3 - len(palette)))
+        return _GIFFrame(image, offset, unchanged is not None, local)
+
+    def _assign_slots(self, colors: List[int]) -> bool:
+        '''
+        Take the slots of the global palette for the new colors, returns False if the palette is full or not global.
+        '''
+        if not self._global:
+            return False
+        new = [key for key in colors if key not in self._slots]
+        if len(self._slots) + len(new) > GIFSink.TRANSPARENT:
+            return False
+        for key in new:
+            self._slots[key] = len(self._slots)
+        return True
+
+    def _write(self, frame: _GIFFrame, duration: float) -> None:
+        params = dict(duration=int(round(duration * 1000)), include_color_table=frame.local, disposal=1)
+        if frame.transparent:
+            params["transparency"] = GIFSink.TRANSPARENT
+        for data in GifImagePlugin.getdata(frame.image, offset=frame.offset, **params):
+            self._file.write(data)
+
+    def _end(self) -> None:
+        self._file.write(b";")  # trailer
+        if self._global:
+            palette = bytearray(256 * 3)
+            for key, index in self._slots.items():
+                palette[index * 3:index * 3 + 3] = key.to_bytes(3, "big")
+            end = self._file.tell()
+            self._file.seek(self._palette_pos)
+            self._file.write(bytes(palette))
+            self._file.seek(end)
+
+
+_APNGFrame = NamedTuple("_APNGFrame", [("data", bytes), ("offset", Tuple[int, int]), ("size", Tuple[int, int]),
+                                       ("blend", bool)])
+
+
+class APNGSink(_DeltaSink):
+    '''
+    Write an animated PNG incrementally with delta frames.
+
+    The frames are RGBA, a frame is cropped to the bounding box of the changed pixels and the unchanged pixels are
+    transparent to blend over the previous frame. The frame count is patched into the header on closing, so the file
+    should be able to seek.
+    '''
+
+    def __init__(self, path_or_file: Union[str, BinaryIO], duration: float = 1, loop: Optional[int] = None,
+                 compress_level: int = 6):
+        '''
+        :param loop: the times to play the animation, 0 for forever, it plays once if None.
+        :param compress_level: the zlib level, 1 is the fastest and 9 the smallest.
+        '''
+        super().__init__(path_or_file, duration)
+        assert self._file.seekable(), "APNG needs a file able to seek"
+        self.loop = loop
+        self.compress_level = compress_level
+        self._actl_pos = 0
+        self._sequence = 0
+        self._written = 0
+
+    def _start(self) -> None:
+        self._file.write(png._SIGNATURE)
+        # 8 bits per channel, color type 6 (RGBA)
+        png.write_chunk(self._file, b"IHDR", struct.pack(">IIBBBBB", self.size[0], self.size[1], 8, 6, 0, 0, 0))
+        self._actl_pos = self._file.tell()
+        png.write_chunk(self._file, b"acTL", struct.pack(">II", 0, 1 if self.loop is None else self.loop))
+
+    def _encode(self, pixels: np.ndarray, unchanged: Optional[np.ndarray], offset: Tuple[int, int]) -> _APNGFrame:
+        rgba = np.empty(pixels.shape[:2] + (4,), dtype=np.uint8)
+        rgba[..., :3] = self._rgb(pixels)
+        rgba[..., 3] = 255
+        if unchanged is not None:
+            rgba[unchanged] = 0
+        # Pillow filters and compresses the rows, the image data is the IDAT chunks of its output.
+        buffer = io.BytesIO()
+        Image.fromarray(rgba, "RGBA").save(buffer, "PNG", compress_level=self.compress_level)
+        data = b"".join(chunk for kind, chunk in png.read_chunks(buffer.getvalue()) if kind == b"IDAT")
+        return _APNGFrame(data, offset, (pixels.shape[1], pixels.shape[0]), unchanged is not None)
+
+    def _write(self, frame: _APNGFrame, duration: float) -> None:
+        delay, scale = int(round(duration * 1000)), 1000
+        if delay > 0xFFFF:
+            delay, scale = min(int(round(duration * 100)), 0xFFFF), 100
+        # dispose_op 0 keeps the frame, blend_op 1 blends over it.
+        png.write_chunk(self._file, b"fcTL", struct.pack(">IIIIIHHBB", self._sequence, frame.size[0], frame.size[1],
+                                                         frame.offset[0], frame.offset[1], delay, scale, 0,
+                                                         1 if frame.blend else 0))
+        self._sequence += 1
+        if not self._written:
+            png.write_chunk(self._file, b"IDAT", frame.data)
+        else:
+            png.write_chunk(self._file, b"fdAT", struct.pack(">I", self._sequence) + frame.data)
+            self._sequence += 1
+        self._written += 1
+
+    def _end(self) -> None:
+        png.write_chunk(self._file, b"IEND", b"")
+        end = self._file.tell()
+        self._file.seek(self._actl_pos)
+        png.write_chunk(self._file, b"acTL", struct.pack(">II", self._written, 1 if self.loop is None else self.loop))
+        self._file.seek(end)
+
+
+class _SpooledFrames(ImageFile.ImageFile):
+    '''
+    The raw RGB frames of a spool file read back as the frames of an animated image, only the current frame is loaded.
+    '''
+    format = "RAW"
+    format_description = "spooled RGB frames"
+
+    def __init__(self, fp: BinaryIO, size: Tuple[int, int], frames: int):
+        self._spool_size = size
+        self._spool_fp = fp
+        self.n_frames = frames
+        self.is_animated = frames > 1
+        self._frame = 0
+        super(_SpooledFrames, self).__init__(fp)
+
+    def _open(self) -> None:
+        self._mode = "RGB"
+        self._size = self._spool_size
+        self._seek(0)
+
+    def seek(self, frame: int) -> None:
+        if self._seek_check(frame):
+            self._seek(frame)
+
+    def _seek(self, frame: int) -> None:
+        # loading a frame drops the file as done by the plugins of Pillow, it is given back for the next one
+        self.fp = self._spool_fp
+        self._frame = frame
+        self.tile = [("raw", (0, 0) + self.size, frame * self.size[0] * self.size[1] * 3, ("RGB", 0, 1))]
+
+    def tell(self) -> int:
+        return self._frame
+
+
+class WebPSink(_FileSink):
+    '''
+    Write an animated WebP by the `save_all` of Pillow. The encoder of WebP takes the whole animation at once, so the
+    frames are spooled to a temporary file as raw RGB and encoded one at a time when closing, a frame reported
+    unchanged by its damage extends the previous one instead.
+    '''
+
+    def __init__(self, path_or_file: Union[str, BinaryIO], duration: float = 1, loop: Optional[int] = None,
+                 lossless: bool = True, quality: int = 80, method: int = 4):
+        '''
+        :param loop: the times to play the animation, 0 for forever, it plays once if None.
+        :param quality: 0 to 100, the quality of the lossy compression, or the effort of the lossless one.
+        :param method: 0 to 6, 0 is the fastest and 6 the smallest.
+        '''
+        super().__init__(path_or_file, duration)
+        assert features.check("webp"), "Pillow is built without WebP"
+        self.loop = loop
+        self.lossless = lossless
+        self.quality = quality
+        self.method = method
+        self.size: Optional[Tuple[int, int]] = None
+        self._spool: Optional[BinaryIO] = None
+        # The milliseconds of the frames spooled.
+        self._durations: List[float] = []
+
+    def _add(self, frame: Image.Image, damage: Optional[List[Region]], duration: float) -> None:
+        if self._durations and damage is not None and not damage:
+            self._durations[-1] += duration * 1000
+            return
+        frame = frame.convert("RGB") if frame.mode != "RGB" else frame
+        if self.size is None:
+            self.size = frame.size
+            self._spool = tempfile.TemporaryFile()
+        assert frame.size == self.size, "expect frames of %s, got %s" % (self.size, frame.size)
+        self._spool.write(frame.tobytes())
+        self._durations.append(duration * 1000)
+
+    def _finish(self) -> None:
+        assert self._durations, "an animation needs at least one frame"
+        self._spool.seek(0)
+        frames = _SpooledFrames(self._spool, self.size, len(self._durations))
+        frames.save(self._file, format="WEBP", save_all=True,
+                    duration=[round(duration) for duration in self._durations],
+                    loop=1 if self.loop is None else self.loop, lossless=self.lossless,
+                    quality=self.quality, method=self.method)
+        self._close_spool()
+
+    def _discard(self) -> None:
+        super(WebPSink, self)._discard()
+        self._close_spool()
+
+    def _close_spool(self) -> None:
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+
+class RawSink(_FileSink):
+    '''
+    Stream the frames as raw RGB24 for an external encoder, e.g. into the stdin of
+    `ffmpeg -f rawvideo -pix_fmt rgb24 -s WxH -r FPS -i - out.mp4`.
+
+    The stream carries no timing, with `fps` a frame is repeated to last its duration at the constant frame rate,
+    otherwise each frame is written once.
+    '''
+
+    def __init__(self, path_or_file: Union[str, int, BinaryIO], duration: float = 1, fps: Optional[float] = None):
+        '''
+        :param path_or_file: a path, a binary file or a file descriptor, the descriptor is left open.
+        '''
+        if isinstance(path_or_file, int):
+            path_or_file = open(path_or_file, "wb", closefd=False)
+        super().__init__(path_or_file, duration)
+        self.fps = fps
+        self.size: Optional[Tuple[int, int]] = None
+        # The time the frames written so far reach and the time they should reach, in seconds.
+        self._written_time = 0.
+        self._time = 0.
+
+    def _add(self, frame: Image.Image, damage: Optional[List[Region]], duration: float) -> None:
+        frame = frame.convert("RGB") if frame.mode != "RGB" else frame
+        if self.size is None:
+            self.size = frame.size
+        assert frame.size == self.size, "expect frames of %s, got %s" % (self.size, frame.size)
+        repeats = 1
+        if self.fps:
+            self._time += duration
+            repeats = int(round((self._time - self._written_time) * self.fps))
+            self._written_time += repeats / self.fps
+        data = frame.tobytes()
+        for _ in range(repeats):
+            self._file.write(data)
+
+    def _finish(self) -> None:
+        self._file.flush()
+
+
+# The extensions of the files -> the sinks writing them.
+SINKS: Dict[str, Type[FrameSink]] = {
+    "gif": GIFSink,
+    "png": APNGSink,
+    "apng": APNGSink,
+    "webp": WebPSink,
+    "rgb": RawSink,
+    "raw": RawSink,
+}
+
+
+def open_sink(path: str, format: Optional[str] = None, **kwargs) -> FrameSink:
+    '''
+    Open the sink writing `path`, the format is taken from the extension unless given, e.g. "gif", "png", "webp" or
+    "rgb", the other arguments go to the sink, e.g. `duration`.
+    '''
+    format = (format or path.rsplit(".", 1)[-1]).lower()
+    assert format in SINKS, "unknown animation format %s, expect one of %s" % (format, sorted(SINKS))
+    return SINKS[format](path, **kwargs)
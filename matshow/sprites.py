@@ -0,0 +1,83 @@
+'''
+Pre-rendered tiles of rectangles.
+
+The cells of a scene share a handful of (width, height, fill, outline, border) styles, each style is rasterized once
+into a tile and drawn by pasting it, which is much cheaper than `ImageDraw.rectangle` rasterizing the outline again
+for every cell.
+'''
+from typing import *
+
+from PIL import Image, ImageDraw
+
+from matshow.cache import LRUCache
+from matshow.canvas import target_image
+
+
+def _tile_nbytes(tile) -> int:
+    width, height = tile.size
+    return width * height * 3
+
+
+class SpriteCache:
+    '''
+    Draw rectangles by pasting cached tiles, the result is identical to `ImageDraw.rectangle`.
+
+    The rectangles without fill, larger than `max_area` pixels or drawn onto a canvas not in RGB or not a
+    `matshow.canvas.Canvas` are drawn by `ImageDraw.rectangle` directly, they are counted as `fallbacks` in the stats.
+    '''
+
+    # The image modes the tiles could be pasted into.
+    MODES = ("RGB",)
+
+    def __init__(self, max_bytes: int = 8 << 20, max_area: int = 128 * 128):
+        self.tiles = LRUCache(capacity=None, max_bytes=max_bytes, sizeof=_tile_nbytes)
+        self.max_area = max_area
+        self.fallbacks = 0
+
+    def rectangle(self, draw_: ImageDraw.ImageDraw, coor: Sequence[int], fill, outline, border: int) -> None:
+        '''
+        Draw a rectangle, it is a drop-in replacement of `ImageDraw.rectangle(coor, fill, outline, border)`.
+        '''
+        x0, y0, x1, y1 = coor
+        width, height = x1 - x0, y1 - y0
+        image = target_image(draw_)
+        if fill is None or image is None or image.mode not in SpriteCache.MODES or width < 0 or height < 0 or \
+                (width + 1) * (height + 1) > self.max_area:
+            self.fallbacks += 1
+            draw_.rectangle(coor, fill=fill, outline=outline, width=border)
+            return
+        key = (width, height, fill, outline, border)
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = self._rasterize(*key)
+            self.tiles.put(key, tile)
+        image.paste(tile, (x0, y0))
+
+    def clear(self) -> None:
+        self.tiles.clear()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.tiles.reset_stats()
+        self.fallbacks = 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self.tiles.stats, fallbacks=self.fallbacks)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.
+        return stats
+
+    @staticmethod
+    def _rasterize(width: int, height: int, fill, outline, border: int) -> Image.Image:
+        '''
+        Draw the tile of a rectangle of `width` x `height`, it covers (width + 1) x (height + 1) pixels as
+        `ImageDraw.rectangle` does.
+        '''
+        tile = Image.new("RGB", (width + 1, height + 1))
+        ImageDraw.Draw(tile).rectangle([0, 0, width, height], fill=fill, outline=outline, width=border)
+        return tile
+
+
+# The tiles shared by the whole process.
+sprites = SpriteCache()
@@ -0,0 +1,47 @@
+'''
+Zero-copy ingestion of tensors.
+
+The data of a Matrix might come from numpy, PyTorch or anything exposing the buffer protocol, `__array_interface__`
+or `__dlpack__`, it is kept as a read-only numpy view sharing the memory with the source, so visualizing a large tensor
+doesn't double the memory footprint.
+'''
+from typing import *
+
+import numpy as np
+
+# The device type of CPU in DLPack.
+_DLPACK_CPU = 1
+
+
+def _from_dlpack(data) -> Optional[np.ndarray]:
+    if not hasattr(data, "__dlpack__") or not hasattr(np, "from_dlpack"):
+        return None
+    if hasattr(data, "__dlpack_device__"):
+        device = data.__dlpack_device__()[0]
+        if device != _DLPACK_CPU:
+            raise ValueError(
+                "only CPU tensors could be visualized, move it to CPU first")
+    if hasattr(data, "detach"):
+        data = data.detach()  # torch refuses to export the tensors requiring grad
+    try:
+        return np.from_dlpack(data)
+    except (BufferError, RuntimeError, TypeError):
+        return None  # e.g. the dtype is not supported by numpy
+
+
+def as_array(data) -> np.ndarray:
+    '''
+    Get a read-only numpy view of `data`, the memory is shared without copying if `data` is a numpy array, a CPU
+    tensor supporting DLPack, or an object exposing the buffer protocol or `__array_interface__`. The other sequences
+    such as lists are converted with a copy.
+    '''
+    if isinstance(data, np.ndarray):
+        array = data.view()
+    else:
+        array = _from_dlpack(data)
+        if array is None:
+            array = np.asarray(data)
+        else:
+            array = array.view()
+    array.setflags(write=False)
+    return array
@@ -0,0 +1,147 @@
+'''
+Memoized text measurement and rasterization.
+
+The same strings (such as "t0".."t31") are measured and drawn again and again during layout and drawing, the results
+only depend on the font, size, content and direction, so they are cached here.
+'''
+from typing import *
+
+from PIL import Image, ImageDraw
+
+from matshow import fonts
+from matshow.cache import LRUCache
+from matshow.canvas import target_image
+
+BBox = Tuple[int, int, int, int]
+
+
+class TextMetrics:
+    '''
+    Cache of the bounding boxes of texts, keyed by (font path, fontsize, content, direction).
+    '''
+
+    def __init__(self, capacity: int = 8192):
+        self.cache = LRUCache(capacity)
+
+    def bbox(self, content: str, fontsize: int, direction: str = "ltr") -> BBox:
+        '''
+        Get the bounding box of the text relative to the position it is drawn.
+        '''
+        key = (fonts.registry.path, fontsize, content, direction)
+        return self.cache.get_or_create(key, lambda: self._measure(content, fontsize, direction))
+
+    def size(self, content: str, fontsize: int, direction: str = "ltr") -> Tuple[int, int]:
+        '''
+        Get the (width, height) of the text.
+        '''
+        bbox = self.bbox(content, fontsize, direction)
+        return bbox[2], bbox[3]
+
+    def premeasure(self, contents: Iterable[str], fontsize: int, direction: str = "ltr") -> None:
+        '''
+        Measure a batch of texts in one pass, e.g. `premeasure(("t%d" % i for i in range(1024)), 20)`.
+        '''
+        path = fonts.registry.path
+        the_font = fonts.registry.get(fontsize)
+        for content in contents:
+            key = (path, fontsize, content, direction)
+            if key not in self.cache:
+                self.cache.put(key, self._measure_with(
+                    the_font, content, direction))
+
+    def clear(self) -> None:
+        self.cache.clear()
+        self.cache.reset_stats()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return self.cache.stats
+
+    def _measure(self, content: str, fontsize: int, direction: str) -> BBox:
+        return self._measure_with(fonts.registry.get(fontsize), content, direction)
+
+    @staticmethod
+    def _measure_with(the_font, content: str, direction: str) -> BBox:
+        kwargs = {} if direction in (None, "ltr") else {"direction": direction}
+        if hasattr(the_font, "getbbox"):
+            return tuple(the_font.getbbox(content, **kwargs))
+        width, height = the_font.getsize(content, **kwargs)
+        return 0, 0, width, height
+
+
+def _sprite_nbytes(sprite: Optional[Image.Image]) -> int:
+    return sprite.width * sprite.height if sprite else 0
+
+
+class LabelAtlas:
+    '''
+    Rasterize each distinct label once and draw it by pasting.
+
+    A sprite is the 8-bit coverage mask of a text, the fill color is applied through the mask when pasting, so one
+    sprite serves the label in every color and the result is identical to `ImageDraw.text`.
+    '''
+
+    # The image modes the sprites could be pasted into, the others and the draws other than `matshow.canvas.Canvas`
+    # fallback to `ImageDraw.text`.
+    MODES = ("RGB",)
+
+    def __init__(self, max_bytes: int = 16 << 20, text_metrics: "TextMetrics" = None):
+        self.sprites = LRUCache(
+            capacity=None, max_bytes=max_bytes, sizeof=_sprite_nbytes)
+        self.metrics = text_metrics if text_metrics else metrics
+
+    def sprite(self, content: str, fontsize: int, direction: str = "ltr") -> Tuple[Optional[Image.Image], BBox]:
+        '''
+        Get the sprite of a text and its bounding box, the sprite is None for a blank text.
+        '''
+        bbox = self.metrics.bbox(content, fontsize, direction)
+        key = (fonts.registry.path, fontsize, content, direction)
+        sprite = self.sprites.get_or_create(
+            key, lambda: self._rasterize(content, fontsize, direction, bbox))
+        return sprite, bbox
+
+    def draw(self, draw_: ImageDraw.ImageDraw, xy: Tuple[int, int], content: str, fontsize: int, fill,
+             direction: str = "ltr") -> None:
+        '''
+        Draw a text at `xy`, it is a drop-in replacement of `ImageDraw.text`.
+        '''
+        image = target_image(draw_)
+        if image is None or image.mode not in LabelAtlas.MODES or fill is None:
+            # Pillow without libraqm only accepts the default direction
+            draw_.text(xy, content, font=fonts.registry.get(fontsize), fill=fill,
+                       direction=None if direction == "ltr" else direction)
+            return
+
+        sprite, bbox = self.sprite(content, fontsize, direction)
+        if sprite is None:
+            return
+        box = (xy[0] + bbox[0], xy[1] + bbox[1],
+               xy[0] + bbox[2], xy[1] + bbox[3])
+        image.paste(fill, box, sprite)
+
+    def clear(self) -> None:
+        self.sprites.clear()
+        self.sprites.reset_stats()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return self.sprites.stats
+
+    @staticmethod
+    def _rasterize(content: str, fontsize: int, direction: str, bbox: BBox) -> Optional[Image.Image]:
+        width, height = bbox[2] - bbox[0], bbox[3] - bbox[1]
+        if width <= 0 or height <= 0:
+            return None
+        mask = Image.new("L", (width, height), 0)
+        ImageDraw.Draw(mask).text((-bbox[0], -bbox[1]), content, font=fonts.registry.get(fontsize), fill=255,
+                                  direction=None if direction == "ltr" else direction)
+        return mask
+
+
+# The metrics and atlas shared by the whole process.
+metrics = TextMetrics()
+atlas = LabelAtlas()
+
+
+def premeasure(contents: Iterable[str], fontsize: int, direction: str = "ltr") -> None:
+    metrics.premeasure(contents, fontsize, direction)
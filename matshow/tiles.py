@@ -0,0 +1,118 @@
+'''
+Tile pyramids of widget trees too large for a single image.
+
+The pyramid follows the DeepZoom layout: `{name}.dzi` describes the image and `{name}_files/{level}/{col}_{row}.png`
+holds the tiles, the top level is the image in full resolution and each level below halves it until a single pixel. The
+tiles of the top level are rendered with the primitives outside them culled, and the tiles of a lower level are
+downsampled from the four tiles above it, so the whole image is never materialized.
+'''
+import math
+import os
+from typing import *
+
+from PIL import Image
+
+from matshow import colors
+from matshow.draw import Widget, create_canvas
+
+_DZI = '''<?xml version="1.0" encoding="UTF-8"?>
+<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="%s" Overlap="0" TileSize="%d">
+  <Size Width="%d" Height="%d"/>
+</Image>
+'''
+
+
+class TilePyramid:
+    '''
+    The tiles of a widget in levels.
+
+    Usage:
+
+        matrix = Matrix(shape=[16384, 16384], data=weights, compact=True)
+        matrix.heatmap()
+        TilePyramid(matrix).save("weights")  # weights.dzi and weights_files/
+    '''
+
+    def __init__(self, widget: Widget, tile_size: int = 256, fill: colors.RGB = colors.WHITE, format: str = "png"):
+        self.widget = widget
+        self.tile_size = tile_size
+        self.fill = fill
+        self.format = format
+        # Compile once, the tiles are drawn from the same display list.
+        self.display_list = widget.display_list
+        self.size = widget.outer_size
+
+    @property
+    def max_level(self) -> int:
+        '''
+        The level of the image in full resolution, the level 0 is a single pixel.
+        '''
+        return math.ceil(math.log2(max(max(self.size), 1)))
+
+    def level_size(self, level: int) -> Tuple[int, int]:
+        scale = 2 ** (self.max_level - level)
+        return math.ceil(self.size[0] / scale), math.ceil(self.size[1] / scale)
+
+    def tile_count(self, level: int) -> Tuple[int, int]:
+        '''
+        The (cols, rows) of the tiles in a level.
+        '''
+        width, height = self.level_size(level)
+        return math.ceil(width / self.tile_size), math.ceil(height / self.tile_size)
+
+    def tile_region(self, level: int, col: int, row: int) -> Tuple[int, int, int, int]:
+        '''
+        The (left, top, right, bottom) of a tile in the pixels of its level.
+        '''
+        width, height = self.level_size(level)
+        left, top = col * self.tile_size, row * self.tile_size
+        return left, top, min(left + self.tile_size, width), min(top + self.tile_size, height)
+
+    def tile(self, level: int, col: int, row: int) -> Image.Image:
+        '''
+        Render a single tile, a tile of a low level costs all the tiles of the top level covered by it.
+        '''
+        return self._tile(level, col, row, None)
+
+    def save(self, path: str) -> None:
+        '''
+        Write the pyramid to `{path}.dzi` and `{path}_files`, each tile is rendered once.
+        '''
+        with open(path + ".dzi", "w") as file:
+            file.write(_DZI % ((self.format, self.tile_size) + tuple(self.size)))
+        self._tile(0, 0, 0, path + "_files")
+
+    def _tile(self, level: int, col: int, row: int, directory: Optional[str]) -> Image.Image:
+        if level == self.max_level:
+            image = self._render(self.tile_region(level, col, row))
+        else:
+            # Compose the (up to) four tiles above and halve them.
+            left, top, right, bottom = self.tile_region(level, col, row)
+            cols, rows = self.tile_count(level + 1)
+            canvas = Image.new("RGB", (2 * (right - left), 2 * (bottom - top)), self.fill)
+            for child_row in range(2 * row, min(2 * row + 2, rows)):
+                for child_col in range(2 * col, min(2 * col + 2, cols)):
+                    child = self._tile(level + 1, child_col, child_row, directory)
+                    canvas.paste(child, ((child_col - 2 * col) * self.tile_size,
+                                         (child_row - 2 * row) * self.tile_size))
+            span = self._children_span(level, col, row)
+            image = canvas.crop((0, 0) + span).reduce(2)
+
+        if directory is not None:
+            level_dir = os.path.join(directory, str(level))
+            os.makedirs(level_dir, exist_ok=True)
+            image.save(os.path.join(level_dir, "%d_%d.%s" % (col, row, self.format)))
+        return image
+
+    def _children_span(self, level: int, col: int, row: int) -> Tuple[int, int]:
+        '''
+        The (width, height) covered by the children of a tile in the level above.
+        '''
+        width, height = self.level_size(level + 1)
+        left, top = 2 * col * self.tile_size, 2 * row * self.tile_size
+        return min(width, left + 2 * self.tile_size) - left, min(height, top + 2 * self.tile_size) - top
+
+    def _render(self, region: Tuple[int, int, int, int]) -> Image.Image:
+        draw_, im = create_canvas((region[2] - region[0], region[3] - region[1]), fill=self.fill)
+        self.display_list.draw_region(draw_, region)
+        return im
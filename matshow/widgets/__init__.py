@@ -0,0 +1,23 @@
+'''
+The widgets built on `matshow.draw`, they are imported on their first use (PEP 562).
+'''
+import importlib
+
+# The names exported by `matshow.widgets` -> the modules defining them.
+_EXPORTS = {
+    "WarpDataLayout": "matshow.widgets.gpu",
+    "CTADataLayout": "matshow.widgets.gpu",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = globals()[name] = getattr(importlib.import_module(_EXPORTS[name]), name)
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,7 +1,18 @@
-import random
+import hashlib
 from typing import *
 
+import numpy as np
+from PIL import Image, ImageDraw
+
 from matshow import *
+from matshow import grid, layouts
+from matshow.canvas import target_image
+from matshow.display_list import DisplayListBuilder, svg_rect, to_rgb
+from matshow.draw import ColorTy
+from matshow.text import metrics as text_metrics
+
+# The labels smaller than it in pixels are skipped.
+MIN_LABEL_FONTSIZE = 6
 
 
 class WarpDataLayout(LabeledWidget):
@@ -11,38 +22,70 @@ class WarpDataLayout(LabeledWidget):
 
     def __init__(self, shape: List[int], label,
                  thread_to_cell_map: Callable[[int], List[Tuple[int, int]]] = None,
-                 fontsize=40, cell_size: int = 40, random_seed: int = 0):
+                 fontsize=40, cell_size: int = 40, random_seed: int = 0, threads: int = layouts.WARP_SIZE,
+                 compact: bool = False):
         '''
         shape: shape of the data.
         label: label of the matrix.
         fontsize: font size of the label.
         thread_to_cells_map: a method mapping thread id to cell coordinates.
+        random_seed: the seed of the thread colors, see `colors.palette`.
+        threads: the number of the threads mapped, see `CTADataLayout` for the layouts of a whole CTA.
+        compact: keep the cells in the arrays of a compact Matrix, so `set_layout` colors and labels them in one step
+                 each, it works for the shapes of rank 1 or 2.
         '''
         super(WarpDataLayout, self).__init__(label, fontsize)
 
         self.cell_size = cell_size
         self.matrix = Matrix(shape=shape, border=1, margin=(20, 20),
-                             cell_config=Matrix.CellConfig(width=self.cell_size))
+                             cell_config=Matrix.CellConfig(width=self.cell_size), compact=compact)
         self.set_main_widget(self.matrix)
 
+        self.random_seed = random_seed
+        self.thread_colors = self._thread_colors(threads)
+        # keep a snapshot of the map from thread to cell
+        self.tid_to_cell_summary = []
+
         self.thread_to_cells_map = thread_to_cell_map
         if self.thread_to_cells_map:
             self._colorize_cells()
 
-        random.seed(random_seed)
-        self.thread_colors = [colors.RGB(*[random.randint(0, 256)
-                                           for i in range(3)]) for i in range(32)]
-
-        # keep a snapshot of the map from thread to cell
-        self.tid_to_cell_summary = []
-
     def set_thread_to_cells_map(self, thread_to_cell_map: Callable[[int], List[Tuple[int, int]]]):
         self.thread_to_cells_map = thread_to_cell_map
         self._colorize_cells()
 
+    def set_layout(self, layout: "layouts.Layout"):
+        '''
+        Map the threads to the cells by a layout of `matshow.layouts`, the lowest thread wins a cell held by several.
+        The cells of a compact Matrix are colored and labeled in one step each.
+        '''
+        if layout.threads != len(self.thread_colors):
+            self.thread_colors = self._thread_colors(layout.threads)
+        shape = self.matrix.shape
+        self.thread_to_cells_map = layout.thread_to_cells(shape)
+        owners = layout.owners(shape)
+        fill = np.array(self.thread_colors, dtype=np.uint8)[owners]
+        fill[owners < 0] = to_rgb(self.matrix.cell_config.fill)
+        labels = ["t%d" % thread for thread in range(layout.threads)]
+        # the labels of the previous map are replaced
+        self.matrix.clear_texts()
+        if self.matrix.compact:
+            self.matrix.color_cells(fill)
+            self.matrix.text_cells(labels, owners, self.cell_size // 2, fill=colors.YELLOW1)
+        else:
+            for offset, (thread, rgb) in enumerate(zip(owners.reshape(-1).tolist(), fill.reshape(-1, 3).tolist())):
+                cell = self.matrix.get_cell(offset)
+                cell.fill = colors.RGB(*rgb)
+                if thread >= 0:
+                    cell.text(labels[thread], fontsize=self.cell_size // 2, fill=colors.YELLOW1)
+        self.tid_to_cell_summary[:] = [[tuple(coord) for coord in coords] for coords in layout.indices(shape).tolist()]
+
+    def _thread_colors(self, threads: int) -> List[colors.RGB]:
+        return [colors.RGB(*rgb) for rgb in colors.palette(threads, self.random_seed).tolist()]
+
     def _colorize_cells(self):
         self.tid_to_cell_summary.clear()
-        for thread in range(32):
+        for thread in range(len(self.thread_colors)):
             this_thread = []
             for (row, col) in self.thread_to_cells_map(thread):
                 cell = self.matrix.get_cell(row, col)
@@ -51,3 +94,128 @@ class WarpDataLayout(LabeledWidget):
                                                    2, fill=colors.YELLOW1)
                 this_thread.append((row, col))
             self.tid_to_cell_summary.append(this_thread)
+
+
+class WarpBoundaries:
+    '''
+    The lines between the cells of different warps, drawn over the cells as a grid primitive of the display list, so
+    the warps need no Stacks of their own.
+    '''
+
+    def __init__(self, warps: np.ndarray, width: int, height: int, thickness: int = 2,
+                 color: ColorTy = colors.BLACK):
+        '''
+        :param warps: (rows, cols) the warp of each cell, -1 for the cells held by no thread.
+        '''
+        self.warps = np.array(warps, dtype=np.int64).reshape(-1, np.shape(warps)[-1])
+        self.width, self.height = width, height
+        self.thickness = thickness
+        self.color = to_rgb(color)
+        self.key = (hashlib.blake2b(self.warps.data, digest_size=16).digest(), width, height, thickness, self.color)
+
+    def draw_cells(self, draw_: ImageDraw, origin: Tuple[int, int]):
+        '''
+        Draw the lines with `origin` the top-left of the first cell, only the part within the canvas is rasterized if it
+        is a `matshow.canvas.Canvas`.
+        '''
+        rows, cols = self.warps.shape
+        right, bottom = cols * self.width + 1, rows * self.height + 1
+        image = target_image(draw_)
+        if image is not None:
+            right, bottom = min(right, image.width - origin[0]), min(bottom, image.height - origin[1])
+        region = (max(-origin[0], 0), max(-origin[1], 0), right, bottom)
+        if not self.thickness or region[0] >= region[2] or region[1] >= region[3]:
+            return
+        mask = grid.boundary_mask(self.warps, self.width, self.height, self.thickness, region)
+        if mask.any():
+            draw_.bitmap((origin[0] + region[0], origin[1] + region[1]),
+                         Image.fromarray(mask.view(np.uint8) * 255, "L"), fill=self.color)
+
+    def cell_colors(self) -> np.ndarray:
+        return np.array([self.color], dtype=np.uint8)
+
+    def detach_cells(self) -> "WarpBoundaries":
+        # nothing refers to the widget tree
+        return self
+
+    def cells_to_svg(self, origin: Tuple[int, int]) -> List[str]:
+        mask = grid.boundary_mask(self.warps, self.width, self.height, self.thickness)
+        # one rectangle per run of the pixels of a row
+        lines = []
+        for y, row in enumerate(mask):
+            edges = np.flatnonzero(np.diff(np.concatenate([[0], row.view(np.int8), [0]])))
+            for x0, x1 in edges.reshape(-1, 2).tolist():
+                coor = (origin[0] + x0, origin[1] + y, origin[0] + x1 - 1, origin[1] + y)
+                lines.append(svg_rect(coor, self.color, None, 0))
+        return lines
+
+
+class _WarpMatrix(Matrix):
+    '''
+    A compact Matrix with the boundaries of the warps drawn over its cells.
+    '''
+
+    def __init__(self, shape: List[int], boundaries: WarpBoundaries, **kwargs):
+        super(_WarpMatrix, self).__init__(shape, compact=True, **kwargs)
+        self.boundaries = boundaries
+
+    def _draw_grid(self, draw_: ImageDraw, offset: Tuple[int, int]):
+        super(_WarpMatrix, self)._draw_grid(draw_, offset)
+        self.boundaries.draw_cells(draw_, self._cells_coor(offset)[:2])
+
+    def _compile_grid(self, builder: DisplayListBuilder, offset: Tuple[int, int]):
+        super(_WarpMatrix, self)._compile_grid(builder, offset)
+        builder.grid(self.boundaries, self._cells_coor(offset))
+
+    def _content_key(self) -> Hashable:
+        return super(_WarpMatrix, self)._content_key(), self.boundaries.key
+
+
+class CTADataLayout(LabeledWidget):
+    '''
+    Widget for visualizing the data layout of a whole CTA, e.g. a 256x256 tensor over 1024 threads.
+
+    The cells live in the arrays of a compact Matrix, they are colored by their threads and labeled in batches, and the
+    boundaries of the warps are drawn over the cells.
+    '''
+
+    def __init__(self, shape: List[int], layout: "layouts.Layout", label, fontsize=40, cell_size: int = 16,
+                 random_seed: int = 0, labels: bool = None, warp_border: int = 2,
+                 warp_outline: ColorTy = colors.BLACK):
+        '''
+        :param layout: the layout of `matshow.layouts` mapping the threads to the cells.
+        :param labels: whether to put the thread ids on the cells, only if they fit in the cells by default.
+        :param warp_border: the width of the boundaries of the warps, 0 to skip them.
+        '''
+        super(CTADataLayout, self).__init__(label, fontsize)
+
+        self.layout = layout
+        self.cell_size = cell_size
+        # the thread holding each cell, the lowest for the broadcast ones, -1 for none
+        self.owners = layout.owners(shape)
+        warps = np.where(self.owners >= 0, self.owners // layout.warp_size, -1)
+        boundaries = WarpBoundaries(warps, cell_size, cell_size, warp_border, warp_outline)
+        cell_config = Matrix.CellConfig(width=cell_size)
+        self.matrix = _WarpMatrix(shape, boundaries, border=1, margin=(20, 20), cell_config=cell_config)
+        self.set_main_widget(self.matrix)
+
+        self.thread_colors = colors.palette(layout.threads, random_seed)
+        fill = self.thread_colors[self.owners]
+        fill[self.owners < 0] = to_rgb(cell_config.fill)
+        self.matrix.color_cells(fill)
+
+        label_fontsize = self._label_fontsize(cell_config.border)
+        if labels or (labels is None and label_fontsize):
+            self.matrix.text_cells(["t%d" % thread for thread in range(layout.threads)], self.owners,
+                                   max(label_fontsize, MIN_LABEL_FONTSIZE), fill=colors.YELLOW1)
+
+    def _label_fontsize(self, border: int) -> int:
+        '''
+        The largest font size up to half a cell for the widest label to fit in a cell, 0 if none fits.
+        '''
+        widest = "t%d" % (self.layout.threads - 1)
+        for fontsize in range(self.cell_size // 2, MIN_LABEL_FONTSIZE - 1, -1):
+            bbox = text_metrics.bbox(widest, fontsize)
+            if max(bbox[2] - min(bbox[0], 0), bbox[3] - min(bbox[1], 0)) <= self.cell_size - 2 * border - 2:
+                return fontsize
+        return 0
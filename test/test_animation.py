@@ -0,0 +1,173 @@
+import io
+
+from PIL import Image
+
+from matshow import colors
+from matshow.animation import FrameRenderer, GIFSink, merge_regions, render_frames
+from matshow.draw import Matrix, Stack, create_animation, create_canvas
+from matshow.gpu import TensorView, create_animation as create_gpu_animation
+
+
+def test_gif_sink():
+    file = io.BytesIO()
+    draw_, canvas = create_canvas((30, 20), fill=colors.WHITE)
+    with GIFSink(file, duration=0.2, loop=0) as sink:
+        for fill in (colors.RED1, colors.BLUE, colors.GREEN1):
+            draw_.rectangle((0, 0, 9, 9), fill=fill)
+            sink.add(canvas)
+    assert sink.frames == 3
+
+    file.seek(0)
+    gif = Image.open(file)
+    assert gif.n_frames == 3 and gif.size == (30, 20)
+    assert gif.info["duration"] == 200 and gif.info["loop"] == 0
+    for i, fill in enumerate((colors.RED1, colors.BLUE, colors.GREEN1)):
+        gif.seek(i)
+        frame = gif.convert("RGB")
+        assert frame.getpixel((5, 5)) == fill and frame.getpixel((20, 15)) == colors.WHITE
+
+
+def test_create_animation(tmp_path):
+    paths = []
+    matrix = Matrix(shape=[2, 2])
+    for i in range(4):
+        matrix.get_cell(i).fill = colors.RED1
+        draw_, canvas = create_canvas(matrix.outer_size)
+        matrix.draw(draw_)
+        paths.append(str(tmp_path / ("%d.png" % i)))
+        canvas.save(paths[-1])
+    create_animation(paths, str(tmp_path / "matrix.gif"), duration=0.1)
+    with Image.open(str(tmp_path / "matrix.gif")) as gif:
+        assert gif.n_frames == 4 and gif.size == matrix.outer_size
+
+    view = TensorView([2, 4])
+    create_gpu_animation(view.drawer, str(tmp_path / "view.gif"), view, activates=range(8))
+    with Image.open(str(tmp_path / "view.gif")) as gif:
+        assert gif.n_frames == 8
+
+
+def test_frame_renderer():
+    legacy = Matrix(shape=[3, 4], border=1)
+    compact = Matrix(shape=[4, 4], compact=True, border=1)
+    root = Stack([legacy, compact], cstride=2, border=2, fill=colors.WHITE)
+    renderer = FrameRenderer(root)
+    assert renderer.render() == [(0, 0) + root.outer_size]
+    assert renderer.render() == []
+
+    def check():
+        draw_, expect = create_canvas(root.outer_size, fill=colors.WHITE)
+        root.render(draw_)
+        assert renderer.canvas.tobytes() == expect.tobytes()
+
+    legacy.get_cell(5).fill = colors.RED1
+    compact.get_cell(2, 3).fill = colors.BLUE
+    regions = renderer.render()
+    assert len(regions) == 2 and all(r[2] - r[0] <= 22 and r[3] - r[1] <= 22 for r in regions)
+    check()
+
+    # the texts added are repainted without a full repaint
+    compact.get_cell(0).text("a", 10)
+    legacy.get_cell(0).text("b", 10)
+    assert len(renderer.render()) == 2
+    check()
+
+
+def test_merge_regions():
+    assert merge_regions([(0, 0, 10, 10), (5, 5, 15, 15), (30, 0, 40, 10), (-5, 45, 10, 60)], (50, 50)) == [
+        (0, 0, 15, 15), (30, 0, 40, 10), (0, 45, 10, 50)]
+    assert merge_regions([(i * 2, 0, i * 2 + 1, 1) for i in range(10)], (50, 50), max_regions=4) == [(0, 0, 19, 1)]
+
+
+def test_gif_delta_frames():
+    matrix = Matrix(shape=[8, 8], compact=True)
+    renderer = FrameRenderer(matrix)
+    expect = []
+    file = io.BytesIO()
+    with GIFSink(file, duration=0.1) as sink:
+        for i in range(6):
+            if i != 3:
+                matrix.get_cell(i * 9).fill = colors.RED1
+            damage = renderer.render()
+            sink.add(renderer.canvas, damage)
+            if i == 3:
+                expect[-1][1] += 100  # no change, the previous frame lasts longer
+            else:
+                expect.append([renderer.canvas.tobytes(), 100])
+
+    file.seek(0)
+    gif = Image.open(file)
+    assert gif.n_frames == 5
+    for i, (pixels, duration) in enumerate(expect):
+        gif.seek(i)
+        if i:
+            # the frame is cropped to the changed cell
+            x0, y0, x1, y1 = gif.dispose_extent
+            assert x1 - x0 <= 21 and y1 - y0 <= 21
+        assert gif.info["duration"] == duration
+        assert gif.convert("RGB").tobytes() == pixels
+
+
+def test_render_frames_in_parallel():
+    def scene():
+        legacy = Matrix(shape=[3, 3])
+        compact = Matrix(shape=[6, 6], compact=True)
+        return Stack([legacy, compact], cstride=2, fill=colors.WHITE), legacy, compact
+
+    def steps(legacy, compact):
+        for i in range(9):
+            legacy.get_cell(i).fill = colors.RED1
+            compact.get_cell(i * 4).fill = colors.BLUE
+            if i == 4:
+                compact.get_cell(0).text("t", 10)
+            yield i
+
+    outputs = []
+    for workers in (1, 2):
+        root, legacy, compact = scene()
+        file = io.BytesIO()
+        with GIFSink(file) as sink:
+            render_frames(root, steps(legacy, compact), sink, workers=workers)
+        assert sink.frames == 9
+        outputs.append(file.getvalue())
+    assert outputs[0] == outputs[1]
+
+
+def test_indexed_frames():
+    outputs = []
+    for indexed in (False, True):
+        matrix = Matrix(shape=[6, 6], compact=True)
+        renderer = FrameRenderer(matrix, indexed=indexed)
+        file, frames = io.BytesIO(), []
+        with GIFSink(file) as sink:
+            for i in range(4):
+                # the colors new to the palette are allocated
+                matrix.get_cell(i * 5).fill = (colors.RED1, colors.BLUE)[i % 2]
+                damage = renderer.render()
+                sink.add(renderer.canvas, damage)
+                frames.append(renderer.canvas.convert("RGB").tobytes())
+        assert renderer.canvas.mode == ("P" if indexed else "RGB")
+        outputs.append((frames, file.getvalue()))
+    assert outputs[0] == outputs[1]
+
+
+def test_draw_callbacks(tmp_path):
+    from matshow.gpu import create_animation_by_frames
+
+    matrix = Matrix(shape=[2, 2], compact=True)
+    calls = []
+    matrix.add_pre_draw_callback(lambda: calls.append("pre"))
+    matrix.add_post_draw_callback(lambda: calls.append("post"))
+
+    def frames(fill):
+        for i in range(3):
+            matrix.get_cell(i).fill = fill
+            yield
+
+    # the callbacks keep the frames in this process whatever the workers
+    for workers, fill in ((1, colors.RED1), (2, colors.BLUE)):
+        calls.clear()
+        path = str(tmp_path / ("matrix%d.gif" % workers))
+        create_animation_by_frames(matrix, path, frames(fill), duration=0.1, workers=workers)
+        assert calls == ["pre", "post"] * 3
+        with Image.open(path) as gif:
+            assert gif.n_frames == 3
@@ -0,0 +1,67 @@
+from matshow import colors, fonts
+from matshow.bitmaps import BitmapCache
+from matshow.draw import Matrix, Rectangle, Stack, create_canvas
+
+
+def _scene():
+    views = [Matrix(shape=[4, 4], border=1) for _ in range(2)]
+    views[0].get_cell(1, 1).text("x", 10)
+    return Stack(views + [Rectangle(30, 30, fill=colors.GREEN1)], cstride=3, margin=(5, 5))
+
+
+def test_fingerprint():
+    left, right = Matrix(shape=[4, 4]), Matrix(shape=[4, 4])
+    assert left.fingerprint == right.fingerprint
+    fingerprint = left.fingerprint
+    assert isinstance(fingerprint, bytes) and len(fingerprint) == 16
+    left.get_cell(2).fill = colors.RED1
+    assert left.fingerprint != fingerprint
+    left.get_cell(2).fill = right.get_cell(2).fill
+    assert left.fingerprint == fingerprint
+
+    view = Stack([left, right], cstride=2)
+    fingerprint = view.fingerprint
+    right.get_cell(0).text("a", 10)
+    assert view.fingerprint != fingerprint
+
+
+def test_cached_draw(monkeypatch):
+    cache = BitmapCache(min_widgets=2)
+    monkeypatch.setattr("matshow.draw.bitmaps", cache)
+    view = _scene()
+    for frame in range(6):
+        if frame % 3 == 2:
+            view.widgets[1].get_cell(frame).fill = colors.RED1
+        cache.enabled = False
+        draw_, expect = create_canvas(view.outer_size, fill=colors.GRAY)
+        view.draw(draw_)
+        cache.enabled = True
+        draw_, canvas = create_canvas(view.outer_size, fill=colors.GRAY)
+        view.draw(draw_)
+        assert canvas.tobytes() == expect.tobytes()
+    assert cache.stats["hits"] > 0
+
+
+def test_cache_budget():
+    matrix = Matrix(shape=[4, 4], border=1)
+    width, height = matrix.outer_size
+    cache = BitmapCache(max_bytes=(width + 1) * (height + 1) * 3, min_widgets=2)
+    draw_, canvas = create_canvas(matrix.outer_size)
+    for fill in (colors.RED1, colors.BLUE):
+        matrix.get_cell(0).fill = fill
+        assert not cache.draw(matrix, draw_, (0, 0))  # seen once
+        assert cache.draw(matrix, draw_, (0, 0))
+    assert cache.stats["size"] == 1 and cache.stats["evictions"] == 1
+
+
+def test_font_in_key(monkeypatch):
+    cache = BitmapCache(min_widgets=2)
+    matrix = Matrix(shape=[4, 4], border=1)
+    draw_, canvas = create_canvas(matrix.outer_size)
+    assert not cache.draw(matrix, draw_, (0, 0))
+    assert cache.draw(matrix, draw_, (0, 0))
+    # the bitmaps drawn in another font are not reused
+    registry = fonts.FontRegistry()
+    registry.set_path("/path/to/other.ttf")
+    monkeypatch.setattr(fonts, "registry", registry)
+    assert not cache.draw(matrix, draw_, (0, 0))
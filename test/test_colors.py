@@ -0,0 +1,42 @@
+import random
+
+import numpy as np
+
+from matshow import colors
+
+
+def test_table():
+    table = colors.table()
+    assert table.shape == (len(colors.NAMES), 3) and not table.flags.writeable
+    assert colors.table() is table  # built once
+    assert tuple(table[colors.INDEX["white"]]) == colors.WHITE
+    assert colors.colors["red1"] is colors.RED1
+    # the constants are the rows of the table
+    assert [getattr(colors, name.upper()) for name in colors.NAMES] == [tuple(rgb) for rgb in table.tolist()]
+    assert colors.lookup(["Gray", "blue"]).tolist() == [list(colors.GRAY), list(colors.BLUE)]
+
+
+def test_pack():
+    rgb = np.array([[colors.RED1, colors.BLUE], [colors.WHITE, colors.BLACK]], dtype=np.uint8)
+    packed = colors.pack(rgb)
+    assert packed.shape == (2, 2) and packed[0, 0] == 0xFF0000 and packed[1, 0] == 0xFFFFFF
+    assert (colors.unpack(packed) == rgb).all()
+
+
+def test_nearest():
+    table = colors.table()
+    assert (colors.nearest(table) == np.arange(len(table))).all()
+    rows = colors.nearest(np.array([[[254, 1, 1], [250, 250, 250]]], dtype=np.uint8), chunk=1)
+    assert rows.shape == (1, 2) and colors.NAMES[rows[0, 0]] == "red1" and colors.NAMES[rows[0, 1]] == "gray98"
+
+
+def test_palette():
+    state = random.getstate()
+    palette = colors.palette(4096, seed=1)
+    assert random.getstate() == state  # the global random state is untouched
+    assert palette.shape == (4096, 3) and palette.dtype == np.uint8 and not palette.flags.writeable
+    assert len(np.unique(colors.pack(palette))) == 4096
+    assert colors.palette(4096, seed=1) is palette  # cached
+    assert (colors.palette(4096, seed=1)[:32] != colors.palette(4096, seed=2)[:32]).any()
+    # the neighbors are far apart
+    assert np.abs(np.diff(palette.astype(int), axis=0)).sum(axis=1).min() > 48
@@ -1,8 +1,10 @@
 import os
 
+from PIL import Image, ImageDraw
+
 from matshow import draw
-from matshow.draw import (HStack, Label, LabeledWidget, Rectangle, Stack,
-                          VStack, Widget, colors, create_canvas)
+from matshow.draw import (HStack, Label, LabeledWidget, Matrix, Rectangle,
+                          Stack, VStack, Widget, colors, create_canvas)
 
 
 def get_test_img_root():
@@ -191,5 +193,209 @@ def test_LabeledWidget():
     canvas.save(os.path.join(get_test_img_root(), "./labeled_widget.png"))
 
 
+def test_layout_cache():
+    rec = Rectangle(40, 40, fill=Widget.fill_colors[0])
+    inner = Stack([rec], cstride=2, border=2)
+    outer = VStack([inner], margin=(5, 5))
+    assert outer.outer_size == (44 + 10, 44 + 10)
+    assert not outer.layout_dirty
+
+    # fill only changes don't touch the layout
+    rec.fill = colors.RED1
+    inner.set_fill(colors.WHITE)
+    assert not outer.layout_dirty
+
+    rec.width = 60
+    assert rec.layout_dirty and inner.layout_dirty and outer.layout_dirty
+    assert outer.outer_size == (64 + 10, 44 + 10)
+
+    inner.add(Rectangle(10, 50, fill=colors.RED1))
+    assert outer.layout_dirty
+    assert outer.outer_size == (74 + 10, 54 + 10)
+    assert inner.child_offsets == [(2, 2), (62, 2)]
+
+    inner.set_margin((1, 1))
+    assert outer.outer_size == (76 + 10, 56 + 10)
+
+    # a new view of a LabeledWidget changes its layout
+    labeled = LabeledWidget("a", fontsize=10, main_widget=Rectangle(40, 40, fill=colors.RED1))
+    size = labeled.outer_size
+    labeled.view = VStack([Rectangle(60, 80, fill=colors.RED1)])
+    assert labeled.layout_dirty
+    assert labeled.outer_size == labeled.view.outer_size != size
+
+
+def test_label_grows_layout():
+    label = Label("a", 0, 0, fontsize=20)
+    view = VStack([label])
+    size = view.outer_size
+    label.content = "a much longer label"
+    assert view.layout_dirty
+    assert view.outer_size[0] > size[0]
+
+
+def test_display_list():
+    rec = Rectangle(40, 40, fill=Widget.fill_colors[0], border=2)
+    rec.text("1", fontsize=20, fill=colors.RED1)
+    view = Stack([rec, Rectangle(20, 20, fill=colors.WHITE)],
+                 cstride=1, border=3, outline=colors.BLACK, margin=(5, 5))
+
+    display_list = view.display_list
+    assert len(display_list) == 4  # the border, two rectangles and a text
+    assert display_list.rects[1].tolist() == [8, 8, 48, 48]
+
+    # a color change reuses the compiled list
+    rec.fill = colors.RED1
+    assert view.display_list is display_list
+    assert tuple(display_list.fill[1]) == colors.RED1
+
+    rec.width = 50
+    assert view.display_list is not display_list
+
+    draw, canvas = create_canvas(view.outer_size)
+    view.draw(draw)
+    draw1, canvas1 = create_canvas(view.outer_size)
+    view.render(draw1)
+    assert canvas.tobytes() == canvas1.tobytes()
+
+
+def test_bounded_damage():
+    matrix = Matrix(shape=[80, 80], compact=True)
+    display_list = matrix.display_list
+    draw_, canvas = create_canvas(matrix.outer_size)
+    # the list is built once and the tree is only drawn after
+    for i in range(100):
+        matrix.get_cell(7).fill = colors.RED1 if i % 2 else colors.BLUE
+        matrix.draw(draw_)
+    assert len(display_list._damaged) == 1
+    for i in range(display_list.MAX_DAMAGE + 1):
+        matrix.get_cell(i).fill = colors.RED1
+    assert not display_list._damaged
+    assert matrix.update_display_list() == (display_list, [(0, 0) + display_list.size])
+    draw1, canvas1 = create_canvas(matrix.outer_size)
+    matrix.render(draw1)
+    matrix.draw(draw_)
+    assert canvas.tobytes() == canvas1.tobytes()
+
+
+def test_compact_matrix():
+    def create(compact):
+        matrix = Matrix(shape=[4, 6], border=2, margin=(3, 3), compact=compact)
+        matrix.get_cell(3).fill = colors.BLACK
+        matrix.get_cell(1, 2).set_border(3, colors.RED1)
+        matrix.get_cell(5).text("t5", fontsize=10)
+        return matrix
+
+    matrix = create(True)
+    assert matrix.grid.fill.shape == (4, 6, 3)
+    assert matrix.get_cell(3).fill == colors.BLACK
+    assert matrix.get_cell(0, 3) == matrix.get_cell(3)
+    assert matrix.get_cell(24) is None
+    assert len(matrix.get_cells()) == 24
+
+    legacy = create(False)
+    assert matrix.outer_size == legacy.outer_size
+    draw, canvas = create_canvas(matrix.outer_size)
+    matrix.draw(draw)
+    draw1, canvas1 = create_canvas(legacy.outer_size)
+    legacy.draw(draw1)
+    assert canvas.tobytes() == canvas1.tobytes()
+
+
+def test_clear_texts():
+    for compact in (True, False):
+        matrix = Matrix(shape=[4, 6], border=2, compact=compact)
+        matrix.get_cell(1, 2).text("t8", fontsize=10)
+        draw_, canvas = create_canvas(matrix.outer_size)
+        matrix.render(draw_)
+        # the cached list and bitmaps drop the texts
+        matrix.clear_texts()
+        assert not matrix.get_cell(1, 2).texts
+        matrix.render(draw_)
+        draw1, canvas1 = create_canvas(matrix.outer_size)
+        Matrix(shape=[4, 6], border=2, compact=compact).render(draw1)
+        assert canvas.tobytes() == canvas1.tobytes()
+
+
+def test_grid_raster():
+    import numpy as np
+
+    from matshow import grid
+
+    fill = np.random.RandomState(0).randint(0, 255, (3, 4, 3), np.uint8)
+    outline = np.random.RandomState(1).randint(0, 255, (3, 4, 3), np.uint8)
+    for border in range(4):
+        expect, canvas = create_canvas((4 * 7 + 1, 3 * 5 + 1))
+        for row in range(3):
+            for col in range(4):
+                expect.rectangle((col * 7, row * 5, col * 7 + 7, row * 5 + 5), fill=tuple(fill[row, col]),
+                                 outline=tuple(outline[row, col]), width=border)
+        image = grid.rasterize(fill, outline, border, 7, 5)
+        assert image.tobytes() == canvas.tobytes()
+
+        part = grid.rasterize(fill, outline, border, 7, 5, (3, 2, 20, 11))
+        assert part.tobytes() == canvas.crop((3, 2, 20, 11)).tobytes()
+
+
+def test_compact_matrix_raster():
+    matrix = Matrix(shape=[8, 8], border=1, margin=(4, 4),
+                    cell_config=Matrix.CellConfig(width=30), compact=True)
+    for i in range(8):
+        matrix.get_cell(i, i).fill = colors.BLACK
+        matrix.get_cell(i, i).text("t%d" % i, fontsize=12, fill=colors.YELLOW1)
+
+    draw_, canvas = create_canvas(matrix.outer_size)
+    matrix.draw(draw_)
+
+    # draw the cells one by one
+    draw1, canvas1 = create_canvas(matrix.outer_size)
+    origin = matrix._cells_coor((0, 0))[:2]
+    draw1.rectangle((0, 0) + matrix.outer_size, width=1, fill=matrix.fill,
+                    outline=matrix.outline)
+    for i, coor in matrix._cell_rects(origin):
+        cell = matrix.get_cell(i)
+        draw1.rectangle(coor, fill=cell.fill, outline=cell.outline, width=cell.border)
+        for txt, off in Widget.place_texts(cell.texts, cell.border, coor[:2]):
+            draw1.text(off, txt.content, font=draw.font(txt.fontsize), fill=txt.fill)
+    assert canvas.tobytes() == canvas1.tobytes()
+
+    # an ImageDraw of its own takes the generic path
+    canvas2 = Image.new("RGB", matrix.outer_size, colors.GRAY)
+    matrix.draw(ImageDraw.Draw(canvas2))
+    assert canvas.tobytes() == canvas2.tobytes()
+
+
+def test_render_region():
+    compact = Matrix(shape=[9, 11], border=2, margin=(3, 3), compact=True)
+    compact.get_cell(2, 3).set_border(3, colors.RED1)  # the cells are not uniform
+    legacy = Matrix(shape=[9, 11], border=2, margin=(3, 3))
+    for matrix in (compact, legacy):
+        matrix.get_cell(4, 5).text("t", fontsize=12)
+        draw_, canvas = create_canvas(matrix.outer_size, fill=colors.WHITE)
+        matrix.render(draw_)
+        for region in [(0, 0, 50, 40), (37, 21, 101, 85), (-5, 150, 60, 190)]:
+            expect = Image.new("RGB", (region[2] - region[0], region[3] - region[1]), colors.WHITE)
+            expect.paste(canvas, (-region[0], -region[1]))
+            assert matrix.render_region(region).tobytes() == expect.tobytes()
+    # the cells out of the region are culled
+    assert len(legacy.display_list.cull((0, 0, 30, 30))) < len(legacy.display_list) // 10
+
+
+def test_indexed_canvas():
+    compact = Matrix(shape=[6, 6], border=1, compact=True)
+    legacy = Matrix(shape=[3, 3], border=2)
+    for i in range(9):
+        compact.get_cell(i * 3).fill = colors.BLUE
+        legacy.get_cell(i).fill = colors.GRAY
+    view = Stack([compact, legacy, Rectangle(10, 10, fill=colors.GREEN1)], cstride=3, margin=(2, 2))
+    draw_, expect = create_canvas(view.outer_size, fill=colors.WHITE)
+    view.draw(draw_)
+    palette = view.display_list.colors()
+    assert colors.BLUE in palette and colors.GREEN1 in palette
+    draw_, canvas = create_canvas(view.outer_size, fill=colors.WHITE, palette=palette[:2])
+    view.draw(draw_)  # the missing colors are allocated
+    assert canvas.mode == "P" and canvas.convert("RGB").tobytes() == expect.tobytes()
+
+
 if __name__ == "__main__":
     test_stack0()
@@ -0,0 +1,54 @@
+from matshow import fonts
+from matshow.cache import LRUCache
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # evicts "b"
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.stats == dict(
+        hits=1, misses=1, evictions=1, size=2, nbytes=0)
+
+
+def test_lru_cache_byte_budget():
+    cache = LRUCache(capacity=None, max_bytes=10, sizeof=len)
+    cache.put("a", "x" * 4)
+    cache.put("b", "x" * 4)
+    cache.put("c", "x" * 4)  # evicts "a"
+    assert "a" not in cache
+    assert cache.nbytes == 8
+    cache.put("b", "x" * 2)
+    assert cache.nbytes == 6
+
+
+def test_font_registry_reuses_fonts():
+    registry = fonts.FontRegistry()
+    font0 = registry.get(20)
+    assert registry.get(20) is font0
+    assert registry.get(10) is not font0
+    assert registry.stats["hits"] == 1
+    assert registry.stats["misses"] == 2
+
+
+def test_font_registry_env_override(monkeypatch):
+    monkeypatch.setenv(fonts.FONT_ENV, "/path/to/some.ttf")
+    registry = fonts.FontRegistry()
+    assert registry.path == "/path/to/some.ttf"
+
+
+def test_font_path_disk_cache(monkeypatch, tmp_path):
+    monkeypatch.delenv(fonts.FONT_ENV, raising=False)
+    monkeypatch.setenv(fonts.CACHE_DIR_ENV, str(tmp_path))
+    ttf = tmp_path / "some.ttf"
+    ttf.write_bytes(b"")
+    fonts._store_cached_font_path(str(ttf))
+
+    def discover():
+        assert False, "should hit the on-disk cache"
+
+    monkeypatch.setattr(fonts, "discover_font_path", discover)
+    assert fonts.FontRegistry().path == str(ttf)
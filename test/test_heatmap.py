@@ -0,0 +1,90 @@
+import numpy as np
+
+from matshow import colors, heatmap
+from matshow.draw import Matrix, create_canvas
+
+
+def test_quantize():
+    assert heatmap.quantize(np.arange(5)).tolist() == [0, 64, 128, 191, 255]
+    assert heatmap.quantize(np.array([1, 10, 100, 0]), "log").tolist() == [
+        0, 128, 255, 0]
+    assert heatmap.quantize(
+        np.array([-2, 0, 1]), "symmetric").tolist() == [0, 128, 191]
+    # NaN maps to the lowest color
+    assert heatmap.quantize(np.array([0, np.nan, 1.])).tolist() == [0, 0, 255]
+
+
+def test_colormap():
+    lut = heatmap.colormap([colors.BLACK, colors.WHITE])
+    assert lut.shape == (256, 3)
+    assert tuple(lut[0]) == colors.BLACK and tuple(lut[-1]) == colors.WHITE
+
+    values = np.random.RandomState(0).randn(16, 8)
+    mapped = heatmap.apply(values, "heat")
+    assert mapped.shape == (16, 8, 3)
+    assert (mapped == heatmap.colormap("heat")[heatmap.quantize(values)]).all()
+
+
+def test_matrix_heatmap():
+    values = np.arange(12).reshape(3, 4)
+    matrix = Matrix(shape=[3, 4], data=values, compact=True)
+    matrix.heatmap(cmap="gray")
+    assert matrix.get_cell(0).fill == colors.BLACK
+    assert matrix.get_cell(2, 3).fill == colors.WHITE
+
+    draw, canvas = create_canvas(matrix.outer_size)
+    matrix.draw(draw)
+
+
+def test_matrix_data_zero_copy():
+    from matshow import tensor
+
+    values = np.arange(12, dtype=np.float32).reshape(3, 4)
+    matrix = Matrix(shape=[3, 4], data=values, compact=True)
+    assert np.shares_memory(matrix.data, values)
+    assert not matrix.data.flags.writeable
+
+    # buffer protocol
+    buffer = bytearray(range(12))
+    assert np.shares_memory(tensor.as_array(buffer), np.frombuffer(buffer, dtype=np.uint8))
+
+    matrix.highlight(lambda data: data > 9, fill=colors.RED1)
+    assert matrix.get_cell(11).fill == colors.RED1
+    assert matrix.get_cell(9).fill != colors.RED1
+
+    matrix.label_cells("%d", mask=values < 2)
+    assert [txt.content for txt in matrix.get_cell(1).texts] == ["1"]
+    assert not matrix.get_cell(2).texts
+
+
+def test_label_cells():
+    values = np.array([[0.5, 2, 0.5], [2, 7, 0.5]])
+    compact = Matrix(shape=[2, 3], data=values, compact=True)
+    compact.label_cells("%g")
+    # a text per distinct value
+    assert compact.get_cell(0).texts[0] is compact.get_cell(5).texts[0]
+    assert [compact.get_cell(i).texts[0].content for i in range(6)] == ["0.5", "2", "0.5", "2", "7", "0.5"]
+
+    legacy = Matrix(shape=[2, 3], data=values)
+    legacy.label_cells("%g")
+    draw_, canvas = create_canvas(compact.outer_size)
+    compact.draw(draw_)
+    draw1, canvas1 = create_canvas(legacy.outer_size)
+    legacy.draw(draw1)
+    assert canvas.tobytes() == canvas1.tobytes()
+
+
+def test_dlpack_ingestion():
+    from matshow import tensor
+
+    values = np.arange(6.)
+
+    class Tensor:
+        def __dlpack__(self, **kwargs):
+            return values.__dlpack__(**kwargs)
+
+        def __dlpack_device__(self):
+            return values.__dlpack_device__()
+
+    view = tensor.as_array(Tensor())
+    assert np.shares_memory(view, values)
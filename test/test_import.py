@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+import matshow
+from matshow import draw, widgets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The statements timed by the benchmark, from the cheapest to the whole package.
+STATEMENTS = ["import matshow", "import matshow.colors", "from matshow import Matrix", "from matshow import *"]
+
+
+def _run(code: str, env=None) -> str:
+    env = dict(os.environ if env is None else env, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, "-c", code], env=env, check=True, capture_output=True,
+                          text=True).stdout
+
+
+def import_time(statement: str, repeat: int = 5) -> float:
+    '''
+    The best seconds of `statement` in a fresh interpreter, the bytecode is cached in a temporary directory first.
+    '''
+    code = "import time\nstart = time.perf_counter()\n%s\nprint(time.perf_counter() - start)" % statement
+    with tempfile.TemporaryDirectory() as cache:
+        env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+        env["PYTHONPYCACHEPREFIX"] = cache
+        _run(code, env)
+        return min(float(_run(code, env)) for _ in range(repeat))
+
+
+def test_lazy_import():
+    code = "import sys, matshow\nprint(sorted(m for m in ('numpy', 'PIL', 'torch', 'matshow.draw') if m in sys.modules))"
+    assert _run(code).strip() == "[]"
+    code = "import sys\nfrom matshow import Matrix\nprint('matshow.sinks' in sys.modules, 'torch' in sys.modules)"
+    assert _run(code).strip() == "False False"
+
+
+def test_exports():
+    assert set(draw.__all__) <= set(matshow.__all__)
+    for name in matshow.__all__:
+        assert getattr(matshow, name) is not None
+    assert matshow.gpu.TensorView is matshow.TensorView
+    assert widgets.WarpDataLayout.__module__ == "matshow.widgets.gpu"
+
+
+if __name__ == "__main__":
+    for statement in STATEMENTS:
+        print("%-28s %7.1f ms" % (statement, import_time(statement) * 1000))
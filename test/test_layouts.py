@@ -0,0 +1,139 @@
+import numpy as np
+from PIL import Image, ImageDraw
+
+from matshow import colors, create_canvas, grid
+from matshow.layouts import BlockedLayout, DotOperandLayout, MmaV1Layout, MmaV2Layout, SliceLayout
+from matshow.widgets.gpu import CTADataLayout, WarpBoundaries, WarpDataLayout
+
+
+def _counts(layout, shape):
+    coords = layout.indices(shape)
+    flat = np.ravel_multi_index(tuple(np.moveaxis(coords, -1, 0)), shape)
+    return np.bincount(flat.reshape(-1), minlength=int(np.prod(shape)))
+
+
+def test_blocked_layout():
+    layout = BlockedLayout([2, 4], [4, 8], [2, 2], order=[1, 0])
+    assert layout.threads == 128 and layout.tile == (16, 64)
+    coords = layout.indices([32, 64])
+    assert coords.shape == (128, 16, 2)
+    # a block of 2x4 per thread, then the repeated tile
+    assert coords[0, :8].tolist() == [[r, c] for r in range(2) for c in range(4)]
+    assert coords[0, 8].tolist() == [16, 0]
+    assert coords[1, 0].tolist() == [0, 4] and coords[8, 0].tolist() == [2, 0] and coords[32, 0].tolist() == [0, 32]
+    assert (_counts(layout, (32, 64)) == 1).all()
+    # broadcast over the smaller tensors
+    assert (_counts(layout, (8, 8)) == 16).all()
+    assert layout.owners((8, 8))[2:4, 4:8].tolist() == [[9] * 4] * 2
+
+
+def test_mma_layouts():
+    mma = MmaV2Layout()
+    lane = np.arange(32)
+    group, lane_in_group = lane // 4, lane % 4
+    c = mma.indices([16, 8])
+    assert (c[:, 2, 0] == group + 8).all() and (c[:, 3, 1] == lane_in_group * 2 + 1).all()
+    a = DotOperandLayout(0, mma).indices([16, 16])
+    assert a.shape == (32, 8, 2)
+    assert (a[:, 6, 0] == group + 8).all() and (a[:, 6, 1] == lane_in_group * 2 + 8).all()
+    b = DotOperandLayout(1, mma).indices([16, 8])
+    assert (b[:, 3, 0] == lane_in_group * 2 + 9).all() and (b[:, 3, 1] == group).all()
+    assert (_counts(MmaV2Layout([2, 2]), (64, 32)) == 1).all()
+    # the warps along N share the values of A
+    a = DotOperandLayout(0, MmaV2Layout([2, 2])).indices([32, 16])
+    assert (a[:64] == a[64:]).all() and (_counts(DotOperandLayout(0, MmaV2Layout([2, 2])), (32, 16)) == 2).all()
+
+    layout = MmaV1Layout(is_a_row=True, is_b_row=True)
+    assert layout.rep == (2, 4) and layout.tile == (16, 32)
+    coords = layout.indices([32, 32])
+    assert coords[0, :4].tolist() == [[0, 0], [0, 1], [0, 16], [0, 17]]
+    assert coords[16, 0].tolist() == [8, 0]  # the second quad along M only
+    assert (_counts(layout, (32, 32)) == 1).all()
+
+
+def test_slice_layout():
+    parent = BlockedLayout([2, 4], [4, 8], [2, 2], order=[1, 0])
+    rows = SliceLayout(1, parent).indices([32])
+    assert rows.shape == (128, 4, 1) and rows[0, :, 0].tolist() == [0, 1, 16, 17]
+    cols = SliceLayout(0, parent).indices([64])
+    assert cols.shape == (128, 4, 1) and cols[1, :, 0].tolist() == [4, 5, 6, 7]
+
+
+def test_warp_data_layout():
+    widget = WarpDataLayout(shape=(16, 8), label="c")
+    widget.set_layout(MmaV2Layout())
+    assert widget.tid_to_cell_summary[5] == [(1, 2), (1, 3), (9, 2), (9, 3)]
+    # the cells are Rectangles by default
+    assert widget.matrix.stack is not None and widget.matrix.get_cell(9, 3).fill == widget.thread_colors[5]
+    assert [text.content for text in widget.matrix.get_cell(9, 3).texts] == ["t5"]
+    assert WarpDataLayout(shape=(2, 4, 4), label="c").matrix.stack is not None
+
+    compact = WarpDataLayout(shape=(16, 8), label="c", compact=True)
+    compact.set_layout(MmaV2Layout())
+    owners = MmaV2Layout().owners((16, 8))
+    assert (compact.matrix.grid.fill == np.array(compact.thread_colors, dtype=np.uint8)[owners]).all()
+    draw_, canvas = create_canvas(widget.outer_size, fill=colors.WHITE)
+    widget.draw(draw_)
+    draw1, canvas1 = create_canvas(compact.outer_size, fill=colors.WHITE)
+    compact.render(draw1)
+    assert canvas.tobytes() == canvas1.tobytes()
+
+    # a new layout replaces the labels
+    for layout in (widget, compact):
+        layout.set_layout(MmaV2Layout())
+        assert [text.content for text in layout.matrix.get_cell(9, 3).texts] == ["t5"]
+
+
+def test_boundary_mask():
+    groups = np.array([[0, 0, 1], [0, 2, 1]])
+    for thickness in (1, 2, 3):
+        # the lines drawn one by one
+        expect = Image.new("1", (3 * 7 + 1, 2 * 5 + 1))
+        draw_ = ImageDraw.Draw(expect)
+        start = -(thickness // 2)
+        for row, col in ((0, 2), (1, 1), (1, 2)):
+            x = col * 7 + start
+            draw_.rectangle((x, row * 5, x + thickness - 1, row * 5 + 5), fill=1)
+        for row, col in ((1, 1),):
+            y = row * 5 + start
+            draw_.rectangle((col * 7, y, col * 7 + 7, y + thickness - 1), fill=1)
+        mask = grid.boundary_mask(groups, 7, 5, thickness)
+        assert (mask == np.asarray(expect)).all()
+        assert (grid.boundary_mask(groups, 7, 5, thickness, (3, 2, 20, 9)) == mask[2:9, 3:20]).all()
+
+
+def test_cta_data_layout():
+    layout = BlockedLayout([1, 2], [4, 8], [2, 2])
+    widget = CTADataLayout([16, 32], layout, label="cta", cell_size=24)
+    owners = layout.owners([16, 32])
+    assert (widget.matrix.grid.fill == widget.thread_colors[owners]).all()
+    assert widget.matrix.get_cell(0, 2).texts[0].content == "t1"
+    assert len(widget.matrix.grid.texts) == 16 * 32
+
+    draw_, canvas = create_canvas(widget.outer_size, fill=colors.WHITE)
+    widget.draw(draw_)
+    draw1, canvas1 = create_canvas(widget.outer_size, fill=colors.WHITE)
+    widget.render(draw1)
+    assert canvas.tobytes() == canvas1.tobytes()
+
+    plain = CTADataLayout([16, 32], layout, label="cta", cell_size=24, labels=False)
+    assert not plain.matrix.grid.texts
+    draw_, canvas = create_canvas(plain.outer_size, fill=colors.WHITE)
+    plain.render(draw_)
+    display_list = plain.display_list
+    x, y = display_list.rects[[isinstance(owner, WarpBoundaries) for owner in display_list.owners]][0, :2].tolist()
+    # the warps 0 and 1 meet at the column 16 of the cells, the warps 0 and 2 at the row 4
+    pixels = np.asarray(canvas)
+    assert (pixels[y + 50, x + 16 * 24 - 1:x + 16 * 24 + 1] == 0).all()
+    assert (pixels[y + 4 * 24 - 1:y + 4 * 24 + 1, x + 50] == 0).all()
+    assert (pixels[y + 50, x + 8 * 24] != 0).any()  # the outline of the cells within a warp
+    # an ImageDraw of its own draws the same
+    canvas1 = Image.new("RGB", plain.outer_size, colors.WHITE)
+    plain.draw(ImageDraw.Draw(canvas1))
+    assert canvas1.tobytes() == canvas.tobytes()
+
+    # the same cells on an indexed canvas, the label drawn without antialiasing is left out
+    draw1, indexed = create_canvas(plain.outer_size, fill=colors.WHITE, palette=display_list.colors())
+    plain.render(draw1)
+    cells = (x, y, x + 32 * 24 + 1, y + 16 * 24 + 1)
+    assert indexed.convert("RGB").crop(cells).tobytes() == canvas.crop(cells).tobytes()
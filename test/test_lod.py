@@ -0,0 +1,42 @@
+import numpy as np
+
+from matshow import colors, lod
+from matshow.draw import Matrix
+
+
+def test_pool():
+    values = np.arange(15, dtype=np.float32).reshape(3, 5)
+    assert lod.pool_values(values, 2, "max").tolist() == [[6, 8, 9], [11, 13, 14]]
+    assert lod.pool_values(values, (1, 5), "mean").tolist() == [[2], [7], [12]]
+
+    fill = np.zeros((4, 4, 3), dtype=np.uint8)
+    fill[...] = colors.WHITE
+    fill[3, 0] = colors.RED1
+    assert lod.pool_colors(fill, 2, "any", base=colors.WHITE).tolist() == [
+        [list(colors.WHITE)] * 2, [list(colors.RED1), list(colors.WHITE)]]
+    assert lod.pool_colors(fill, 4, "color")[0, 0].tolist() == [255, 239, 239]
+
+
+def test_level_of_detail():
+    matrix = Matrix(shape=[8, 8], data=np.arange(64), border=2, compact=True)
+    matrix.label_cells()
+    assert matrix.level_of_detail((500, 500)) is matrix
+
+    # the cells shrink and keep the details
+    view = matrix.level_of_detail((100, 100))
+    assert view.grid.shape == (8, 8) and view.cell_config.width == 12
+    assert len(view.grid.texts) == 64 and view.grid.uniform_border == 1
+    # the details are skipped on small cells
+    view = matrix.level_of_detail((40, 40))
+    assert view.cell_config.width == 4 and not view.grid.texts and view.grid.uniform_border == 0
+
+    # the blocks of cells are pooled once a cell is smaller than a pixel
+    view = matrix.level_of_detail((10, 10), pool="max", cmap="gray")
+    assert view.grid.shape == (4, 4) and view.outer_size == (8, 8)
+    assert view.data[0, 0] == 9 and tuple(view.grid.fill[-1, -1]) == colors.WHITE
+
+    matrix = Matrix(shape=[2048, 2048], compact=True)
+    matrix.get_cell(5, 7).fill = colors.RED1
+    image = matrix.render_fit((1024, 1024), pool="any")
+    assert image.size == (1024, 1024)
+    assert image.getpixel((3, 2)) == colors.RED1  # the cell (5, 7) is in the block (2, 3)
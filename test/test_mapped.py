@@ -0,0 +1,39 @@
+import numpy as np
+from PIL import Image
+
+from matshow.draw import Matrix, create_canvas
+from matshow.mapped import MappedMatrix
+from matshow.png import PNGWriter
+
+
+def test_png_writer(tmp_path):
+    image = np.random.RandomState(0).randint(0, 256, (30, 17, 3), dtype=np.uint8)
+    path = str(tmp_path / "rows.png")
+    with PNGWriter(path, 17, 30) as writer:
+        for start in range(0, 30, 7):
+            writer.write(image[start:start + 7])
+    assert (np.asarray(Image.open(path).convert("RGB")) == image).all()
+
+
+def test_mapped_matrix(tmp_path):
+    values = np.random.RandomState(0).randn(37, 23).astype(np.float32)
+    config = Matrix.CellConfig(6, 5, border=1)
+    matrix = Matrix(shape=[37, 23], data=values, cell_config=config, compact=True)
+    matrix.heatmap()
+    draw, im = create_canvas((200, 200))
+    matrix.render(draw)
+
+    np.save(tmp_path / "values.npy", values)
+    np.savez(tmp_path / "values.npz", a=values, b=values * 2)
+    np.savez_compressed(tmp_path / "compressed.npz", a=values)
+    for path, key in [("values.npy", None), ("values.npz", "a"), ("compressed.npz", None)]:
+        # a tiny budget renders one row of cells per band
+        mapped = MappedMatrix(str(tmp_path / path), key, cell_config=config, band_bytes=1)
+        assert mapped.band_rows == 1
+        out = np.asarray(mapped.to_image())
+        assert out.shape == (mapped.size[1], mapped.size[0], 3)
+        # the same pixels as a compact Matrix with the same cell config
+        assert (np.asarray(im)[:out.shape[0], :out.shape[1]] == out).all()
+
+        mapped.save(str(tmp_path / "out.png"))
+        assert (np.asarray(Image.open(tmp_path / "out.png").convert("RGB")) == out).all()
@@ -0,0 +1,95 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageSequence, features
+
+from matshow import colors
+from matshow.draw import Matrix, create_canvas
+from matshow.sinks import APNGSink, RawSink, WebPSink, open_sink
+
+
+def _frames():
+    matrix = Matrix(shape=[4, 4], border=1)
+    for i in range(4):
+        if i != 2:  # the third frame is unchanged
+            matrix.get_cell(i).fill = colors.RED1
+        draw_, canvas = create_canvas(matrix.outer_size, fill=colors.WHITE)
+        matrix.draw(draw_)
+        yield canvas
+
+
+def _decode(file):
+    with Image.open(file) as image:
+        return [(np.asarray(frame.convert("RGB")), frame.info.get("duration")) for frame in ImageSequence.Iterator(image)]
+
+
+def test_apng_sink():
+    frames = list(_frames())
+    file = io.BytesIO()
+    with APNGSink(file, duration=0.1, loop=0) as sink:
+        for i, frame in enumerate(frames):
+            sink.add(frame, duration=0.3 if i == 3 else None)
+    file.seek(0)
+    decoded = _decode(file)
+    assert [duration for _, duration in decoded] == [100, 200, 300]
+    for (pixels, _), frame in zip(decoded, (frames[0], frames[1], frames[3])):
+        assert (pixels == np.asarray(frame)).all()
+
+
+@pytest.mark.skipif(not features.check("webp"), reason="Pillow is built without WebP")
+def test_webp_sink():
+    frames = list(_frames())
+    file = io.BytesIO()
+    with WebPSink(file, duration=0.1) as sink:
+        for frame in frames:
+            sink.add(frame)
+    file.seek(0)
+    decoded = _decode(file)
+    assert [duration for _, duration in decoded] == [100, 200, 100]
+    for (pixels, _), frame in zip(decoded, (frames[0], frames[1], frames[3])):
+        assert (pixels == np.asarray(frame)).all()
+
+    # the frames are spooled instead of held, the frames reported unchanged are not spooled
+    file = io.BytesIO()
+    with WebPSink(file, duration=0.1, loop=0) as sink:
+        for i, frame in enumerate(frames):
+            sink.add(frame, damage=[] if i == 2 else None)
+        assert sink._spool.tell() == 3 * len(frames[0].tobytes())
+        assert not any(isinstance(value, Image.Image) for value in vars(sink).values())
+        assert sink._durations == [100, 200, 100]
+    assert sink._spool is None
+    file.seek(0)
+    assert [duration for _, duration in _decode(file)] == [100, 200, 100]
+
+
+def test_raw_sink():
+    frames = list(_frames())
+    file = io.BytesIO()
+    with RawSink(file, fps=20) as sink:
+        for frame in frames:
+            sink.add(frame, duration=0.1)
+    assert len(file.getvalue()) == 2 * len(frames) * len(frames[0].tobytes())
+
+
+def test_open_sink(tmp_path):
+    for name in ("a.gif", "a.png", "a.rgb"):
+        with open_sink(str(tmp_path / name), duration=0.1) as sink:
+            for frame in _frames():
+                sink.add(frame)
+    with Image.open(tmp_path / "a.png") as image:
+        assert image.n_frames == 3
+
+
+def test_indexed_frames():
+    rng = np.random.default_rng(0)
+    frames = [Image.fromarray(rng.integers(0, 256, (16, 16, 3), dtype=np.uint8)) for _ in range(3)]
+    # the palettes of their own overflow the palette of the sink on the second frame
+    indexed = [frame.quantize(256 if i else 200, dither=Image.Dither.NONE) for i, frame in enumerate(frames)]
+    file = io.BytesIO()
+    with APNGSink(file) as sink:
+        for frame in indexed:
+            sink.add(frame)
+    file.seek(0)
+    for (pixels, _), frame in zip(_decode(file), indexed):
+        assert (pixels == np.asarray(frame.convert("RGB"))).all()
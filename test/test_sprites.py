@@ -0,0 +1,42 @@
+from PIL import Image, ImageDraw
+
+from matshow import colors
+from matshow.draw import Rectangle, Stack, create_canvas
+from matshow.sprites import SpriteCache
+
+
+def test_sprite_rectangle():
+    sprites = SpriteCache()
+    for coor, border in [((3, 4, 23, 24), 1), ((-5, -7, 15, 13), 2), ((40, 30, 70, 45), 3), ((10, 10, 10, 10), 0)]:
+        expect = Image.new("RGB", (60, 50), colors.GRAY)
+        ImageDraw.Draw(expect).rectangle(coor, fill=colors.RED1, outline=colors.BLUE, width=border)
+        draw_, canvas = create_canvas((60, 50), fill=colors.GRAY)
+        sprites.rectangle(draw_, coor, colors.RED1, colors.BLUE, border)
+        assert canvas.tobytes() == expect.tobytes()
+
+    # no fill, the background shows through
+    draw_, canvas = create_canvas((60, 50), fill=colors.GRAY)
+    sprites.rectangle(draw_, (1, 1, 20, 20), None, colors.BLUE, 1)
+    assert canvas.getpixel((10, 10)) == colors.GRAY
+    assert sprites.stats["fallbacks"] == 1
+
+
+def test_sprite_cache_stats():
+    sprites = SpriteCache(max_bytes=21 * 21 * 3 * 2)
+    draw_, canvas = create_canvas((200, 200))
+    for i in range(10):
+        sprites.rectangle(draw_, (i * 20, 0, i * 20 + 20, 20), colors.RED1, colors.BLUE, 1)
+    assert sprites.stats["misses"] == 1 and sprites.stats["hit_rate"] == 0.9
+    for fill in (colors.WHITE, colors.BLACK, colors.RED1):
+        sprites.rectangle(draw_, (0, 40, 20, 60), fill, colors.BLUE, 1)
+    assert sprites.stats["size"] == 2 and sprites.stats["evictions"] == 2
+
+
+def test_rectangles_by_sprites():
+    from matshow.sprites import sprites
+    sprites.clear()
+    rec = Rectangle(20, 20, fill=colors.RED1, border=1)
+    view = Stack([rec] * 16, cstride=4, border=2, outline=colors.BLACK)
+    draw_, canvas = create_canvas(view.outer_size)
+    view.draw(draw_)
+    assert sprites.stats["hits"] == 15
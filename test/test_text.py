@@ -0,0 +1,66 @@
+from matshow.draw import Rectangle, Widget, colors
+from matshow.text import TextMetrics, metrics
+
+
+def test_text_metrics_cache():
+    cache = TextMetrics()
+    size = cache.size("t0", 20)
+    assert cache.size("t0", 20) == size
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+
+
+def test_text_metrics_premeasure():
+    cache = TextMetrics()
+    cache.premeasure(("t%d" % i for i in range(64)), 20)
+    assert cache.stats["size"] == 64
+    for i in range(64):
+        cache.size("t%d" % i, 20)
+    assert cache.stats["misses"] == 0
+
+
+def test_text_metrics_eviction():
+    cache = TextMetrics(capacity=4)
+    cache.premeasure(("t%d" % i for i in range(8)), 20)
+    assert cache.stats["size"] == 4
+
+
+def test_text_keeps_measured_size():
+    rec = Rectangle(40, 40, fill=colors.WHITE)
+    rec.text("t1", fontsize=20)
+    assert rec.texts[0].size == metrics.size("t1", 20)
+    assert rec.texts[0].size == Widget.get_text_actual_size("t1", 20)
+
+
+def test_label_atlas_matches_draw_text():
+    from PIL import Image, ImageDraw
+
+    from matshow import fonts
+    from matshow.canvas import Canvas
+    from matshow.text import LabelAtlas
+
+    atlas = LabelAtlas()
+    expect = Image.new("RGB", (60, 40), colors.SANDYBROWN)
+    ImageDraw.Draw(expect).text(
+        (5, 7), "t12", font=fonts.registry.get(20), fill=colors.YELLOW1)
+    for i in range(2):
+        actual = Image.new("RGB", (60, 40), colors.SANDYBROWN)
+        atlas.draw(Canvas(actual), (5, 7),
+                   "t12", 20, fill=colors.YELLOW1)
+        assert actual.tobytes() == expect.tobytes()
+    assert atlas.stats["misses"] == 1
+    assert atlas.stats["hits"] == 1
+    # an ImageDraw of its own draws the text directly
+    actual = Image.new("RGB", (60, 40), colors.SANDYBROWN)
+    atlas.draw(ImageDraw.Draw(actual), (5, 7), "t12", 20, fill=colors.YELLOW1)
+    assert actual.tobytes() == expect.tobytes() and atlas.stats["hits"] == 1
+
+
+def test_label_atlas_memory_cap():
+    from matshow.text import LabelAtlas
+
+    atlas = LabelAtlas(max_bytes=1024)
+    for i in range(64):
+        atlas.sprite("t%d" % i, 20)
+    assert atlas.stats["nbytes"] <= 1024
+    assert atlas.stats["evictions"] > 0
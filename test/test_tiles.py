@@ -0,0 +1,33 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+from matshow.draw import Matrix, colors, create_canvas
+from matshow.tiles import TilePyramid
+
+
+def test_tile_pyramid(tmp_path):
+    matrix = Matrix(shape=[23, 31], data=np.random.RandomState(0).randn(23, 31), compact=True)
+    matrix.heatmap()
+    draw_, canvas = create_canvas(matrix.outer_size, fill=colors.WHITE)
+    matrix.render(draw_)
+
+    pyramid = TilePyramid(matrix, tile_size=64)
+    assert pyramid.max_level == 10  # 620 x 460
+    assert pyramid.tile_count(pyramid.max_level) == (10, 8)
+    assert pyramid.level_size(0) == (1, 1)
+    path = str(tmp_path / "matrix")
+    pyramid.save(path)
+    assert os.path.exists(path + ".dzi")
+
+    def load_level(level):
+        cols, rows = pyramid.tile_count(level)
+        return np.concatenate([np.concatenate(
+            [np.asarray(Image.open("%s_files/%d/%d_%d.png" % (path, level, col, row))) for col in range(cols)],
+            axis=1) for row in range(rows)])
+
+    # the top level is the full image, and each level below halves it
+    assert (load_level(pyramid.max_level) == np.asarray(canvas)).all()
+    assert (load_level(pyramid.max_level - 1) == np.asarray(canvas.reduce(2))).all()
+    assert pyramid.tile(8, 1, 0).tobytes() == Image.open(path + "_files/8/1_0.png").tobytes()